@@ -4,7 +4,11 @@ from typing import Generator
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordBearer
 
-from app.core.security import get_current_active_user, get_current_active_superuser
+from app.core.security import (
+    get_current_active_user,
+    get_current_active_superuser,
+    verify_api_key,
+)
 from app.models.schemas import User
 from app.config import settings
 
@@ -23,7 +27,7 @@ def get_superuser_dependency():
 
 def get_api_key_header_dependency():
     async def validate_api_key(x_api_key: str = Header(...)):
-        if x_api_key != settings.API_KEY:
+        if not verify_api_key(x_api_key):
             logger.warning("Authentication failed: Invalid API key provided")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, Form, Query, Request, Response, UploadFile, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import (
+    collect_blocking_reports,
+    collect_flame_graph,
+    get_profiling_status,
+    reset_profiling_data,
+    update_profiling_control,
+)
+from app.config import settings
+from app.core.errors import IngestionError, JobNotFoundError
+from app.core.security import get_current_active_superuser
+from app.models.schemas import (
+    BlockingDetectionRequest,
+    BlockingReport,
+    IngestionDirectoryRequest,
+    IngestionJobResponse,
+    ProfilingSettingsRequest,
+    ProfilingStatus,
+    User,
+)
+from app.services.rag.ingestion import (
+    list_ingestion_jobs,
+    load_ingestion_job,
+    resolve_ingestion_directory,
+    store_uploaded_documents,
+    submit_ingestion,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(dependencies=[Depends(get_current_active_superuser)])
+
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+
+
+@router.get("/profiling", response_model=ProfilingStatus)
+async def profiling_status():
+    return ProfilingStatus(**get_profiling_status())
+
+
+@router.put("/profiling", response_model=ProfilingStatus)
+async def configure_profiling(request: ProfilingSettingsRequest):
+    update_profiling_control(
+        profiling_enabled=request.enabled,
+        route=request.route,
+        sample_percent=request.sample_percent,
+        interval_ms=request.interval_ms,
+    )
+    return ProfilingStatus(**get_profiling_status())
+
+
+@router.put("/profiling/blocking", response_model=ProfilingStatus)
+async def configure_blocking_detection(request: BlockingDetectionRequest):
+    update_profiling_control(
+        blocking_detection_enabled=request.enabled,
+        blocking_threshold_ms=request.threshold_ms,
+    )
+    return ProfilingStatus(**get_profiling_status())
+
+
+@router.get("/profiling/blocking", response_model=List[BlockingReport])
+async def blocking_reports():
+    return collect_blocking_reports()
+
+
+@router.get("/profiling/flamegraph", response_class=PlainTextResponse)
+async def download_flame_graph():
+    # Collapsed stacks, as read by flamegraph.pl and speedscope
+    return PlainTextResponse(
+        collect_flame_graph(),
+        headers={"Content-Disposition": f'attachment; filename="aspbot-{os.getpid()}.folded"'},
+    )
+
+
+@router.delete("/profiling/data", status_code=204)
+async def clear_profiling_data():
+    reset_profiling_data()
+
+
+def accepted_ingestion(job, request: Request, response: Response) -> IngestionJobResponse:
+    response.headers["Location"] = str(request.url_for("get_ingestion_job", job_id=job["job_id"]))
+    return IngestionJobResponse(**job)
+
+
+@router.post("/ingestion/directory", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_directory(
+    ingestion_request: IngestionDirectoryRequest,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_superuser),
+):
+    directory = resolve_ingestion_directory(ingestion_request.directory)
+    job = await submit_ingestion(directory, ingestion_request.directory, current_user.id)
+    return accepted_ingestion(job, request, response)
+
+
+def upload_too_large() -> IngestionError:
+    return IngestionError(f"Uploads exceed {settings.INGESTION_MAX_UPLOAD_BYTES} bytes", status_code=413)
+
+
+@router.post("/ingestion/upload", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_uploaded_documents(
+    request: Request,
+    response: Response,
+    files: List[UploadFile] = File(...),
+    folder: Optional[str] = Form(None, description="Folder under the documents directory, e.g. a benefit type"),
+    current_user: User = Depends(get_current_active_superuser),
+):
+    # Reject on the declared sizes first, then read in chunks so an
+    # oversized file is never held in memory whole
+    declared_bytes = sum(upload.size or 0 for upload in files)
+    if declared_bytes > settings.INGESTION_MAX_UPLOAD_BYTES:
+        raise upload_too_large()
+    
+    uploaded_documents = []
+    uploaded_bytes = 0
+    for upload in files:
+        content = bytearray()
+        while True:
+            chunk = await upload.read(UPLOAD_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            uploaded_bytes += len(chunk)
+            if uploaded_bytes > settings.INGESTION_MAX_UPLOAD_BYTES:
+                raise upload_too_large()
+            content += chunk
+        uploaded_documents.append((upload.filename or "", bytes(content)))
+    
+    # Uploads join the documents directory, which is then re-indexed as a whole
+    directory = await store_uploaded_documents(uploaded_documents, folder)
+    job = await submit_ingestion(directory, f"upload of {len(uploaded_documents)} files", current_user.id)
+    return accepted_ingestion(job, request, response)
+
+
+@router.get("/ingestion", response_model=List[IngestionJobResponse])
+async def list_ingestion(limit: int = Query(20, ge=1, le=200)):
+    return [IngestionJobResponse(**job) for job in await asyncio.to_thread(list_ingestion_jobs, limit)]
+
+
+@router.get("/ingestion/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: str):
+    job = load_ingestion_job(job_id)
+    if job is None:
+        raise JobNotFoundError(job_id)
+    return IngestionJobResponse(**job)
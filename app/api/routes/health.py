@@ -3,7 +3,19 @@ from fastapi import APIRouter, Depends
 
 from app import __version__
 from app.config import settings
-from app.models.schemas import HealthCheck
+from app.core.admission import get_admission_metrics
+from app.core.cache import get_cache_metrics
+from app.core.logging import get_logging_metrics
+from app.core.resilience import get_upstream_metrics
+from app.services.audio.vad import get_vad_metrics
+from app.services.intents import get_intent_metrics
+from app.services.jobs.worker import get_job_metrics
+from app.services.rag.ingestion import get_ingestion_metrics
+from app.services.rag.faq import get_faq_metrics
+from app.services.rag.model_router import get_model_tier_metrics
+from app.services.rag.router import get_routing_metrics
+from app.services.rag.snapshots import get_serving_version
+from app.models.schemas import HealthCheck, MetricsResponse
 from app.services.wake_word.detector import check_wake_word_service
 from app.services.speech.stt import check_stt_service
 from app.services.speech.tts import check_tts_service
@@ -36,4 +48,22 @@ async def health_check():
         },
     )
     
-    return system_health
\ No newline at end of file
+    return system_health
+
+
+@router.get("/metrics", response_model=MetricsResponse, tags=["health"])
+async def service_metrics():
+    return MetricsResponse(
+        admission=get_admission_metrics(),
+        upstreams=get_upstream_metrics(),
+        faq=get_faq_metrics(),
+        routing=get_routing_metrics(),
+        model_tiers=get_model_tier_metrics(),
+        cache=get_cache_metrics(),
+        jobs=await get_job_metrics(),
+        ingestion=get_ingestion_metrics(),
+        intents=get_intent_metrics(),
+        vad=get_vad_metrics(),
+        logging=get_logging_metrics(),
+        snapshot_version=get_serving_version(),
+    )
\ No newline at end of file
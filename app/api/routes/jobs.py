@@ -0,0 +1,83 @@
+import base64
+import binascii
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Request, Response, status
+
+from app.core.errors import AudioFormatError, JobNotFoundError
+from app.core.security import get_current_active_user
+from app.models.schemas import (
+    InteractionJobRequest,
+    JobStatusResponse,
+    JobSubmitResponse,
+    RAGJobRequest,
+    User,
+)
+from app.services.jobs.queue import expire_lost_job, get_job_queue
+from app.services.jobs.worker import describe_job, submit_job
+from app.services.speech.tts import resolve_output_format
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def accepted_job(job, request: Request, response: Response) -> JobSubmitResponse:
+    status_url = str(request.url_for("get_job_status", job_id=job["job_id"]))
+    response.headers["Location"] = status_url
+    return JobSubmitResponse(job_id=job["job_id"], status=job["status"], status_url=status_url)
+
+
+@router.post("/jobs/interact", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_interaction_job(
+    job_request: InteractionJobRequest,
+    request: Request,
+    response: Response,
+    accept: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+):
+    # Resolved here so a bad format fails the submit, not the job minutes later
+    output_format = resolve_output_format(job_request.audio_format, accept)
+    try:
+        base64.b64decode(job_request.audio_data, validate=True)
+    except binascii.Error:
+        raise AudioFormatError("audio_data is not valid base64")
+    
+    job = await submit_job(
+        "interact",
+        {"audio_data": job_request.audio_data, "audio_format": output_format.name, "session_id": job_request.session_id},
+        current_user.id,
+        job_request.callback_url,
+    )
+    return accepted_job(job, request, response)
+
+
+@router.post("/jobs/rag", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_rag_job(
+    job_request: RAGJobRequest,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+):
+    job = await submit_job(
+        "rag",
+        job_request.model_dump(exclude={"callback_url"}),
+        current_user.id,
+        job_request.callback_url,
+    )
+    return accepted_job(job, request, response)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    job = await get_job_queue().get(job_id)
+    
+    # Someone else's job is reported as missing rather than forbidden
+    if job is None or job["user_id"] != current_user.id:
+        raise JobNotFoundError(job_id)
+    
+    return JobStatusResponse(**describe_job(expire_lost_job(job)))
@@ -1,7 +1,10 @@
 import logging
 import uuid
 import base64
-from fastapi import APIRouter, Depends, HTTPException, status
+import binascii
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 
 from app.config import settings
@@ -9,21 +12,38 @@ from app.core.security import get_current_active_user
 from app.models.schemas import (
     WakeWordRequest,
     WakeWordResponse,
+    WakeWordStreamRequest,
+    WakeWordStreamResponse,
     TranscriptionRequest,
     TranscriptionResponse,
+    TranscriptionBatchRequest,
+    TranscriptionBatchResult,
     RAGRequest,
     RAGResponse,
+    RAGBatchRequest,
+    RAGBatchResult,
     TextToSpeechRequest,
     TextToSpeechResponse,
     VoiceInteractionRequest,
     VoiceInteractionResponse,
     User,
 )
-from app.services.wake_word.detector import detect_wake_word
-from app.services.speech.stt import transcribe_audio
-from app.services.speech.tts import text_to_speech
-from app.services.rag.retriever import query_rag_system
+from app.services.audio.normalizer import NormalizedAudio
+from app.services.wake_word.detector import (
+    close_wake_word_stream,
+    detect_wake_word,
+    push_wake_word_audio,
+)
+from app.services.speech.stt import transcribe_audio, transcribe_audio_batch
+from app.services.speech.formats import accepts_raw_audio
+from app.services.speech.tts import resolve_output_format, text_to_speech
+from app.services.rag.retriever import query_rag_system_batch
+from app.services.interaction import answer_question, run_voice_interaction
 from app.core.errors import (
+    ASPBotException,
+    AudioFormatError,
+    BatchTooLargeError,
+    ServiceOverloadedError,
     SpeechProcessingError,
     WakeWordError,
     RAGError,
@@ -34,6 +54,19 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+BATCH_MEDIA_TYPE = "application/x-ndjson"
+
+
+def describe_batch_error(error: Exception) -> Tuple[int, str]:
+    if isinstance(error, ASPBotException):
+        return error.status_code, error.message
+    return status.HTTP_500_INTERNAL_SERVER_ERROR, str(error)
+
+
+def ensure_batch_size(item_count: int):
+    if item_count > settings.BATCH_MAX_ITEMS:
+        raise BatchTooLargeError(item_count, settings.BATCH_MAX_ITEMS)
+
 
 @router.post("/wake-word", response_model=WakeWordResponse)
 async def wake_word_detection(
@@ -59,12 +92,49 @@ async def wake_word_detection(
         raise WakeWordError(str(error))
 
 
+@router.post("/wake-word/stream", response_model=WakeWordStreamResponse)
+async def stream_wake_word_detection(
+    request: WakeWordStreamRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    try:
+        session_id, stream = await push_wake_word_audio(request.session_id, base64.b64decode(request.audio_data))
+    except ASPBotException:
+        raise
+    except Exception as error:
+        logger.exception("Failed to process wake word stream chunk")
+        raise WakeWordError(str(error))
+    
+    response = WakeWordStreamResponse(
+        session_id=session_id,
+        detected=stream.detected,
+        detection_offset=stream.detection_offset,
+        detection_seconds=stream.detection_offset / stream.sample_rate if stream.detected else None,
+        samples_received=stream.samples_received,
+    )
+    
+    if not request.final:
+        return response
+    
+    try:
+        command_pcm = stream.post_wake_audio()
+        if stream.detected and len(command_pcm) >= settings.WAKE_WORD_MIN_COMMAND_SECONDS * stream.sample_rate:
+            response.transcription, _ = await transcribe_audio(
+                NormalizedAudio(pcm=command_pcm, sample_rate=stream.sample_rate),
+                follows_wake_word=True,
+            )
+    finally:
+        close_wake_word_stream(session_id)
+    
+    return response
+
+
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe(
     request: TranscriptionRequest,
     current_user: User = Depends(get_current_active_user),
 ):
-    logger.info(f"Converting speech to text for session {request.session_id}")
+    logger.info("Converting speech to text for session %s", request.session_id)
     
     try:
         audio_bytes = base64.b64decode(request.audio_data)
@@ -75,55 +145,150 @@ async def transcribe(
             text=transcribed_text,
             confidence=recognition_confidence,
         )
+    except ServiceOverloadedError:
+        raise
     except Exception as error:
         logger.exception("Failed to transcribe audio to text")
         raise SpeechProcessingError(str(error))
 
 
+@router.post("/transcribe/batch")
+async def transcribe_batch(
+    request: TranscriptionBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    ensure_batch_size(len(request.items))
+    logger.info("Transcribing batch of %d recordings for session %s", len(request.items), request.session_id)
+    
+    decoded_positions = []
+    decoded_audio = []
+    decode_failures = []
+    for position, item in enumerate(request.items):
+        try:
+            decoded_audio.append(base64.b64decode(item.audio_data, validate=True))
+            decoded_positions.append(position)
+        except binascii.Error:
+            decode_failures.append(position)
+    
+    async def stream_results():
+        for position in decode_failures:
+            yield TranscriptionBatchResult(
+                index=position,
+                id=request.items[position].id,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                error="Audio data is not valid base64",
+            ).model_dump_json() + "\n"
+        
+        # Results are written as each recording finishes, not in request order
+        async for decoded_position, transcription, error in transcribe_audio_batch(decoded_audio):
+            position = decoded_positions[decoded_position]
+            if error is not None:
+                error_status, error_message = describe_batch_error(error)
+                result = TranscriptionBatchResult(
+                    index=position,
+                    id=request.items[position].id,
+                    status_code=error_status,
+                    error=error_message,
+                )
+            else:
+                transcribed_text, recognition_confidence = transcription
+                result = TranscriptionBatchResult(
+                    index=position,
+                    id=request.items[position].id,
+                    text=transcribed_text,
+                    confidence=recognition_confidence,
+                )
+            yield result.model_dump_json() + "\n"
+    
+    return StreamingResponse(stream_results(), media_type=BATCH_MEDIA_TYPE)
+
+
 @router.post("/rag", response_model=RAGResponse)
 async def retrieve_answer(
     request: RAGRequest,
     current_user: User = Depends(get_current_active_user),
 ):
-    logger.info(f"Finding answer for query in session {request.session_id}")
+    logger.info("Finding answer for query in session %s", request.session_id)
     
     try:
-        generated_answer, relevant_documents = await query_rag_system(request.query)
-        
-        if not generated_answer:
-            raise NoRelevantDocumentsError()
-        
-        return RAGResponse(
-            answer=generated_answer,
-            source_documents=relevant_documents,
-            query=request.query,
-        )
-    except NoRelevantDocumentsError:
-        return RAGResponse(
-            answer=settings.DEFAULT_RESPONSE,
-            source_documents=[],
-            query=request.query,
-        )
+        return await answer_question(request, current_user.id)
+    except ServiceOverloadedError:
+        raise
     except Exception as error:
         logger.exception("Failed to generate answer from knowledge base")
         raise RAGError(str(error))
 
 
+@router.post("/rag/batch")
+async def retrieve_answers_batch(
+    request: RAGBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    ensure_batch_size(len(request.items))
+    logger.info("Answering batch of %d queries for session %s", len(request.items), request.session_id)
+    
+    queries = [item.query for item in request.items]
+    
+    async def stream_results():
+        # Results are written as each answer finishes, not in request order
+        async for position, answer_with_sources, error in query_rag_system_batch(queries):
+            item = request.items[position]
+            if isinstance(error, NoRelevantDocumentsError):
+                result = RAGBatchResult(
+                    index=position,
+                    id=item.id,
+                    query=item.query,
+                    answer=settings.DEFAULT_RESPONSE,
+                )
+            elif error is not None:
+                error_status, error_message = describe_batch_error(error)
+                result = RAGBatchResult(
+                    index=position,
+                    id=item.id,
+                    query=item.query,
+                    status_code=error_status,
+                    error=error_message,
+                )
+            else:
+                generated_answer, relevant_documents = answer_with_sources
+                result = RAGBatchResult(
+                    index=position,
+                    id=item.id,
+                    query=item.query,
+                    answer=generated_answer or settings.DEFAULT_RESPONSE,
+                    source_documents=relevant_documents,
+                )
+            yield result.model_dump_json() + "\n"
+    
+    return StreamingResponse(stream_results(), media_type=BATCH_MEDIA_TYPE)
+
+
 @router.post("/tts", response_model=TextToSpeechResponse)
 async def synthesize_speech(
     request: TextToSpeechRequest,
+    accept: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
 ):
-    logger.info(f"Converting text to speech for session {request.session_id}")
+    logger.info("Converting text to speech for session %s", request.session_id)
     
     try:
-        audio_bytes = await text_to_speech(request.text)
+        output_format = resolve_output_format(request.audio_format, accept)
+        
+        audio_bytes = await text_to_speech(request.text, output_format)
+        
+        # Clients that ask for audio get the bytes without the base64 envelope
+        if accepts_raw_audio(accept):
+            return Response(content=audio_bytes, media_type=output_format.media_type)
         
         audio_base64_string = base64.b64encode(audio_bytes).decode("utf-8")
         
         return TextToSpeechResponse(
             audio_data=audio_base64_string,
+            audio_format=output_format.name,
+            media_type=output_format.media_type,
         )
+    except (AudioFormatError, ServiceOverloadedError):
+        raise
     except Exception as error:
         logger.exception("Failed to convert text to speech")
         raise SpeechProcessingError(str(error))
@@ -132,41 +297,18 @@ async def synthesize_speech(
 @router.post("/interact", response_model=VoiceInteractionResponse)
 async def complete_voice_interaction(
     request: VoiceInteractionRequest,
+    accept: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
 ):
     logger.info("Processing complete voice interaction flow")
     
     try:
-        audio_bytes = base64.b64decode(request.audio_data)
-        
-        conversation_id = str(uuid.uuid4())
-        
-        is_wake_word_detected, _ = await detect_wake_word(audio_bytes)
-        
-        if not is_wake_word_detected:
-            return VoiceInteractionResponse(
-                wake_word_detected=False,
-                session_id=conversation_id,
-            )
-        
-        transcribed_text, _ = await transcribe_audio(audio_bytes)
+        # Reject an unknown format before spending time on STT and RAG
+        output_format = resolve_output_format(request.audio_format, accept)
         
-        generated_answer, _ = await query_rag_system(transcribed_text)
-        
-        if not generated_answer:
-            generated_answer = settings.DEFAULT_RESPONSE
-        
-        speech_audio_bytes = await text_to_speech(generated_answer)
-        
-        speech_audio_base64 = base64.b64encode(speech_audio_bytes).decode("utf-8")
-        
-        return VoiceInteractionResponse(
-            wake_word_detected=True,
-            transcription=transcribed_text,
-            answer=generated_answer,
-            audio_response=speech_audio_base64,
-            session_id=conversation_id,
-        )
+        return await run_voice_interaction(request, output_format, current_user.id)
+    except (AudioFormatError, ServiceOverloadedError):
+        raise
     except Exception as error:
         logger.exception("Error in voice interaction pipeline")
         raise HTTPException(
@@ -7,8 +7,18 @@ from pydantic import validator
 class Settings(BaseSettings):
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    SERVER_LOOP: str = "uvloop"
+    SERVER_HTTP: str = "httptools"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_SECONDS: int = 5
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 45
     DEBUG: bool = False
     ENVIRONMENT: str = "production"
+    
     SECRET_KEY: str
     
     OPENAI_API_KEY: str
@@ -19,22 +29,188 @@ class Settings(BaseSettings):
     
     PORCUPINE_ACCESS_KEY: str
     
+    STT_PROVIDER: str = "openai"
+    TTS_PROVIDER: str = "azure"
+    TTS_DEFAULT_FORMAT: str = "wav"
+    TTS_MP3_BITRATE_KBPS: int = 64
+    LOCAL_STT_MODEL: str = "small"
+    LOCAL_STT_COMPUTE_TYPE: str = "int8"
+    LOCAL_STT_CPU_THREADS: int = 0
+    LOCAL_STT_BEAM_SIZE: int = 1
+    LOCAL_TTS_COMMAND: str = "espeak-ng"
+    LOCAL_TTS_VOICE: str = "bg"
+    LOCAL_TTS_WORDS_PER_MINUTE: int = 160
+    STUB_STT_TEXT: str = "Как мога да кандидатствам за социално подпомагане?"
+    
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ALGORITHM: str = "HS256"
+    TOKEN_CACHE_MAX_SIZE: int = 1024
+    
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_REDIS_POOL_SIZE: int = 16
+    CACHE_REDIS_TIMEOUT_SECONDS: float = 0.5
+    CACHE_KEY_PREFIX: str = "aspbot"
+    CACHE_MEMORY_MAX_BYTES: int = 256 * 1024 * 1024
+    CACHE_COMPRESSION_MIN_BYTES: int = 1024
+    CACHE_COMPRESSION_LEVEL: int = 6
+    CACHE_LOCK_SECONDS: float = 30.0
+    CACHE_LOCK_WAIT_SECONDS: float = 10.0
+    CACHE_LOCK_POLL_SECONDS: float = 0.05
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    
+    JOB_QUEUE_BACKEND: str = "local"
+    JOB_QUEUE_REDIS_URL: Optional[str] = None
+    JOB_WORKERS_IN_PROCESS: bool = True
+    JOB_WORKER_CONCURRENCY: int = 8
+    JOB_MAX_QUEUED: int = 1000
+    JOB_TIMEOUT_SECONDS: float = 120.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RESULT_TTL_SECONDS: float = 3600.0
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_DRAIN_SECONDS: float = 30.0
+    JOB_CALLBACK_ALLOWED_HOSTS: List[str] = []
+    JOB_CALLBACK_SECRET: Optional[str] = None
+    JOB_CALLBACK_TIMEOUT_SECONDS: float = 5.0
+    JOB_CALLBACK_MAX_ATTEMPTS: int = 3
+    
+    API_KEY: Optional[str] = None
+    API_KEY_USER_ID: str = "kiosk"
     
     VECTOR_STORE_PATH: str = "./data/processed/vector_store"
     EMBEDDING_MODEL: str = "text-embedding-3-small"
     LLM_MODEL: str = "gpt-4-turbo"
+    LLM_MAX_TOKENS: int = 1000
+    LLM_SMALL_MODEL: str = "gpt-4o-mini"
+    LLM_SMALL_MAX_TOKENS: int = 400
+    MODEL_TIERING_ENABLED: bool = True
+    MODEL_TIER_SMALL_MIN_SCORE: float = 0.8
+    MODEL_TIER_SMALL_MAX_QUERY_WORDS: int = 20
+    MODEL_TIER_SMALL_MAX_SOURCES: int = 1
+    MODEL_TIER_COMPLEX_KEYWORDS: List[str] = ["защо", "разлик", "сравн", "ако", "изчисл", "едновременно", "или", "освен"]
+    MODEL_TIER_ESCALATE_ON_FALLBACK: bool = True
+    VECTOR_INDEX_TYPE: str = "chroma"
+    QUANTIZED_INDEX_PATH: str = "./data/processed/quantized_index"
+    QUANTIZED_RERANK_MULTIPLIER: int = 10
+    CHUNK_STORE_ENABLED: bool = True
+    CHUNK_STORE_PATH: str = "./data/processed/chunk_store"
+    
+    VECTOR_SNAPSHOTS_ENABLED: bool = True
+    VECTOR_SNAPSHOT_PATH: str = "./data/processed/snapshots"
+    VECTOR_SNAPSHOT_CHECK_SECONDS: float = 5.0
+    VECTOR_SNAPSHOT_RETAIN: int = 3
+    VECTOR_SNAPSHOT_VALIDATION_PROBES: int = 20
+    BINARY_RERANK_MULTIPLIER: int = 40
+    
+    PARTITION_ROUTING_ENABLED: bool = True
+    PARTITION_METADATA_KEY: str = "benefit_type"
+    PARTITION_KEYWORDS_PATH: str = "./data/partitions/keywords.json"
+    PARTITION_ROUTER_MIN_SIMILARITY: float = 0.3
+    PARTITION_ROUTER_MARGIN: float = 0.05
+    PARTITION_ROUTER_MAX_PARTITIONS: int = 2
     
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    INDEX_BATCH_SIZE: int = 256
+    
+    INGESTION_PATH: str = "./data/ingestion"
+    INGESTION_DOCUMENTS_PATH: str = "./data/documents"
+    INGESTION_ALLOWED_DIRECTORIES: List[str] = ["./data/documents"]
+    INGESTION_MAX_PROCESSES: int = 1
+    INGESTION_MAX_QUEUED: int = 10
+    INGESTION_PROCESS_NICE: int = 10
+    INGESTION_MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    INGESTION_STALL_SECONDS: float = 900.0
     
     WAKE_PHRASE: str = "Zdravey ASP"
+    WAKE_WORD_MIN_COMMAND_SECONDS: float = 0.3
+    WAKE_WORD_STREAM_MAX_SESSIONS: int = 64
+    WAKE_WORD_STREAM_IDLE_SECONDS: float = 30.0
+    WAKE_WORD_STREAM_BUFFER_SECONDS: float = 30.0
+    VAD_ENABLED: bool = True
+    VAD_FRAME_MS: int = 20
+    VAD_ENERGY_THRESHOLD_DBFS: float = -45.0
+    VAD_NOISE_MARGIN_DB: float = 10.0
+    VAD_MAX_ZERO_CROSSING_RATE: float = 0.4
+    VAD_MIN_SPEECH_SECONDS: float = 0.15
+    VAD_PADDING_SECONDS: float = 0.2
     DEFAULT_RESPONSE: str = "Моля, опитайте се да формулирате въпроса по-точно, за да мога да помогна."
     
     RETRIEVAL_TOP_K: int = 3
     RELEVANCE_THRESHOLD: float = 0.7
     
+    MMR_ENABLED: bool = False
+    MMR_LAMBDA: float = 0.7
+    MMR_FETCH_MULTIPLIER: int = 4
+    
+    FAQ_ENABLED: bool = True
+    FAQ_INDEX_PATH: str = "./data/processed/faq_index"
+    FAQ_SIMILARITY_THRESHOLD: float = 0.92
+    
+    INTENTS_ENABLED: bool = True
+    INTENTS_PATH: str = "./data/intents/intents.json"
+    INTENT_AUDIO_PATH: str = "./data/processed/intent_audio"
+    INTENT_MAX_WORDS: int = 6
+    INTENT_MIN_SIMILARITY: float = 0.6
+    INTENT_SESSION_TTL_SECONDS: float = 900.0
+    
+    REQUEST_DEADLINE_SECONDS: float = 30.0
+    STT_MAX_CONCURRENCY: int = 8
+    LLM_MAX_CONCURRENCY: int = 8
+    TTS_MAX_CONCURRENCY: int = 8
+    STAGE_DEFAULT_MAX_CONCURRENCY: int = 8
+    STAGE_MAX_QUEUE_SIZE: int = 32
+    
+    BATCH_MAX_ITEMS: int = 5000
+    BATCH_MAX_CONCURRENCY: int = 4
+    EMBEDDING_BATCH_SIZE: int = 256
+    
+    STT_TIMEOUT_SECONDS: float = 20.0
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    EMBEDDING_TIMEOUT_SECONDS: float = 10.0
+    TTS_TIMEOUT_SECONDS: float = 15.0
+    UPSTREAM_DEFAULT_TIMEOUT_SECONDS: float = 20.0
+    UPSTREAM_MAX_RETRIES: int = 2
+    UPSTREAM_MAX_THREADS: int = 16
+    UPSTREAM_RETRY_BASE_DELAY_SECONDS: float = 0.2
+    UPSTREAM_RETRY_MAX_DELAY_SECONDS: float = 2.0
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 30.0
+    HEDGING_ENABLED: bool = False
+    HEDGING_LATENCY_PERCENTILE: float = 95.0
+    HEDGING_MIN_SAMPLES: int = 20
+    HEDGING_WINDOW_SIZE: int = 200
+    
+    LOG_ASYNC: bool = True
+    LOG_TO_FILE: bool = True
+    LOG_FILE_NAME: str = "asp_bot.log"
+    LOG_FORMAT: str = "text"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+    
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
+    PROFILING_ENABLED: bool = False
+    PROFILING_DATA_PATH: str = "./data/profiling"
+    PROFILING_CONTROL_CHECK_SECONDS: float = 2.0
+    PROFILING_ROUTE: Optional[str] = None
+    PROFILING_SAMPLE_PERCENT: float = 1.0
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_STACKS: int = 20000
+    
+    LOOP_BLOCKING_DETECTION_ENABLED: bool = False
+    LOOP_BLOCKING_THRESHOLD_MS: float = 100.0
+    LOOP_BLOCKING_MAX_REPORTS: int = 100
+    LOOP_BLOCKING_STACK_DEPTH: int = 20
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
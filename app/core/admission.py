@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Any
+
+from fastapi import Header
+
+from app.config import settings
+from app.core.errors import ServiceOverloadedError
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest observation in the per-stage service time average
+SERVICE_TIME_SMOOTHING = 0.2
+
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+stage_limiters: Dict[str, "StageLimiter"] = {}
+
+
+class StageLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue_size: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.average_service_seconds = 0.0
+
+    def estimate_wait_seconds(self) -> float:
+        requests_ahead = self.in_flight + self.waiting
+        if requests_ahead < self.max_concurrency:
+            return 0.0
+        queue_position = requests_ahead - self.max_concurrency + 1
+        return queue_position / self.max_concurrency * self.average_service_seconds
+
+    def reject(self, reason: str, retry_after_seconds: float):
+        self.rejected += 1
+        retry_after = max(1, math.ceil(retry_after_seconds))
+        logger.warning(
+            "Shedding %s request: %s (in_flight=%d, waiting=%d, retry_after=%ds)",
+            self.name, reason, self.in_flight, self.waiting, retry_after,
+        )
+        raise ServiceOverloadedError(self.name, retry_after)
+
+    def record_service_time(self, elapsed_seconds: float):
+        if self.average_service_seconds == 0.0:
+            self.average_service_seconds = elapsed_seconds
+        else:
+            self.average_service_seconds += SERVICE_TIME_SMOOTHING * (
+                elapsed_seconds - self.average_service_seconds
+            )
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None):
+        now = time.monotonic()
+        estimated_wait = self.estimate_wait_seconds()
+
+        if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue_size:
+            self.reject("wait queue is full", estimated_wait)
+
+        # Only predict a miss for requests that would queue; with a free slot the
+        # request is admitted, so one slow call cannot lock the stage forever
+        if deadline is not None and estimated_wait > 0 and now + estimated_wait + self.average_service_seconds > deadline:
+            self.reject("deadline cannot be met", estimated_wait)
+
+        self.waiting += 1
+        try:
+            timeout = None if deadline is None else max(deadline - now, 0.0)
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.reject("deadline expired while queued", self.estimate_wait_seconds())
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            self.record_service_time(time.monotonic() - started_at)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_service_seconds": round(self.average_service_seconds, 4),
+        }
+
+
+def get_stage_limits() -> Dict[str, int]:
+    return {
+        "stt": settings.STT_MAX_CONCURRENCY,
+        "llm": settings.LLM_MAX_CONCURRENCY,
+        "tts": settings.TTS_MAX_CONCURRENCY,
+    }
+
+
+def get_stage_limiter(stage: str) -> StageLimiter:
+    limiter = stage_limiters.get(stage)
+
+    if limiter is None:
+        max_concurrency = get_stage_limits().get(stage, settings.STAGE_DEFAULT_MAX_CONCURRENCY)
+        limiter = StageLimiter(stage, max_concurrency, settings.STAGE_MAX_QUEUE_SIZE)
+        stage_limiters[stage] = limiter
+
+    return limiter
+
+
+@asynccontextmanager
+async def admit(stage: str):
+    async with get_stage_limiter(stage).slot(request_deadline.get()):
+        yield
+
+
+def start_request_deadline(timeout_seconds: Optional[float] = None) -> float:
+    if timeout_seconds is None or timeout_seconds <= 0:
+        timeout_seconds = settings.REQUEST_DEADLINE_SECONDS
+    else:
+        timeout_seconds = min(timeout_seconds, settings.REQUEST_DEADLINE_SECONDS)
+
+    deadline = time.monotonic() + timeout_seconds
+    request_deadline.set(deadline)
+    return deadline
+
+
+async def request_deadline_dependency(x_request_timeout: Optional[float] = Header(None)):
+    start_request_deadline(x_request_timeout)
+
+
+def get_admission_metrics() -> Dict[str, Dict[str, Any]]:
+    for stage in get_stage_limits():
+        get_stage_limiter(stage)
+
+    return {stage: limiter.metrics() for stage, limiter in stage_limiters.items()}
@@ -0,0 +1,489 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from app.config import settings
+from app.core.resilience import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# First byte of every stored value says how the rest is encoded
+VALUE_RAW = b"\x00"
+VALUE_ZLIB = b"\x01"
+
+MISSING = object()
+# Handed to coalesced waiters when the computing request was cancelled
+RETRY = object()
+
+cache_backend = None
+cache_backend_loaded = False
+caches: Dict[str, "Cache"] = {}
+
+
+class CacheBackend(ABC):
+    name = "base"
+    # Shared backends are seen by every replica, so they need a cross-replica fill lock
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        ...
+
+    @abstractmethod
+    async def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        # key -> (value, expires_at); least recently used first
+        self.entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def lookup(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        if entry[1] <= time.monotonic():
+            self.remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[0])
+
+    def store(self, key: str, value: bytes, ttl_seconds: float):
+        self.remove(key)
+        self.entries[key] = (value, time.monotonic() + ttl_seconds)
+        self.size_bytes += len(value)
+
+        while self.size_bytes > self.max_bytes and len(self.entries) > 1:
+            self.remove(next(iter(self.entries)))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            return self.lookup(key)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self.lock:
+            return [self.lookup(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        with self.lock:
+            self.store(key, value, ttl_seconds)
+
+    async def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        with self.lock:
+            if self.lookup(key) is not None:
+                return False
+            self.store(key, value, ttl_seconds)
+            return True
+
+    async def delete(self, key: str):
+        with self.lock:
+            self.remove(key)
+
+
+def encode_command(*arguments) -> bytes:
+    parts = [b"*%d\r\n" % len(arguments)]
+    for argument in arguments:
+        if not isinstance(argument, bytes):
+            argument = str(argument).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(argument), argument))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Cache server closed the connection")
+
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload
+    if kind == b"-":
+        raise RuntimeError(f"Cache server error: {payload.decode('utf-8', 'replace')}")
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+
+    raise ConnectionError(f"Unexpected reply from cache server: {line[:32]!r}")
+
+
+class RedisConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *arguments) -> Any:
+        self.writer.write(encode_command(*arguments))
+        await self.writer.drain()
+        return await read_reply(self.reader)
+
+    def close(self):
+        self.writer.close()
+
+
+class RedisClient:
+    def __init__(self, url: str, pool_size: int, timeout_seconds: float):
+        parsed_url = urlparse(url)
+        self.host = parsed_url.hostname or "localhost"
+        self.port = parsed_url.port or 6379
+        self.username = unquote(parsed_url.username) if parsed_url.username else None
+        self.password = unquote(parsed_url.password) if parsed_url.password else None
+        self.database = int(parsed_url.path.strip("/") or 0)
+        self.use_tls = parsed_url.scheme == "rediss"
+        self.timeout_seconds = timeout_seconds
+        self.idle_connections: List[RedisConnection] = []
+        self.connection_slots = asyncio.Semaphore(max(1, pool_size))
+
+    async def connect(self) -> RedisConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.use_tls or None)
+        connection = RedisConnection(reader, writer)
+
+        try:
+            if self.password is not None:
+                if self.username:
+                    await connection.execute("AUTH", self.username, self.password)
+                else:
+                    await connection.execute("AUTH", self.password)
+            if self.database:
+                await connection.execute("SELECT", self.database)
+        except BaseException:
+            connection.close()
+            raise
+
+        return connection
+
+    async def execute(self, *arguments, timeout_seconds: Optional[float] = None) -> Any:
+        async with self.connection_slots:
+            connection = self.idle_connections.pop() if self.idle_connections else None
+
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self.connect(), self.timeout_seconds)
+                reply = await asyncio.wait_for(connection.execute(*arguments), timeout_seconds or self.timeout_seconds)
+            except RuntimeError:
+                # An error reply leaves the connection in a clean state
+                if connection is not None:
+                    self.idle_connections.append(connection)
+                raise
+            except BaseException:
+                # A timeout can leave a reply in flight, so the connection cannot be reused
+                if connection is not None:
+                    connection.close()
+                raise
+
+            self.idle_connections.append(connection)
+            return reply
+
+    def close(self):
+        for connection in self.idle_connections:
+            connection.close()
+        self.idle_connections = []
+
+
+class RedisCacheBackend(CacheBackend):
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, pool_size: int, timeout_seconds: float):
+        self.client = RedisClient(url, pool_size, timeout_seconds)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.execute("GET", key)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.client.execute("MGET", *keys)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self.client.execute("SET", key, value, "PX", max(1, int(ttl_seconds * 1000)))
+
+    async def add(self, key: str, value: bytes, ttl_seconds: float) -> bool:
+        return await self.client.execute("SET", key, value, "PX", max(1, int(ttl_seconds * 1000)), "NX") is not None
+
+    async def delete(self, key: str):
+        await self.client.execute("DEL", key)
+
+    async def close(self):
+        self.client.close()
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.CACHE_MEMORY_MAX_BYTES)
+
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(
+            settings.CACHE_REDIS_URL,
+            settings.CACHE_REDIS_POOL_SIZE,
+            settings.CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+
+    if settings.CACHE_BACKEND != "none":
+        logger.error(f"Unknown cache backend {settings.CACHE_BACKEND}, caching is disabled")
+    return None
+
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    global cache_backend, cache_backend_loaded
+
+    if not cache_backend_loaded:
+        cache_backend = create_cache_backend()
+        cache_backend_loaded = True
+        if cache_backend is not None:
+            logger.info(f"Using {cache_backend.name} cache backend")
+
+    return cache_backend
+
+
+async def close_cache_backend():
+    global cache_backend, cache_backend_loaded
+
+    if cache_backend is not None:
+        await cache_backend.close()
+    cache_backend = None
+    cache_backend_loaded = False
+
+
+def encode_value(data: bytes, compress: bool) -> bytes:
+    if compress and len(data) >= settings.CACHE_COMPRESSION_MIN_BYTES:
+        compressed = zlib.compress(data, settings.CACHE_COMPRESSION_LEVEL)
+        # Already-compressed audio does not shrink; store it as is
+        if len(compressed) < len(data):
+            return VALUE_ZLIB + compressed
+    return VALUE_RAW + data
+
+
+def decode_value(stored: bytes) -> bytes:
+    if stored[:1] == VALUE_ZLIB:
+        return zlib.decompress(stored[1:])
+    return stored[1:]
+
+
+class Cache:
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        enabled: bool = True,
+        compress: bool = True,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.dumps = dumps
+        self.loads = loads
+        self.enabled = enabled
+        self.compress = compress
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        # A cache server that is down must not add its timeout to every request
+        self.breaker = CircuitBreaker(
+            settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            settings.CIRCUIT_BREAKER_RESET_SECONDS,
+        )
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "lock_waits": 0,
+            "stores": 0,
+            "errors": 0,
+            "short_circuited": 0,
+        }
+        caches[namespace] = self
+
+    def make_key(self, *parts) -> str:
+        digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+        return f"{settings.CACHE_KEY_PREFIX}:{self.namespace}:{digest}"
+
+    def get_backend(self) -> Optional[CacheBackend]:
+        if not self.enabled:
+            return None
+
+        backend = get_cache_backend()
+        if backend is not None and not self.breaker.allow_request():
+            self.metrics["short_circuited"] += 1
+            return None
+
+        return backend
+
+    async def call_backend(self, backend: CacheBackend, method: str, *arguments, default: Any = None) -> Any:
+        try:
+            result = await getattr(backend, method)(*arguments)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            self.metrics["errors"] += 1
+            self.breaker.record_failure()
+            logger.warning("Cache %s %s failed: %s", self.namespace, method, error)
+            return default
+
+        self.breaker.record_success()
+        return result
+
+    def decode(self, stored: Optional[bytes]) -> Any:
+        if stored is None:
+            return MISSING
+
+        try:
+            return self.loads(decode_value(stored))
+        except Exception:
+            self.metrics["errors"] += 1
+            logger.warning("Discarding undecodable %s cache entry", self.namespace)
+            return MISSING
+
+    async def get(self, key: str) -> Any:
+        backend = self.get_backend()
+        if backend is None:
+            return MISSING
+
+        value = self.decode(await self.call_backend(backend, "get", key))
+        self.metrics["hits" if value is not MISSING else "misses"] += 1
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Any]:
+        backend = self.get_backend()
+        if backend is None:
+            return [MISSING] * len(keys)
+
+        stored_values = await self.call_backend(backend, "get_many", keys, default=[None] * len(keys))
+        values = [self.decode(stored) for stored in stored_values]
+        for value in values:
+            self.metrics["hits" if value is not MISSING else "misses"] += 1
+        return values
+
+    async def set(self, key: str, value: Any):
+        backend = self.get_backend()
+        if backend is None:
+            return
+
+        try:
+            stored = encode_value(self.dumps(value), self.compress)
+        except Exception:
+            self.metrics["errors"] += 1
+            logger.exception(f"Failed to encode {self.namespace} cache entry")
+            return
+
+        if await self.call_backend(backend, "set", key, stored, self.ttl_seconds, default=MISSING) is not MISSING:
+            self.metrics["stores"] += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await self.get(key)
+        if value is not MISSING:
+            return value
+
+        if self.get_backend() is None:
+            return await compute()
+
+        # Concurrent misses in this process share one computation
+        in_flight = self.in_flight.get(key)
+        if in_flight is not None:
+            self.metrics["coalesced"] += 1
+            value = await asyncio.shield(in_flight)
+            if value is not RETRY:
+                return value
+            return await self.fill(key, compute)
+
+        in_flight = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = in_flight
+        try:
+            value = await self.fill(key, compute)
+        except asyncio.CancelledError:
+            in_flight.set_result(RETRY)
+            raise
+        except BaseException as error:
+            in_flight.set_exception(error)
+            # Waiters re-raise it; nobody else needs to see it logged as unretrieved
+            in_flight.exception()
+            raise
+        else:
+            in_flight.set_result(value)
+        finally:
+            if self.in_flight.get(key) is in_flight:
+                del self.in_flight[key]
+
+        return value
+
+    async def fill(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        backend = self.get_backend()
+        lock_key = f"{key}:lock"
+        locked = False
+
+        # Other replicas may be computing the same value; wait for theirs instead
+        if backend is not None and backend.shared:
+            locked = await self.call_backend(backend, "add", lock_key, b"1", settings.CACHE_LOCK_SECONDS, default=None)
+            if locked is False:
+                value = await self.wait_for_fill(backend, key)
+                if value is not MISSING:
+                    return value
+
+        try:
+            value = await compute()
+            await self.set(key, value)
+        finally:
+            if locked:
+                await self.call_backend(backend, "delete", lock_key)
+
+        return value
+
+    async def wait_for_fill(self, backend: CacheBackend, key: str) -> Any:
+        self.metrics["lock_waits"] += 1
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_SECONDS
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_SECONDS)
+            value = self.decode(await self.call_backend(backend, "get", key))
+            if value is not MISSING:
+                self.metrics["hits"] += 1
+                return value
+
+        # The other replica is slow or died holding the lock; compute it here
+        logger.info("Gave up waiting for another replica to fill the %s cache", self.namespace)
+        return MISSING
+
+
+def get_cache_metrics() -> Dict[str, Dict[str, int]]:
+    return {namespace: dict(cache.metrics) for namespace, cache in caches.items()}
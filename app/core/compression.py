@@ -0,0 +1,114 @@
+import asyncio
+import gzip
+import logging
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/")
+
+# Bodies above this size are compressed off the event loop
+THREADED_COMPRESSION_BYTES = 65536
+
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for entry in accept_encoding.split(","):
+        name, _, parameters = entry.strip().partition(";")
+        quality = 1.0
+        if parameters.strip().startswith("q="):
+            try:
+                quality = float(parameters.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    if brotli is not None and accepted.get("br", 0.0) > 0:
+        return "br"
+    if accepted.get("gzip", 0.0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await CompressionResponder(self, encoding, send).run(scope, receive)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Hold the headers until the body shows whether compression pays off
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self.send(message)
+            return
+
+        start_message, self.start_message = self.start_message, None
+        body = message.get("body", b"")
+
+        # Streamed responses (e.g. batch results) go out uncompressed so
+        # each line reaches the client as soon as it is produced
+        if self.passthrough or message.get("more_body", False) or len(body) < self.middleware.minimum_size:
+            await self.send(start_message)
+            await self.send(message)
+            return
+
+        if len(body) >= THREADED_COMPRESSION_BYTES:
+            compressed_body = await asyncio.to_thread(self.middleware.compress, body, self.encoding)
+        else:
+            compressed_body = self.middleware.compress(body, self.encoding)
+
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed_body))
+        headers.add_vary_header("Accept-Encoding")
+
+        await self.send(start_message)
+        await self.send({"type": "http.response.body", "body": compressed_body, "more_body": False})
@@ -1,6 +1,9 @@
 import logging
+import math
+from typing import Dict, Optional
+
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
@@ -8,9 +11,10 @@ logger = logging.getLogger(__name__)
 
 
 class ASPBotException(Exception):
-    def __init__(self, message: str, status_code: int = 500):
+    def __init__(self, message: str, status_code: int = 500, headers: Optional[Dict[str, str]] = None):
         self.message = message
         self.status_code = status_code
+        self.headers = headers
         super().__init__(self.message)
 
 
@@ -34,11 +38,65 @@ class WakeWordError(ASPBotException):
         super().__init__(message, status_code=500)
 
 
+class WakeWordStreamNotFoundError(ASPBotException):
+    def __init__(self, session_id: str):
+        super().__init__(f"Wake word stream {session_id} does not exist or has expired", status_code=404)
+
+
+class JobNotFoundError(ASPBotException):
+    def __init__(self, job_id: str):
+        super().__init__(f"Job {job_id} does not exist or has expired", status_code=404)
+
+
+class CallbackNotAllowedError(ASPBotException):
+    def __init__(self, callback_url: str):
+        super().__init__(f"Callback URL {callback_url} is not an allowed https endpoint", status_code=400)
+
+
+class IngestionError(ASPBotException):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message, status_code=status_code)
+
+
+class AudioFormatError(ASPBotException):
+    def __init__(self, message: str):
+        super().__init__(message, status_code=400)
+
+
+class BatchTooLargeError(ASPBotException):
+    def __init__(self, item_count: int, max_items: int):
+        super().__init__(
+            f"Batch has {item_count} items; at most {max_items} are allowed per request",
+            status_code=413,
+        )
+
+
 class RAGError(ASPBotException):
     def __init__(self, message: str):
         super().__init__(message, status_code=500)
 
 
+class ServiceOverloadedError(ASPBotException):
+    def __init__(self, stage: str, retry_after_seconds: int, message: Optional[str] = None):
+        self.stage = stage
+        self.retry_after_seconds = retry_after_seconds
+        super().__init__(
+            message or f"Service is overloaded ({stage}), please retry later",
+            status_code=503,
+            headers={"Retry-After": str(retry_after_seconds)},
+        )
+
+
+class UpstreamUnavailableError(ServiceOverloadedError):
+    def __init__(self, upstream: str, retry_after_seconds: float):
+        retry_after = max(1, math.ceil(retry_after_seconds))
+        super().__init__(
+            upstream,
+            retry_after,
+            message=f"Upstream service {upstream} is unavailable, please retry later",
+        )
+
+
 class NoRelevantDocumentsError(ASPBotException):
     def __init__(self):
         super().__init__(
@@ -49,15 +107,16 @@ class NoRelevantDocumentsError(ASPBotException):
 
 async def asp_bot_exception_handler(request: Request, exc: ASPBotException):
     logger.error(f"ASP Bot exception: {exc.message}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.message},
+        headers=exc.headers,
     )
 
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     logger.error(f"HTTP exception: {exc.detail}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
     )
@@ -65,7 +124,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error(f"Validation error: {exc.errors()}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": exc.errors()},
     )
@@ -1,41 +1,154 @@
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
 
 from app.config import settings
 
 logs_dir = Path("logs")
 logs_dir.mkdir(exist_ok=True)
 
-def setup_logging():
+STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+log_listener = None
+
+logging_metrics = {"dropped": 0, "sampled_out": 0}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        log_entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        # Anything passed through extra= becomes a top-level field
+        for attribute, value in vars(record).items():
+            if attribute not in STANDARD_RECORD_ATTRIBUTES and not attribute.startswith("_"):
+                log_entry[attribute] = value
+
+        if record.exc_info:
+            log_entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(log_entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rates):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Warnings and errors are never sampled away
+        if record.levelno >= logging.WARNING:
+            return True
+
+        # Decide once per record so every handler keeps or drops it together
+        keep = getattr(record, "_sampling_keep", None)
+        if keep is None:
+            sample_rate = self.sample_rates.get(record.name)
+            keep = sample_rate is None or random.random() < sample_rate
+            record._sampling_keep = keep
+            if not keep:
+                logging_metrics["sampled_out"] += 1
+
+        return keep
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Leave message and traceback formatting to the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # A stalled disk drops log lines rather than delaying requests
+            logging_metrics["dropped"] += 1
+
+
+def build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JSONFormatter()
+    return logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s", "%Y-%m-%d %H:%M:%S")
+
+
+def setup_logging(log_to_file: Optional[bool] = None):
+    global log_listener
+
     log_level = logging.DEBUG if settings.DEBUG else logging.INFO
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-    
+
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    
+
+    shutdown_logging()
     root_logger.handlers = []
-    
+
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
-    console_formatter = logging.Formatter(log_format, date_format)
-    console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
-    
-    file_handler = RotatingFileHandler(
-        logs_dir / "asp_bot.log",
-        maxBytes=10485760,
-        backupCount=5,
-        encoding="utf-8",
-    )
-    file_handler.setLevel(log_level)
-    file_formatter = logging.Formatter(log_format, date_format)
-    file_handler.setFormatter(file_formatter)
-    root_logger.addHandler(file_handler)
-    
+    console_handler.setFormatter(build_formatter())
+
+    handlers = [console_handler]
+
+    # Only one process may own a rotating file: a second one keeps writing to
+    # the renamed file after a rollover and overwrites the backups on its own
+    if settings.LOG_TO_FILE if log_to_file is None else log_to_file:
+        file_handler = RotatingFileHandler(
+            logs_dir / settings.LOG_FILE_NAME,
+            maxBytes=10485760,
+            backupCount=5,
+            encoding="utf-8",
+        )
+        file_handler.setLevel(log_level)
+        file_handler.setFormatter(build_formatter())
+        handlers.append(file_handler)
+
+    if settings.LOG_ASYNC:
+        queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        queue_handler.setLevel(log_level)
+        queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+        root_logger.addHandler(queue_handler)
+
+        log_listener = QueueListener(
+            queue_handler.queue,
+            *handlers,
+            respect_handler_level=True,
+        )
+        log_listener.start()
+    else:
+        sampling_filter = SamplingFilter(settings.LOG_SAMPLE_RATES)
+        for handler in handlers:
+            handler.addFilter(sampling_filter)
+            root_logger.addHandler(handler)
+
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
     logging.getLogger("fastapi").setLevel(logging.WARNING)
-    
-    return root_logger
\ No newline at end of file
+
+    return root_logger
+
+
+def shutdown_logging():
+    global log_listener
+
+    # Flushes whatever is still queued before the process exits
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logging_metrics():
+    metrics = dict(logging_metrics)
+    metrics["queued"] = log_listener.queue.qsize() if log_listener is not None else 0
+    return metrics
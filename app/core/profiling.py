@@ -0,0 +1,462 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTROL_FILENAME = "control.json"
+STACKS_SUFFIX = ".folded"
+BLOCKING_SUFFIX = ".blocking.json"
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def await_stack(coroutine) -> List[str]:
+    # Follow the chain of awaits from the task's coroutine down to the
+    # future it is suspended on
+    stack = []
+    while coroutine is not None:
+        frame = getattr(coroutine, "cr_frame", None) or getattr(coroutine, "gi_frame", None) or getattr(coroutine, "ag_frame", None)
+        if frame is None:
+            stack.append(f"[await {type(coroutine).__name__}]")
+            break
+        stack.append(frame_label(frame.f_code))
+        coroutine = getattr(coroutine, "cr_await", None) or getattr(coroutine, "gi_yieldfrom", None) or getattr(coroutine, "ag_await", None)
+    return stack
+
+
+def running_stack(frame, outermost_frame) -> Optional[List[str]]:
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame.f_code))
+        if frame is outermost_frame:
+            stack.reverse()
+            return stack
+        frame = frame.f_back
+    return None
+
+
+def thread_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(f"{frame_label(frame.f_code)} line {frame.f_lineno}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.route = None
+        self.sample_percent = 0.0
+        self.interval_seconds = 0.005
+        self.active_requests: Dict[asyncio.Task, str] = {}
+        self.stacks = Counter()
+        self.stacks_lock = threading.Lock()
+        self.stacks_changed = False
+        self.profiled_requests = 0
+        self.samples = 0
+        self.dropped_samples = 0
+        self.loop = None
+        self.loop_thread_id = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def configure(self, loop, loop_thread_id: int, enabled: bool, route: Optional[str], sample_percent: float, interval_ms: float):
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.route = route
+        self.sample_percent = sample_percent
+        self.interval_seconds = max(interval_ms, 1.0) / 1000
+        self.enabled = enabled
+
+        if enabled and self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="request-profiler", daemon=True)
+            self.thread.start()
+        elif not enabled and self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def should_profile(self, path: str) -> bool:
+        if not self.enabled:
+            return False
+        if self.route is not None and not path.startswith(self.route):
+            return False
+        return random.random() * 100 < self.sample_percent
+
+    def track(self, task: asyncio.Task, label: str):
+        self.profiled_requests += 1
+        self.active_requests[task] = label
+
+    def untrack(self, task: asyncio.Task):
+        self.active_requests.pop(task, None)
+
+    def sample(self):
+        active_requests = self.active_requests.copy()
+        if not active_requests:
+            return
+
+        running_task = asyncio.current_task(self.loop)
+        loop_frame = sys._current_frames().get(self.loop_thread_id)
+
+        samples = []
+        for task, label in active_requests.items():
+            if task.done():
+                continue
+
+            coroutine = task.get_coro()
+            stack = None
+            if task is running_task:
+                stack = running_stack(loop_frame, coroutine.cr_frame)
+            if stack is None:
+                # Suspended: the time goes to whatever the request is awaiting
+                stack = await_stack(coroutine)
+            samples.append(";".join([label, *stack]))
+
+        with self.stacks_lock:
+            for folded_stack in samples:
+                if folded_stack in self.stacks or len(self.stacks) < settings.PROFILING_MAX_STACKS:
+                    self.stacks[folded_stack] += 1
+                    self.samples += 1
+                else:
+                    self.dropped_samples += 1
+            self.stacks_changed = True
+
+    def run(self):
+        while not self.stop_event.wait(self.interval_seconds):
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Profiler sample failed")
+
+    def folded(self) -> str:
+        with self.stacks_lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+    def reset(self):
+        with self.stacks_lock:
+            self.stacks.clear()
+            self.stacks_changed = True
+        self.profiled_requests = 0
+        self.samples = 0
+        self.dropped_samples = 0
+
+
+class LoopBlockingDetector:
+    def __init__(self):
+        self.enabled = False
+        self.threshold_seconds = 0.1
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_heartbeat = 0.0
+        self.heartbeat_handle = None
+        self.open_report = None
+        self.reports = deque(maxlen=settings.LOOP_BLOCKING_MAX_REPORTS)
+        self.reports_changed = False
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def configure(self, loop, loop_thread_id: int, enabled: bool, threshold_ms: float):
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.threshold_seconds = max(threshold_ms, 1.0) / 1000
+
+        if enabled and not self.enabled:
+            self.enabled = True
+            self.last_heartbeat = time.monotonic()
+            loop.call_soon_threadsafe(self.restart_heartbeat)
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="loop-blocking-detector", daemon=True)
+            self.thread.start()
+        elif not enabled and self.enabled:
+            self.enabled = False
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def restart_heartbeat(self):
+        if self.heartbeat_handle is not None:
+            self.heartbeat_handle.cancel()
+        self.heartbeat()
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.threshold_seconds / 4
+
+    def heartbeat(self):
+        self.last_heartbeat = time.monotonic()
+        if self.enabled:
+            self.heartbeat_handle = self.loop.call_later(self.heartbeat_interval, self.heartbeat)
+
+    def check(self):
+        # Time past the moment the next heartbeat was due
+        blocked_seconds = max(0.0, time.monotonic() - self.last_heartbeat - self.heartbeat_interval)
+
+        if blocked_seconds < self.threshold_seconds:
+            if self.open_report is not None:
+                logger.warning(
+                    "Event loop was blocked for %.0f ms by %s",
+                    self.open_report["duration_ms"],
+                    self.open_report["task"],
+                )
+                self.open_report = None
+            return
+
+        if self.open_report is not None:
+            self.open_report["duration_ms"] = blocked_seconds * 1000
+            self.reports_changed = True
+            return
+
+        # Capture the stack while the loop is still stuck in it
+        running_task = asyncio.current_task(self.loop)
+        stack = thread_stack(sys._current_frames().get(self.loop_thread_id))
+        self.open_report = {
+            "pid": os.getpid(),
+            "started_at": time.time() - blocked_seconds,
+            "duration_ms": blocked_seconds * 1000,
+            "task": running_task.get_coro().__qualname__ if running_task is not None else None,
+            "stack": stack,
+        }
+        self.reports.append(self.open_report)
+        self.reports_changed = True
+
+        logger.warning(
+            "Event loop blocked for more than %.0f ms by %s:\n%s",
+            self.threshold_seconds * 1000,
+            self.open_report["task"],
+            "\n".join(stack[-settings.LOOP_BLOCKING_STACK_DEPTH:]),
+        )
+
+    def run(self):
+        while not self.stop_event.wait(self.heartbeat_interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Event loop blocking check failed")
+
+
+class ProfilingSupervisor:
+    # Every worker follows the shared control file, so one admin request
+    # reaches all of them without a redeploy
+    def __init__(self, profiler: RequestProfiler, detector: LoopBlockingDetector):
+        self.profiler = profiler
+        self.detector = detector
+        self.loop = None
+        self.loop_thread_id = None
+        self.control_mtime = None
+        self.generation = 0
+        self.control_lock = threading.Lock()
+        # The supervisor thread and admin requests both flush through the same staging files
+        self.flush_lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self, loop):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        profiling_data_path().mkdir(parents=True, exist_ok=True)
+
+        self.apply_control()
+        self.thread = threading.Thread(target=self.run, name="profiling-supervisor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.profiler.configure(self.loop, self.loop_thread_id, False, None, 0.0, 1.0)
+        self.detector.configure(self.loop, self.loop_thread_id, False, 1.0)
+        self.flush()
+
+    def apply_control(self):
+        with self.control_lock:
+            self.apply_control_locked()
+
+    def apply_control_locked(self):
+        control_path = profiling_data_path() / CONTROL_FILENAME
+        try:
+            control_mtime = control_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            control_mtime = None
+
+        if control_mtime == self.control_mtime and self.control_mtime is not None:
+            return
+        self.control_mtime = control_mtime
+
+        control = read_profiling_control()
+        if control["generation"] != self.generation:
+            self.generation = control["generation"]
+            self.profiler.reset()
+            self.detector.reports.clear()
+
+        self.profiler.configure(
+            self.loop,
+            self.loop_thread_id,
+            control["profiling_enabled"],
+            control["route"],
+            control["sample_percent"],
+            control["interval_ms"],
+        )
+        self.detector.configure(
+            self.loop,
+            self.loop_thread_id,
+            control["blocking_detection_enabled"],
+            control["blocking_threshold_ms"],
+        )
+
+    def flush(self):
+        data_path = profiling_data_path()
+        worker_id = str(os.getpid())
+
+        with self.flush_lock:
+            if self.profiler.stacks_changed:
+                self.profiler.stacks_changed = False
+                write_atomically(data_path / (worker_id + STACKS_SUFFIX), self.profiler.folded())
+
+            if self.detector.reports_changed:
+                self.detector.reports_changed = False
+                write_atomically(data_path / (worker_id + BLOCKING_SUFFIX), json.dumps(list(self.detector.reports)))
+
+    def run(self):
+        while not self.stop_event.wait(settings.PROFILING_CONTROL_CHECK_SECONDS):
+            try:
+                self.apply_control()
+                self.flush()
+            except Exception:
+                logger.exception("Profiling supervisor iteration failed")
+
+
+request_profiler = RequestProfiler()
+loop_blocking_detector = LoopBlockingDetector()
+profiling_supervisor = ProfilingSupervisor(request_profiler, loop_blocking_detector)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not request_profiler.should_profile(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        request_profiler.track(task, f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_profiler.untrack(task)
+
+
+def profiling_data_path() -> Path:
+    return Path(settings.PROFILING_DATA_PATH)
+
+
+def write_atomically(path: Path, content: str):
+    staging_path = path.with_name(path.name + ".tmp")
+    staging_path.write_text(content, encoding="utf-8")
+    os.replace(staging_path, path)
+
+
+def read_profiling_control() -> Dict[str, Any]:
+    control = {
+        "generation": 0,
+        "profiling_enabled": settings.PROFILING_ENABLED,
+        "route": settings.PROFILING_ROUTE,
+        "sample_percent": settings.PROFILING_SAMPLE_PERCENT,
+        "interval_ms": settings.PROFILING_INTERVAL_MS,
+        "blocking_detection_enabled": settings.LOOP_BLOCKING_DETECTION_ENABLED,
+        "blocking_threshold_ms": settings.LOOP_BLOCKING_THRESHOLD_MS,
+    }
+
+    control_path = profiling_data_path() / CONTROL_FILENAME
+    if control_path.exists():
+        with open(control_path, "r", encoding="utf-8") as control_file:
+            control.update(json.load(control_file))
+
+    return control
+
+
+def update_profiling_control(**changes) -> Dict[str, Any]:
+    control = read_profiling_control()
+    control.update(changes)
+
+    profiling_data_path().mkdir(parents=True, exist_ok=True)
+    write_atomically(profiling_data_path() / CONTROL_FILENAME, json.dumps(control))
+
+    # This worker applies it now; the others within PROFILING_CONTROL_CHECK_SECONDS
+    if profiling_supervisor.loop is not None:
+        profiling_supervisor.apply_control()
+
+    logger.info("Profiling control updated: %s", changes)
+    return control
+
+
+def reset_profiling_data():
+    control = read_profiling_control()
+    update_profiling_control(generation=control["generation"] + 1)
+
+    for data_file in profiling_data_path().glob("*"):
+        if data_file.name.endswith((STACKS_SUFFIX, BLOCKING_SUFFIX)):
+            data_file.unlink(missing_ok=True)
+
+
+def collect_flame_graph() -> str:
+    profiling_supervisor.flush()
+
+    # Merge every worker's collapsed stacks into one flame graph
+    merged_stacks = Counter()
+    for stacks_file in profiling_data_path().glob("*" + STACKS_SUFFIX):
+        for line in stacks_file.read_text(encoding="utf-8").splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack:
+                merged_stacks[stack] += int(count)
+
+    return "".join(f"{stack} {count}\n" for stack, count in merged_stacks.most_common())
+
+
+def collect_blocking_reports() -> List[Dict[str, Any]]:
+    profiling_supervisor.flush()
+
+    reports = []
+    for reports_file in profiling_data_path().glob("*" + BLOCKING_SUFFIX):
+        reports.extend(json.loads(reports_file.read_text(encoding="utf-8")))
+
+    return sorted(reports, key=lambda report: report["started_at"], reverse=True)
+
+
+def get_profiling_status() -> Dict[str, Any]:
+    return {
+        **read_profiling_control(),
+        "worker_pid": os.getpid(),
+        "profiled_requests": request_profiler.profiled_requests,
+        "samples": request_profiler.samples,
+        "dropped_samples": request_profiler.dropped_samples,
+        "stacks": len(request_profiler.stacks),
+    }
+
+
+def start_profiling(loop):
+    profiling_supervisor.start(loop)
+
+
+def stop_profiling():
+    profiling_supervisor.stop()
@@ -0,0 +1,359 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.core.admission import request_deadline
+from app.core.errors import UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+}
+
+# Extra wait after the attempt timeout, so an SDK given the same timeout can
+# fail on its own and free its thread before the attempt is abandoned
+SDK_TIMEOUT_GRACE_SECONDS = 1.0
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+upstream_states: Dict[str, "UpstreamState"] = {}
+upstream_states_lock = threading.Lock()
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def retry_after_seconds(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout_seconds - time.monotonic())
+
+    def allow_request(self) -> bool:
+        if self.state == CIRCUIT_CLOSED:
+            return True
+
+        if self.state == CIRCUIT_OPEN and self.retry_after_seconds() <= 0:
+            self.state = CIRCUIT_HALF_OPEN
+            self.trial_in_flight = False
+
+        if self.state == CIRCUIT_HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+
+        return False
+
+    def record_success(self):
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = CIRCUIT_OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    def __init__(self, window_size: int):
+        self.samples: Deque[float] = deque(maxlen=max(1, window_size))
+
+    def record(self, elapsed_seconds: float):
+        self.samples.append(elapsed_seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class UpstreamState:
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            settings.CIRCUIT_BREAKER_RESET_SECONDS,
+        )
+        self.latency = LatencyTracker(settings.HEDGING_WINDOW_SIZE)
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.short_circuited = 0
+        self.abandoned = 0
+        self.running_threads = 0
+        self.threads_lock = threading.Lock()
+        # Its own bounded pool: calls that outlive their timeout keep a thread
+        # busy, and must not starve the default executor Chroma and file I/O use
+        self.max_threads = max(1, settings.UPSTREAM_MAX_THREADS)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_threads,
+            thread_name_prefix=f"upstream-{name}",
+        )
+
+    def run_in_thread(self, func: Callable, *args, **kwargs) -> Any:
+        with self.threads_lock:
+            self.running_threads += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self.threads_lock:
+                self.running_threads -= 1
+
+    def has_idle_thread(self) -> bool:
+        return self.running_threads < self.max_threads
+
+    def hedge_delay_seconds(self) -> Optional[float]:
+        if len(self.latency.samples) < settings.HEDGING_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(settings.HEDGING_LATENCY_PERCENTILE)
+
+    def metrics(self) -> Dict[str, Any]:
+        p95_seconds = self.latency.percentile(95)
+        return {
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "short_circuited": self.short_circuited,
+            "abandoned": self.abandoned,
+            "running_threads": self.running_threads,
+            "p95_seconds": round(p95_seconds, 4) if p95_seconds is not None else None,
+        }
+
+
+def get_upstream_state(upstream: str) -> UpstreamState:
+    with upstream_states_lock:
+        state = upstream_states.get(upstream)
+        if state is None:
+            state = UpstreamState(upstream)
+            upstream_states[upstream] = state
+        return state
+
+
+def get_upstream_timeout(upstream: str) -> float:
+    upstream_timeouts = {
+        "whisper": settings.STT_TIMEOUT_SECONDS,
+        "openai_chat": settings.LLM_TIMEOUT_SECONDS,
+        "openai_embeddings": settings.EMBEDDING_TIMEOUT_SECONDS,
+        "azure_tts": settings.TTS_TIMEOUT_SECONDS,
+    }
+    return upstream_timeouts.get(upstream, settings.UPSTREAM_DEFAULT_TIMEOUT_SECONDS)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def remaining_deadline_seconds() -> Optional[float]:
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def compute_backoff_seconds(attempt: int) -> float:
+    # Full jitter keeps retries from many requests from lining up
+    ceiling = min(
+        settings.UPSTREAM_RETRY_MAX_DELAY_SECONDS,
+        settings.UPSTREAM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt),
+    )
+    return random.uniform(0, ceiling)
+
+
+def ensure_circuit_allows(state: UpstreamState):
+    if not state.breaker.allow_request():
+        state.short_circuited += 1
+        raise UpstreamUnavailableError(state.name, state.breaker.retry_after_seconds())
+
+
+async def run_attempt(
+    state: UpstreamState,
+    func: Callable,
+    args,
+    kwargs,
+    timeout_seconds: float,
+    timeout_keyword: Optional[str],
+    attempts: List[Future],
+) -> Any:
+    started_at = time.monotonic()
+    state.calls += 1
+
+    wait_seconds = timeout_seconds
+    if timeout_keyword is not None:
+        kwargs = {**kwargs, timeout_keyword: timeout_seconds}
+        wait_seconds += SDK_TIMEOUT_GRACE_SECONDS
+
+    context = contextvars.copy_context()
+    attempt = state.executor.submit(context.run, partial(state.run_in_thread, func, *args, **kwargs))
+    attempts.append(attempt)
+
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(attempt), wait_seconds)
+    except asyncio.CancelledError:
+        raise
+    except Exception as error:
+        state.failures += 1
+        if isinstance(error, asyncio.TimeoutError):
+            state.timeouts += 1
+            # Cancelling only helps while the call is still queued for a thread
+            if not attempt.cancel():
+                state.abandoned += 1
+        # Only transient upstream failures count against the circuit; a
+        # rejected request still proves the upstream is responsive
+        if is_retryable_error(error):
+            state.breaker.record_failure()
+        else:
+            state.breaker.record_success()
+        raise
+
+    state.latency.record(time.monotonic() - started_at)
+    state.breaker.record_success()
+    return result
+
+
+async def run_hedged_attempt(
+    state: UpstreamState,
+    func: Callable,
+    args,
+    kwargs,
+    timeout_seconds: float,
+    timeout_keyword: Optional[str],
+    attempts: List[Future],
+) -> Any:
+    hedge_delay = state.hedge_delay_seconds()
+    primary = asyncio.ensure_future(run_attempt(state, func, args, kwargs, timeout_seconds, timeout_keyword, attempts))
+
+    if hedge_delay is None or hedge_delay >= timeout_seconds:
+        return await primary
+
+    done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+    if done:
+        return primary.result()
+
+    # A hedge that has to queue for a thread cannot beat the primary
+    if not state.has_idle_thread() or not state.breaker.allow_request():
+        return await primary
+
+    state.hedges += 1
+    logger.info("Hedging %s call after %.3fs", state.name, hedge_delay)
+    hedge = asyncio.ensure_future(
+        run_attempt(state, func, args, kwargs, timeout_seconds - hedge_delay, timeout_keyword, attempts)
+    )
+
+    pending = {primary, hedge}
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise last_error
+
+
+async def call_upstream(
+    upstream: str,
+    func: Callable,
+    *args,
+    idempotent: bool = True,
+    hedge: Optional[bool] = None,
+    timeout_seconds: Optional[float] = None,
+    timeout_keyword: Optional[str] = None,
+    **kwargs,
+) -> Any:
+    # timeout_keyword names the SDK call's own per-request timeout argument, so
+    # a timed-out attempt stops in the SDK instead of holding its thread
+    state = get_upstream_state(upstream)
+    per_call_timeout = timeout_seconds or get_upstream_timeout(upstream)
+    max_attempts = 1 + (settings.UPSTREAM_MAX_RETRIES if idempotent else 0)
+    use_hedging = idempotent and (settings.HEDGING_ENABLED if hedge is None else hedge)
+
+    last_error: Optional[BaseException] = None
+    attempts: List[Future] = []
+
+    for attempt in range(max_attempts):
+        ensure_circuit_allows(state)
+
+        attempt_timeout = per_call_timeout
+        remaining = remaining_deadline_seconds()
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            attempt_timeout = min(attempt_timeout, remaining)
+
+        try:
+            if use_hedging:
+                return await run_hedged_attempt(state, func, args, kwargs, attempt_timeout, timeout_keyword, attempts)
+            return await run_attempt(state, func, args, kwargs, attempt_timeout, timeout_keyword, attempts)
+        except UpstreamUnavailableError:
+            raise
+        except Exception as error:
+            last_error = error
+            if attempt + 1 >= max_attempts or not is_retryable_error(error):
+                break
+
+            # Another attempt would pile a second call onto one that is still running
+            if not all(earlier_attempt.done() for earlier_attempt in attempts):
+                logger.warning("Not retrying %s call: the timed-out attempt is still running", upstream)
+                break
+
+            backoff_seconds = compute_backoff_seconds(attempt)
+            remaining = remaining_deadline_seconds()
+            if remaining is not None and backoff_seconds >= remaining:
+                break
+
+            state.retries += 1
+            logger.warning(
+                "Retrying %s call after %s (attempt %d/%d, backoff %.2fs)",
+                upstream, type(error).__name__, attempt + 2, max_attempts, backoff_seconds,
+            )
+            await asyncio.sleep(backoff_seconds)
+
+    if last_error is None:
+        last_error = asyncio.TimeoutError(f"Request deadline exceeded before calling {upstream}")
+    if isinstance(last_error, asyncio.TimeoutError):
+        raise TimeoutError(f"{upstream} call timed out") from last_error
+    raise last_error
+
+
+def get_upstream_metrics() -> Dict[str, Dict[str, Any]]:
+    with upstream_states_lock:
+        states = list(upstream_states.values())
+    return {state.name: state.metrics() for state in states}
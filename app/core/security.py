@@ -1,9 +1,13 @@
+import hmac
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any
+from typing import Optional, Union, Any, Tuple
 
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import ValidationError
@@ -15,7 +19,15 @@ logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+api_key_scheme = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+# Verified tokens keyed by the raw JWT string; each entry holds (user, exp timestamp)
+verified_token_cache: "OrderedDict[str, Tuple[User, int]]" = OrderedDict()
+verified_token_cache_lock = threading.Lock()
+
+api_key_user = None
 
 
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -37,20 +49,88 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+def verify_api_key(api_key: Optional[str]) -> bool:
+    if not api_key or not settings.API_KEY:
+        return False
+    return hmac.compare_digest(api_key.encode("utf-8"), settings.API_KEY.encode("utf-8"))
+
+
+def get_api_key_user() -> User:
+    global api_key_user
+    
+    if api_key_user is None:
+        api_key_user = User(
+            id=settings.API_KEY_USER_ID,
+            is_active=True,
+            is_superuser=False,
+        )
+    
+    return api_key_user
+
+
+def get_cached_token_user(token: str) -> Optional[User]:
+    with verified_token_cache_lock:
+        cached_entry = verified_token_cache.get(token)
+        if cached_entry is None:
+            return None
+        
+        user, expires_at = cached_entry
+        if expires_at <= time.time():
+            del verified_token_cache[token]
+            return None
+        
+        verified_token_cache.move_to_end(token)
+        return user
+
+
+def cache_verified_token(token: str, user: User, expires_at: int):
+    if settings.TOKEN_CACHE_MAX_SIZE <= 0:
+        return
+    
+    with verified_token_cache_lock:
+        verified_token_cache[token] = (user, expires_at)
+        verified_token_cache.move_to_end(token)
+        
+        while len(verified_token_cache) > settings.TOKEN_CACHE_MAX_SIZE:
+            verified_token_cache.popitem(last=False)
+
+
+def clear_token_cache():
+    with verified_token_cache_lock:
+        verified_token_cache.clear()
+
+
+async def get_current_user(
+    token: Optional[str] = Depends(oauth2_scheme),
+    api_key: Optional[str] = Depends(api_key_scheme),
+) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Trusted kiosk devices authenticate with a shared key and skip JWT work entirely
+    if api_key is not None:
+        if verify_api_key(api_key):
+            return get_api_key_user()
+        logger.warning("Authentication failed: Invalid API key provided")
+        raise credentials_exception
+    
+    if not token:
+        raise credentials_exception
+    
+    cached_user = get_cached_token_user(token)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
         token_data = TokenPayload(**payload)
         
-        if datetime.fromtimestamp(token_data.exp) < datetime.now():
+        if token_data.exp is None or token_data.exp <= time.time():
             raise credentials_exception
             
     except (JWTError, ValidationError):
@@ -66,6 +146,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     
     if not user:
         raise credentials_exception
+    
+    cache_verified_token(token, user, token_data.exp)
         
     return user
 
@@ -1,10 +1,21 @@
+import asyncio
 import logging
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import settings
-from app.core.logging import setup_logging
-from app.api.routes import voice, health
+from app.core.admission import request_deadline_dependency
+from app.core.cache import close_cache_backend
+from app.core.compression import CompressionMiddleware
+from app.core.errors import register_exception_handlers
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.profiling import ProfilingMiddleware, start_profiling, stop_profiling
+from app.api.routes import admin, jobs, voice, health
+from app.services.jobs.queue import close_job_queue
+from app.services.jobs.worker import start_job_workers, stop_job_workers
+from app.services.rag.ingestion import close_ingestion_pool
+from app.services.wake_word.detector import close_wake_word_streams
 
 logger = logging.getLogger(__name__)
 setup_logging()
@@ -15,6 +26,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -25,16 +37,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Outermost, so a profiled request includes time spent in the other middleware
+app.add_middleware(ProfilingMiddleware)
+
+register_exception_handlers(app)
+
 app.include_router(health.router, tags=["health"])
-app.include_router(voice.router, prefix="/api/v1", tags=["voice"])
+app.include_router(
+    voice.router,
+    prefix="/api/v1",
+    tags=["voice"],
+    dependencies=[Depends(request_deadline_dependency)],
+)
+app.include_router(
+    jobs.router,
+    prefix="/api/v1",
+    tags=["jobs"],
+    dependencies=[Depends(request_deadline_dependency)],
+)
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting ASP Bot API")
+    start_profiling(asyncio.get_running_loop())
+    if settings.JOB_WORKERS_IN_PROCESS:
+        start_job_workers()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down ASP Bot API")
+    close_wake_word_streams()
+    await stop_job_workers()
+    close_ingestion_pool()
+    await close_job_queue()
+    await close_cache_backend()
+    stop_profiling()
+    shutdown_logging()
 
 if __name__ == "__main__":
     import uvicorn
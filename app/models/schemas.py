@@ -44,6 +44,21 @@ class WakeWordResponse(BaseModel):
     session_id: Optional[str] = None
 
 
+class WakeWordStreamRequest(BaseModel):
+    session_id: Optional[str] = Field(None, description="Stream to append to; omit to open a new one")
+    audio_data: str = Field(..., description="Base64 encoded 16-bit mono PCM at the detector sample rate, or a WAV chunk")
+    final: bool = Field(False, description="Close the stream and transcribe the audio after the wake word")
+
+
+class WakeWordStreamResponse(BaseModel):
+    session_id: str
+    detected: bool
+    detection_offset: Optional[int] = Field(None, description="Sample offset where the wake word ended")
+    detection_seconds: Optional[float] = None
+    samples_received: int
+    transcription: Optional[str] = None
+
+
 class TranscriptionRequest(BaseModel):
     audio_data: str = Field(..., description="Base64 encoded audio data")
     session_id: str
@@ -58,6 +73,8 @@ class TranscriptionResponse(BaseModel):
 class RAGRequest(BaseModel):
     query: str
     session_id: str
+    include_sources: bool = Field(True, description="Return the source chunks with the answer")
+    source_max_chars: Optional[int] = Field(None, ge=0, description="Truncate each returned source chunk to this many characters")
 
 
 class DocumentChunk(BaseModel):
@@ -72,17 +89,62 @@ class RAGResponse(BaseModel):
     query: str
 
 
+class TranscriptionBatchItem(BaseModel):
+    audio_data: str = Field(..., description="Base64 encoded audio data")
+    id: Optional[str] = Field(None, description="Caller reference echoed back in the result")
+
+
+class TranscriptionBatchRequest(BaseModel):
+    items: List[TranscriptionBatchItem] = Field(..., min_length=1)
+    session_id: str
+
+
+class TranscriptionBatchResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    text: Optional[str] = None
+    language: str = "bg"
+    confidence: Optional[float] = Field(None, ge=0.0, le=1.0)
+    status_code: int = 200
+    error: Optional[str] = None
+
+
+class RAGBatchItem(BaseModel):
+    query: str
+    id: Optional[str] = Field(None, description="Caller reference echoed back in the result")
+
+
+class RAGBatchRequest(BaseModel):
+    items: List[RAGBatchItem] = Field(..., min_length=1)
+    session_id: str
+
+
+class RAGBatchResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    query: str
+    answer: Optional[str] = None
+    source_documents: List[DocumentChunk] = []
+    status_code: int = 200
+    error: Optional[str] = None
+
+
 class TextToSpeechRequest(BaseModel):
     text: str
     session_id: str
+    audio_format: Optional[str] = Field(None, description="wav, pcm, opus, mp3, mp3-32k, mp3-64k or mp3-128k; overrides the Accept header")
 
 
 class TextToSpeechResponse(BaseModel):
     audio_data: str = Field(..., description="Base64 encoded audio data")
+    audio_format: str = "wav"
+    media_type: str = "audio/wav"
 
 
 class VoiceInteractionRequest(BaseModel):
     audio_data: str = Field(..., description="Base64 encoded audio data")
+    audio_format: Optional[str] = Field(None, description="Format of the spoken answer; overrides the Accept header")
+    session_id: Optional[str] = Field(None, description="session_id from the previous turn, so the assistant can repeat its last answer")
 
 
 class VoiceInteractionResponse(BaseModel):
@@ -90,10 +152,128 @@ class VoiceInteractionResponse(BaseModel):
     transcription: Optional[str] = None
     answer: Optional[str] = None
     audio_response: Optional[str] = Field(None, description="Base64 encoded audio data")
+    audio_format: Optional[str] = None
     session_id: str
 
 
+class InteractionJobRequest(VoiceInteractionRequest):
+    callback_url: Optional[str] = Field(None, description="https URL that receives the job status as a POST when it finishes")
+
+
+class RAGJobRequest(RAGRequest):
+    callback_url: Optional[str] = Field(None, description="https URL that receives the job status as a POST when it finishes")
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = Field(None, description="The /interact or /rag response body once the job succeeded")
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+
+class IngestionDirectoryRequest(BaseModel):
+    directory: str = Field(..., description="Directory to index, under one of INGESTION_ALLOWED_DIRECTORIES")
+
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    source: str
+    stage: Optional[str] = Field(None, description="loading, embedding, indexing or publishing")
+    done: int = 0
+    total: int = 0
+    chunks: Optional[int] = None
+    chunks_per_second: Optional[float] = None
+    snapshot_version: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
 class HealthCheck(BaseModel):
     status: str
     version: str
-    services: Dict[str, bool]
\ No newline at end of file
+    services: Dict[str, bool]
+
+
+class StageMetrics(BaseModel):
+    max_concurrency: int
+    max_queue_size: int
+    in_flight: int
+    queue_depth: int
+    admitted: int
+    rejected: int
+    average_service_seconds: float
+
+
+class UpstreamMetrics(BaseModel):
+    circuit_state: str
+    consecutive_failures: int
+    calls: int
+    failures: int
+    timeouts: int
+    retries: int
+    hedges: int
+    short_circuited: int
+    p95_seconds: Optional[float] = None
+
+
+class MetricsResponse(BaseModel):
+    admission: Dict[str, StageMetrics]
+    upstreams: Dict[str, UpstreamMetrics] = {}
+    faq: Dict[str, int] = {}
+    routing: Dict[str, int] = {}
+    model_tiers: Dict[str, Dict[str, float]] = {}
+    cache: Dict[str, Dict[str, int]] = {}
+    jobs: Dict[str, int] = {}
+    ingestion: Dict[str, int] = {}
+    intents: Dict[str, int] = {}
+    vad: Dict[str, Dict[str, float]] = {}
+    logging: Dict[str, int] = {}
+    snapshot_version: Optional[str] = None
+
+class ProfilingSettingsRequest(BaseModel):
+    enabled: bool
+    route: Optional[str] = Field(None, description="Only profile paths starting with this prefix")
+    sample_percent: float = Field(1.0, ge=0.0, le=100.0)
+    interval_ms: float = Field(5.0, ge=1.0, le=1000.0)
+
+
+class BlockingDetectionRequest(BaseModel):
+    enabled: bool
+    threshold_ms: float = Field(100.0, ge=1.0)
+
+
+class ProfilingStatus(BaseModel):
+    profiling_enabled: bool
+    route: Optional[str] = None
+    sample_percent: float
+    interval_ms: float
+    blocking_detection_enabled: bool
+    blocking_threshold_ms: float
+    generation: int
+    worker_pid: int
+    profiled_requests: int
+    samples: int
+    dropped_samples: int
+    stacks: int
+
+
+class BlockingReport(BaseModel):
+    pid: int
+    started_at: float
+    duration_ms: float
+    task: Optional[str] = None
+    stack: List[str]
@@ -0,0 +1,182 @@
+import importlib.util
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from multiprocessing.connection import wait
+from multiprocessing.context import SpawnProcess
+from socket import socket
+from typing import Dict, List
+
+import uvicorn
+# Pinned uvicorn; this is the helper its own --workers mode uses
+from uvicorn._subprocess import get_subprocess
+
+from app.config import settings
+from app.core.logging import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+APP_IMPORT_PATH = "app.main:app"
+
+# Time for the shutdown handlers (job drain, cache and queue clients) after connections close
+SHUTDOWN_MARGIN_SECONDS = 5.0
+
+# A worker that dies sooner than this after starting is failing to boot, not crashing under load
+WORKER_STARTUP_SECONDS = 10.0
+RESTART_BACKOFF_MAX_SECONDS = 30.0
+
+
+def resolve_implementation(requested: str, module_name: str, fallback: str) -> str:
+    if requested != module_name or importlib.util.find_spec(module_name) is not None:
+        return requested
+
+    logger.warning(f"{module_name} is not installed, falling back to {fallback}")
+    return fallback
+
+
+def build_worker_config(loop: str, http: str) -> uvicorn.Config:
+    # Each worker gets its own jitter so they do not all recycle at the same moment
+    max_requests = None
+    if settings.SERVER_MAX_REQUESTS > 0:
+        max_requests = settings.SERVER_MAX_REQUESTS + random.randint(0, max(0, settings.SERVER_MAX_REQUESTS_JITTER))
+
+    return uvicorn.Config(
+        APP_IMPORT_PATH,
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_SECONDS,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+    )
+
+
+class WorkerSupervisor:
+    def __init__(self, worker_count: int):
+        self.worker_count = max(1, worker_count)
+        self.should_exit = threading.Event()
+        self.workers: List[SpawnProcess] = []
+        self.started_at: Dict[int, float] = {}
+        self.consecutive_failures = 0
+        self.sockets: List[socket] = []
+        self.loop = resolve_implementation(settings.SERVER_LOOP, "uvloop", "asyncio")
+        self.http = resolve_implementation(settings.SERVER_HTTP, "httptools", "h11")
+
+    def handle_signal(self, signal_number, frame):
+        logger.info(f"Received {signal.Signals(signal_number).name}, draining workers")
+        self.should_exit.set()
+
+    def start_worker(self, slot: int) -> SpawnProcess:
+        config = build_worker_config(self.loop, self.http)
+        server = uvicorn.Server(config)
+
+        # Each slot rotates its own log file; a replacement worker reopens its
+        # predecessor's, so no two live processes ever share one
+        if self.worker_count > 1:
+            os.environ["LOG_FILE_NAME"] = f"asp_bot.worker-{slot}.log"
+
+        # spawn, not fork: the Azure and Porcupine SDKs hold native threads and handles
+        worker = get_subprocess(config=config, target=server.run, sockets=self.sockets)
+        worker.start()
+
+        self.started_at[worker.pid] = time.monotonic()
+        recycling = f", recycled after {config.limit_max_requests} requests" if config.limit_max_requests else ""
+        logger.info(f"Started worker {worker.pid}{recycling}")
+        return worker
+
+    def replace_exited_workers(self):
+        for index, worker in enumerate(self.workers):
+            if worker.is_alive():
+                continue
+
+            uptime = time.monotonic() - self.started_at.pop(worker.pid, time.monotonic())
+
+            # limit_max_requests ends a worker cleanly; anything else is a crash
+            if worker.exitcode == 0:
+                logger.info(f"Worker {worker.pid} recycled after {uptime:.0f}s")
+                self.consecutive_failures = 0
+            else:
+                logger.error(f"Worker {worker.pid} exited with code {worker.exitcode} after {uptime:.0f}s")
+                if uptime < WORKER_STARTUP_SECONDS:
+                    self.consecutive_failures += 1
+                    backoff = min(RESTART_BACKOFF_MAX_SECONDS, 2 ** (self.consecutive_failures - 1))
+                    if self.should_exit.wait(backoff):
+                        return
+
+            worker.close()
+            self.workers[index] = self.start_worker(index)
+
+    def stop_workers(self):
+        # SIGTERM makes uvicorn stop accepting, let in-flight requests finish
+        # within timeout_graceful_shutdown, then run the app's shutdown handlers
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+
+        drain_seconds = settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS + SHUTDOWN_MARGIN_SECONDS
+        if settings.JOB_WORKERS_IN_PROCESS:
+            drain_seconds += settings.JOB_DRAIN_SECONDS
+
+        deadline = time.monotonic() + drain_seconds
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                logger.warning(f"Worker {worker.pid} did not stop within {drain_seconds:.0f}s, killing it")
+                worker.kill()
+                worker.join()
+
+    def run(self):
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, self.handle_signal)
+
+        # Bound once here and shared, so a recycled worker never leaves the port closed
+        self.sockets = [build_worker_config(self.loop, self.http).bind_socket()]
+        self.workers = [self.start_worker(slot) for slot in range(self.worker_count)]
+
+        while not self.should_exit.is_set():
+            wait([worker.sentinel for worker in self.workers], timeout=1.0)
+            if not self.should_exit.is_set():
+                self.replace_exited_workers()
+
+        self.stop_workers()
+        for listening_socket in self.sockets:
+            listening_socket.close()
+
+
+def warn_about_process_state():
+    # Several workers split this state between them, and a recycled worker
+    # takes its share with it
+    if settings.SERVER_WORKERS > 1:
+        reason = f"with SERVER_WORKERS={settings.SERVER_WORKERS} every worker keeps its own"
+    elif settings.SERVER_MAX_REQUESTS > 0:
+        reason = f"with SERVER_MAX_REQUESTS={settings.SERVER_MAX_REQUESTS} a recycled worker drops its"
+    else:
+        return
+
+    if settings.JOB_QUEUE_BACKEND == "local":
+        logger.warning(f"JOB_QUEUE_BACKEND=local: {reason} jobs and results; use redis so GET /jobs keeps finding them")
+    if settings.CACHE_BACKEND == "memory":
+        logger.warning(f"CACHE_BACKEND=memory: {reason} cache and \"repeat that\" answers; use redis to keep them")
+    logger.warning(f"/wake-word/stream sessions only live in memory: {reason} sessions; run SERVER_WORKERS=1 with SERVER_MAX_REQUESTS=0 where kiosks stream")
+
+
+def main():
+    # The supervisor logs to the console only and leaves the log files to
+    # the workers, one file per worker slot when there are several
+    setup_logging(log_to_file=False)
+    warn_about_process_state()
+
+    logger.info(f"Starting ASP Bot server on {settings.API_HOST}:{settings.API_PORT} with {settings.SERVER_WORKERS} workers")
+    WorkerSupervisor(settings.SERVER_WORKERS).run()
+    logger.info("ASP Bot server stopped")
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Audio processing services for the ASP Bot application.
+"""
\ No newline at end of file
@@ -0,0 +1,240 @@
+import logging
+import struct
+from dataclasses import dataclass
+from math import gcd
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.errors import AudioFormatError
+
+logger = logging.getLogger(__name__)
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+TARGET_SAMPLE_RATE = 16000
+
+RESAMPLE_ZERO_CROSSINGS = 10
+RESAMPLE_KAISER_BETA = 5.0
+
+
+@dataclass(frozen=True)
+class WavFormat:
+    format_tag: int
+    channels: int
+    sample_rate: int
+    sample_width: int
+
+
+@dataclass(frozen=True)
+class NormalizedAudio:
+    pcm: np.ndarray
+    sample_rate: int
+    source_format: Optional[WavFormat] = None
+
+    @property
+    def duration_seconds(self) -> float:
+        return len(self.pcm) / self.sample_rate if self.sample_rate else 0.0
+
+    def to_wav_bytes(self) -> bytes:
+        return encode_wav(self.pcm, self.sample_rate)
+
+
+def parse_wav(audio_data: Union[bytes, bytearray, memoryview]) -> Tuple[WavFormat, memoryview]:
+    buffer = memoryview(audio_data).cast("B")
+
+    if len(buffer) < 12 or bytes(buffer[0:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+        raise AudioFormatError("Audio is not a RIFF/WAVE file")
+
+    wav_format = None
+    offset = 12
+
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", buffer, offset + 4)
+        chunk_start = offset + 8
+        chunk_end = min(chunk_start + chunk_size, len(buffer))
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16:
+                raise AudioFormatError("Malformed WAV fmt chunk")
+            format_tag, channels, sample_rate, _, block_align, bits_per_sample = struct.unpack_from(
+                "<HHIIHH", buffer, chunk_start
+            )
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                (format_tag,) = struct.unpack_from("<H", buffer, chunk_start + 24)
+            sample_width = block_align // channels if channels else 0
+            if sample_width <= 0:
+                sample_width = (bits_per_sample + 7) // 8
+            wav_format = WavFormat(
+                format_tag=format_tag,
+                channels=channels,
+                sample_rate=sample_rate,
+                sample_width=sample_width,
+            )
+        elif chunk_id == b"data":
+            if wav_format is None:
+                raise AudioFormatError("WAV data chunk precedes fmt chunk")
+            frame_size = wav_format.channels * wav_format.sample_width
+            usable_end = chunk_start + ((chunk_end - chunk_start) // frame_size) * frame_size
+            return wav_format, buffer[chunk_start:usable_end]
+
+        # RIFF chunks are word-aligned
+        offset = chunk_start + chunk_size + (chunk_size & 1)
+
+    raise AudioFormatError("WAV file has no data chunk")
+
+
+def decode_samples(frames: memoryview, wav_format: WavFormat) -> np.ndarray:
+    width = wav_format.sample_width
+
+    if wav_format.channels <= 0 or wav_format.sample_rate <= 0:
+        raise AudioFormatError("WAV header declares no channels or sample rate")
+
+    if wav_format.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        if width == 4:
+            return np.frombuffer(frames, dtype="<f4").astype(np.float32, copy=False)
+        if width == 8:
+            return np.frombuffer(frames, dtype="<f8").astype(np.float32)
+        raise AudioFormatError(f"Unsupported float sample width: {width}")
+
+    if wav_format.format_tag != WAVE_FORMAT_PCM:
+        raise AudioFormatError(f"Unsupported WAV encoding: 0x{wav_format.format_tag:04x}")
+
+    if width == 1:
+        raw = np.frombuffer(frames, dtype=np.uint8)
+        return (raw.astype(np.float32) - 128.0) * (1.0 / 128.0)
+    if width == 2:
+        raw = np.frombuffer(frames, dtype="<i2")
+        return raw.astype(np.float32) * (1.0 / 32768.0)
+    if width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        packed = np.where(packed & 0x800000, packed - 0x1000000, packed)
+        return packed.astype(np.float32) * (1.0 / 8388608.0)
+    if width == 4:
+        raw = np.frombuffer(frames, dtype="<i4")
+        return raw.astype(np.float32) * (1.0 / 2147483648.0)
+
+    raise AudioFormatError(f"Unsupported PCM sample width: {width}")
+
+
+def downmix_to_mono(samples: np.ndarray, channels: int) -> np.ndarray:
+    if channels == 1:
+        return samples
+    return samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+def design_resample_filter(up: int, down: int) -> np.ndarray:
+    max_rate = max(up, down)
+    half_length = RESAMPLE_ZERO_CROSSINGS * max_rate
+    cutoff = 1.0 / max_rate
+
+    taps = np.arange(-half_length, half_length + 1, dtype=np.float64)
+    window = np.kaiser(2 * half_length + 1, RESAMPLE_KAISER_BETA)
+
+    return (cutoff * up * np.sinc(cutoff * taps) * window).astype(np.float32)
+
+
+def resample_polyphase(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+
+    divisor = gcd(source_rate, target_rate)
+    up = target_rate // divisor
+    down = source_rate // divisor
+
+    filter_taps = design_resample_filter(up, down)
+    half_length = (len(filter_taps) - 1) // 2
+    taps_per_phase = -(-len(filter_taps) // up)
+
+    # Split the filter into `up` phases of equal length; phase p holds taps
+    # p, p + up, p + 2 * up, ... reversed so it lines up with an input window.
+    padded_filter = np.zeros(taps_per_phase * up, dtype=np.float32)
+    padded_filter[:len(filter_taps)] = filter_taps
+    phase_filters = np.ascontiguousarray(padded_filter.reshape(taps_per_phase, up).T[:, ::-1])
+
+    padding = taps_per_phase + 1
+    padded_input = np.concatenate([
+        np.zeros(padding, dtype=np.float32),
+        samples.astype(np.float32, copy=False),
+        np.zeros(padding + half_length // up + 1, dtype=np.float32),
+    ])
+    windows = np.lib.stride_tricks.sliding_window_view(padded_input, taps_per_phase)
+
+    output_length = -(-len(samples) * up // down)
+    output = np.empty(output_length, dtype=np.float32)
+
+    # Output samples n and n + up share a filter phase and their input windows
+    # are `down` samples apart, so each residue is one strided mat-vec.
+    for residue in range(min(up, output_length)):
+        upsampled_position = residue * down + half_length
+        phase = upsampled_position % up
+        first_window = upsampled_position // up - (taps_per_phase - 1) + padding
+        residue_length = len(range(residue, output_length, up))
+
+        residue_windows = windows[first_window:first_window + (residue_length - 1) * down + 1:down]
+        output[residue::up] = residue_windows @ phase_filters[phase]
+
+    return output
+
+
+def float_to_int16(samples: np.ndarray) -> np.ndarray:
+    scaled = np.multiply(samples, 32767.0, dtype=np.float32)
+    np.clip(scaled, -32768.0, 32767.0, out=scaled)
+    return np.rint(scaled).astype(np.int16)
+
+
+def normalize_audio(
+    audio_data: Union[bytes, bytearray, memoryview],
+    target_sample_rate: int = TARGET_SAMPLE_RATE,
+) -> NormalizedAudio:
+    wav_format, frames = parse_wav(audio_data)
+
+    if (
+        wav_format.format_tag == WAVE_FORMAT_PCM
+        and wav_format.sample_width == 2
+        and wav_format.channels == 1
+        and wav_format.sample_rate == target_sample_rate
+    ):
+        # Already in the target layout, so hand out a view over the upload
+        pcm = np.frombuffer(frames, dtype="<i2")
+    else:
+        samples = decode_samples(frames, wav_format)
+        samples = downmix_to_mono(samples, wav_format.channels)
+        samples = resample_polyphase(samples, wav_format.sample_rate, target_sample_rate)
+        pcm = float_to_int16(samples)
+
+    logger.debug(
+        "Normalized audio: %d ch, %d bit, %d Hz -> mono 16 bit %d Hz (%d samples)",
+        wav_format.channels,
+        wav_format.sample_width * 8,
+        wav_format.sample_rate,
+        target_sample_rate,
+        len(pcm),
+    )
+
+    return NormalizedAudio(pcm=pcm, sample_rate=target_sample_rate, source_format=wav_format)
+
+
+def encode_wav(pcm: np.ndarray, sample_rate: int) -> bytes:
+    pcm_bytes = pcm.astype("<i2", copy=False).tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + len(pcm_bytes),
+        b"WAVE",
+        b"fmt ",
+        16,
+        WAVE_FORMAT_PCM,
+        1,
+        sample_rate,
+        sample_rate * 2,
+        2,
+        16,
+        b"data",
+        len(pcm_bytes),
+    )
+    return header + pcm_bytes
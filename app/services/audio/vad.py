@@ -0,0 +1,97 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.audio.normalizer import NormalizedAudio
+
+logger = logging.getLogger(__name__)
+
+SILENCE_FLOOR_DBFS = -100.0
+
+# Per stage: clips checked, clips rejected as silent and seconds not sent on
+vad_metrics: Dict[str, Dict[str, float]] = {}
+
+
+def frame_features(pcm: np.ndarray, frame_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    frame_count = len(pcm) // frame_length
+    frames = pcm[:frame_count * frame_length].reshape(frame_count, frame_length).astype(np.float32) * (1.0 / 32768.0)
+
+    mean_square = np.einsum("ij,ij->i", frames, frames) / frame_length
+    energy_dbfs = 10.0 * np.log10(np.maximum(mean_square, 10.0 ** (SILENCE_FLOOR_DBFS / 10.0)))
+
+    # Centre each frame so a DC offset does not hide the crossings
+    signs = np.signbit(frames - frames.mean(axis=1, keepdims=True))
+    zero_crossing_rate = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+
+    return energy_dbfs, zero_crossing_rate
+
+
+def find_speech(pcm: np.ndarray, sample_rate: int, follows_wake_word: bool = False) -> Optional[Tuple[int, int]]:
+    frame_length = max(2, int(sample_rate * settings.VAD_FRAME_MS / 1000))
+    if len(pcm) < frame_length:
+        return None
+
+    energy_dbfs, zero_crossing_rate = frame_features(pcm, frame_length)
+
+    # Speech has to stand out from the clip's own background as well as clear
+    # an absolute floor, so steady noise or hum never passes as speech. A command
+    # trimmed right after the wake word may have no pause to measure that
+    # background from; without one it only has to clear the floor. Hiss is loud
+    # enough but crosses zero far more often
+    noise_floor_dbfs, loud_dbfs = np.percentile(energy_dbfs, [10, 90])
+    has_quiet_stretch = noise_floor_dbfs < settings.VAD_ENERGY_THRESHOLD_DBFS or loud_dbfs - noise_floor_dbfs > settings.VAD_NOISE_MARGIN_DB
+    threshold_dbfs = settings.VAD_ENERGY_THRESHOLD_DBFS
+    if has_quiet_stretch or not follows_wake_word:
+        threshold_dbfs = max(threshold_dbfs, noise_floor_dbfs + settings.VAD_NOISE_MARGIN_DB)
+    speech_frames = np.flatnonzero(
+        (energy_dbfs > threshold_dbfs) & (zero_crossing_rate < settings.VAD_MAX_ZERO_CROSSING_RATE)
+    )
+
+    if len(speech_frames) * frame_length < settings.VAD_MIN_SPEECH_SECONDS * sample_rate:
+        return None
+
+    padding = int(settings.VAD_PADDING_SECONDS * sample_rate)
+    speech_start = max(0, int(speech_frames[0]) * frame_length - padding)
+    speech_end = min(len(pcm), (int(speech_frames[-1]) + 1) * frame_length + padding)
+    return speech_start, speech_end
+
+
+def gate_speech(pcm: np.ndarray, sample_rate: int, stage: str, follows_wake_word: bool = False) -> Optional[Tuple[int, int]]:
+    if not settings.VAD_ENABLED:
+        return 0, len(pcm)
+
+    speech_span = find_speech(pcm, sample_rate, follows_wake_word)
+
+    stage_metrics = vad_metrics.setdefault(stage, {"checked": 0, "rejected": 0, "seconds_saved": 0.0})
+    stage_metrics["checked"] += 1
+
+    if speech_span is None:
+        stage_metrics["rejected"] += 1
+        stage_metrics["seconds_saved"] += len(pcm) / sample_rate
+        logger.info("No speech in %.2fs of audio, skipping %s", len(pcm) / sample_rate, stage)
+        return None
+
+    stage_metrics["seconds_saved"] += (len(pcm) - (speech_span[1] - speech_span[0])) / sample_rate
+    return speech_span
+
+
+def trim_silence(audio: NormalizedAudio, stage: str, follows_wake_word: bool = False) -> Optional[NormalizedAudio]:
+    speech_span = gate_speech(audio.pcm, audio.sample_rate, stage, follows_wake_word)
+    if speech_span is None:
+        return None
+
+    speech_start, speech_end = speech_span
+    if speech_start == 0 and speech_end == len(audio.pcm):
+        return audio
+
+    logger.debug("Trimmed %d leading and %d trailing silent samples", speech_start, len(audio.pcm) - speech_end)
+    return NormalizedAudio(pcm=audio.pcm[speech_start:speech_end], sample_rate=audio.sample_rate, source_format=audio.source_format)
+
+
+def get_vad_metrics() -> Dict[str, Dict[str, float]]:
+    return {
+        stage: {**stage_metrics, "seconds_saved": round(stage_metrics["seconds_saved"], 3)}
+        for stage, stage_metrics in vad_metrics.items()
+    }
@@ -0,0 +1,196 @@
+import json
+import logging
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.cache import MISSING, Cache
+from app.services.speech.tts import register_precomputed_speech
+
+logger = logging.getLogger(__name__)
+
+INTENT_REPEAT = "repeat"
+OTHER_LABEL = "other"
+
+INTENT_AUDIO_MANIFEST_FILENAME = "manifest.json"
+
+NGRAM_SIZES = (2, 3, 4)
+NGRAM_DIMENSIONS = 4096
+
+NON_WORD_PATTERN = re.compile(r"[^\w]+")
+
+intent_classifier = None
+intent_classifier_loaded = False
+intent_classifier_lock = threading.Lock()
+
+intent_metrics: Dict[str, int] = {"pattern_matches": 0, "model_matches": 0, "misses": 0}
+
+# The last RAG answer per session, for "repeat that"
+last_answers = Cache(
+    "last_answer",
+    settings.INTENT_SESSION_TTL_SECONDS,
+    dumps=lambda answer: answer.encode("utf-8"),
+    loads=lambda data: bytes(data).decode("utf-8"),
+    enabled=settings.INTENTS_ENABLED,
+    compress=False,
+)
+
+
+def normalize_utterance(text: str) -> str:
+    return NON_WORD_PATTERN.sub(" ", text.lower().replace("ѝ", "и")).strip()
+
+
+def ngram_vector(text: str) -> np.ndarray:
+    # Hashed character n-grams: spelling variants and Whisper's small slips
+    # still land close together, with no embeddings call
+    vector = np.zeros(NGRAM_DIMENSIONS, dtype=np.float32)
+    padded_text = f" {text} "
+    for ngram_size in NGRAM_SIZES:
+        for position in range(len(padded_text) - ngram_size + 1):
+            vector[zlib.crc32(padded_text[position:position + ngram_size].encode("utf-8")) % NGRAM_DIMENSIONS] += 1.0
+
+    np.sqrt(vector, out=vector)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class IntentClassifier:
+    def __init__(self, intents: Dict[str, Dict[str, Any]], other_examples: List[str]):
+        self.responses = {intent: details["response"] for intent, details in intents.items()}
+        self.patterns = [
+            (intent, re.compile(pattern))
+            for intent, details in intents.items()
+            for pattern in details.get("patterns", [])
+        ]
+
+        examples = []
+        self.labels = []
+        for intent, details in intents.items():
+            for example in details.get("examples", []):
+                examples.append(normalize_utterance(example))
+                self.labels.append(intent)
+        for example in other_examples:
+            examples.append(normalize_utterance(example))
+            self.labels.append(OTHER_LABEL)
+
+        self.vectors = np.stack([ngram_vector(example) for example in examples]) if examples else np.zeros((0, NGRAM_DIMENSIONS), dtype=np.float32)
+
+    def classify(self, text: str) -> Optional[Tuple[str, float, str]]:
+        utterance = normalize_utterance(text)
+
+        # Anything longer is a real question, even if it opens with a greeting
+        if not utterance or len(utterance.split()) > settings.INTENT_MAX_WORDS:
+            return None
+
+        for intent, pattern in self.patterns:
+            if pattern.fullmatch(utterance):
+                return intent, 1.0, "pattern"
+
+        if len(self.vectors) == 0:
+            return None
+
+        # Nearest labeled example; the "other" examples keep short benefit
+        # questions from being mistaken for small talk
+        similarities = self.vectors @ ngram_vector(utterance)
+        best_row = int(np.argmax(similarities))
+        best_similarity = float(similarities[best_row])
+
+        if self.labels[best_row] == OTHER_LABEL or best_similarity < settings.INTENT_MIN_SIMILARITY:
+            return None
+
+        return self.labels[best_row], best_similarity, "model"
+
+
+def load_intent_audio(audio_path: str):
+    manifest_path = Path(audio_path) / INTENT_AUDIO_MANIFEST_FILENAME
+    if not manifest_path.exists():
+        logger.info(f"No pre-synthesized intent responses at {audio_path}; they will go through TTS")
+        return
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    for response in manifest["responses"]:
+        for format_name, audio_file in response["audio"].items():
+            register_precomputed_speech(response["text"], (Path(audio_path) / audio_file).read_bytes(), format_name)
+
+    logger.info(f"Loaded {len(manifest['responses'])} pre-synthesized intent responses from {audio_path}")
+
+
+def load_intent_classifier(intents_path: str) -> Optional[IntentClassifier]:
+    if not Path(intents_path).exists():
+        logger.info(f"No intent definitions found at {intents_path}")
+        return None
+
+    with open(intents_path, "r", encoding="utf-8") as intents_file:
+        definitions = json.load(intents_file)
+
+    classifier = IntentClassifier(definitions["intents"], definitions.get("other_examples", []))
+    load_intent_audio(settings.INTENT_AUDIO_PATH)
+
+    logger.info(f"Loaded {len(classifier.responses)} intents from {intents_path}")
+    return classifier
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    global intent_classifier, intent_classifier_loaded
+
+    if intent_classifier_loaded:
+        return intent_classifier
+
+    with intent_classifier_lock:
+        if not intent_classifier_loaded:
+            try:
+                intent_classifier = load_intent_classifier(settings.INTENTS_PATH)
+            except Exception:
+                logger.exception(f"Failed to load intents from {settings.INTENTS_PATH}")
+                intent_classifier = None
+            intent_classifier_loaded = True
+
+    return intent_classifier
+
+
+def last_answer_key(user_id: Optional[str], session_id: str) -> str:
+    # session_id comes from the client; scoping it to the caller keeps one
+    # user from reading another session's last answer
+    return last_answers.make_key(user_id, session_id)
+
+
+async def remember_answer(user_id: Optional[str], session_id: Optional[str], answer: str):
+    if settings.INTENTS_ENABLED and session_id:
+        await last_answers.set(last_answer_key(user_id, session_id), answer)
+
+
+async def answer_intent(text: Optional[str], user_id: Optional[str], session_id: Optional[str]) -> Optional[str]:
+    if not settings.INTENTS_ENABLED or not text:
+        return None
+
+    classifier = get_intent_classifier()
+    if classifier is None:
+        return None
+
+    match = classifier.classify(text)
+    if match is None:
+        intent_metrics["misses"] += 1
+        return None
+
+    intent, score, method = match
+    intent_metrics[f"{method}_matches"] += 1
+    intent_metrics[intent] = intent_metrics.get(intent, 0) + 1
+    logger.info("Answering %s intent locally (%s, score=%.2f): %.50s", intent, method, score, text)
+
+    if intent == INTENT_REPEAT and session_id:
+        previous_answer = await last_answers.get(last_answer_key(user_id, session_id))
+        if previous_answer is not MISSING:
+            return previous_answer
+
+    return classifier.responses[intent]
+
+
+def get_intent_metrics() -> Dict[str, int]:
+    return dict(intent_metrics)
@@ -0,0 +1,98 @@
+import base64
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.errors import NoRelevantDocumentsError
+from app.models.schemas import RAGRequest, RAGResponse, VoiceInteractionRequest, VoiceInteractionResponse
+from app.services.audio.normalizer import normalize_audio
+from app.services.intents import answer_intent, remember_answer
+from app.services.rag.retriever import query_rag_system
+from app.services.speech.formats import AudioOutputFormat
+from app.services.speech.stt import transcribe_audio
+from app.services.speech.tts import text_to_speech
+from app.services.wake_word.detector import get_wake_word_sample_rate, locate_wake_word, trim_to_command
+
+logger = logging.getLogger(__name__)
+
+
+def select_sources(documents: List[Dict[str, Any]], include_sources: bool, source_max_chars: Optional[int]) -> List[Dict[str, Any]]:
+    if not include_sources:
+        return []
+    if source_max_chars is None:
+        return documents
+    return [
+        {**document, "content": document["content"][:source_max_chars]}
+        for document in documents
+    ]
+
+
+async def answer_question(request: RAGRequest, user_id: Optional[str]) -> RAGResponse:
+    intent_answer = await answer_intent(request.query, user_id, request.session_id)
+    if intent_answer is not None:
+        return RAGResponse(answer=intent_answer, source_documents=[], query=request.query)
+
+    try:
+        generated_answer, relevant_documents = await query_rag_system(request.query)
+
+        if not generated_answer:
+            raise NoRelevantDocumentsError()
+
+        await remember_answer(user_id, request.session_id, generated_answer)
+
+        return RAGResponse(
+            answer=generated_answer,
+            source_documents=select_sources(relevant_documents, request.include_sources, request.source_max_chars),
+            query=request.query,
+        )
+    except NoRelevantDocumentsError:
+        return RAGResponse(
+            answer=settings.DEFAULT_RESPONSE,
+            source_documents=[],
+            query=request.query,
+        )
+
+
+async def run_voice_interaction(request: VoiceInteractionRequest, output_format: AudioOutputFormat, user_id: Optional[str]) -> VoiceInteractionResponse:
+    audio_bytes = base64.b64decode(request.audio_data)
+
+    # Kiosks send back the session_id of the previous turn so "repeat that" works
+    conversation_id = request.session_id or str(uuid.uuid4())
+
+    # Decode once and share the normalized buffer between wake word and STT
+    normalized_audio = normalize_audio(audio_bytes, await get_wake_word_sample_rate())
+
+    detection_offset = await locate_wake_word(normalized_audio)
+
+    if detection_offset is None:
+        return VoiceInteractionResponse(
+            wake_word_detected=False,
+            session_id=conversation_id,
+        )
+
+    # Only the command after the wake word goes to STT
+    transcribed_text, _ = await transcribe_audio(trim_to_command(normalized_audio, detection_offset), follows_wake_word=True)
+
+    # Small talk and control phrases are answered locally, with pre-synthesized audio
+    generated_answer = await answer_intent(transcribed_text, user_id, conversation_id)
+    if generated_answer is None and transcribed_text:
+        generated_answer, _ = await query_rag_system(transcribed_text)
+        if generated_answer:
+            await remember_answer(user_id, conversation_id, generated_answer)
+
+    if not generated_answer:
+        generated_answer = settings.DEFAULT_RESPONSE
+
+    speech_audio_bytes = await text_to_speech(generated_answer, output_format)
+
+    speech_audio_base64 = base64.b64encode(speech_audio_bytes).decode("utf-8")
+
+    return VoiceInteractionResponse(
+        wake_word_detected=True,
+        transcription=transcribed_text,
+        answer=generated_answer,
+        audio_response=speech_audio_base64,
+        audio_format=output_format.name,
+        session_id=conversation_id,
+    )
@@ -0,0 +1,3 @@
+"""
+Background job services for the ASP Bot application.
+"""
\ No newline at end of file
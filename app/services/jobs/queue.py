@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import orjson
+
+from app.config import settings
+from app.core.cache import RedisClient
+from app.core.errors import ServiceOverloadedError
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+QUEUE_FULL_RETRY_AFTER_SECONDS = 5
+
+job_queue = None
+
+
+def new_job(kind: str, payload: Dict[str, Any], user_id: Optional[str], callback_url: Optional[str]) -> Dict[str, Any]:
+    return {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": JOB_QUEUED,
+        "user_id": user_id,
+        "callback_url": callback_url,
+        "payload": payload,
+        "attempts": 0,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+        "status_code": None,
+    }
+
+
+def is_finished(job: Dict[str, Any]) -> bool:
+    return job["status"] in (JOB_SUCCEEDED, JOB_FAILED)
+
+
+def expire_lost_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    # A worker that died mid-job never writes a result; report it instead of "running" forever
+    if job["status"] == JOB_RUNNING and time.time() - job["started_at"] > settings.JOB_TIMEOUT_SECONDS * 2:
+        return {
+            **job,
+            "status": JOB_FAILED,
+            "finished_at": job["started_at"] + settings.JOB_TIMEOUT_SECONDS,
+            "error": "The worker running this job stopped responding",
+            "status_code": 504,
+        }
+    return job
+
+
+class JobQueue(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def submit(self, job: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def next_job(self, timeout_seconds: float) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def save(self, job: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def requeue(self, job: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def depth(self) -> int:
+        ...
+
+    async def close(self):
+        pass
+
+
+class LocalJobQueue(JobQueue):
+    name = "local"
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.pending: asyncio.Queue = asyncio.Queue()
+
+    def prune(self):
+        expires_before = time.time() - settings.JOB_RESULT_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items() if is_finished(job) and job["finished_at"] < expires_before]:
+            del self.jobs[job_id]
+
+    async def submit(self, job: Dict[str, Any]):
+        if self.pending.qsize() >= settings.JOB_MAX_QUEUED:
+            raise ServiceOverloadedError("jobs", QUEUE_FULL_RETRY_AFTER_SECONDS)
+
+        self.prune()
+        self.jobs[job["job_id"]] = job
+        self.pending.put_nowait(job["job_id"])
+
+    async def next_job(self, timeout_seconds: float) -> Optional[Dict[str, Any]]:
+        try:
+            job_id = await asyncio.wait_for(self.pending.get(), timeout_seconds)
+        except asyncio.TimeoutError:
+            return None
+        return self.jobs.get(job_id)
+
+    async def save(self, job: Dict[str, Any]):
+        self.jobs[job["job_id"]] = job
+
+    async def requeue(self, job: Dict[str, Any]):
+        self.jobs[job["job_id"]] = job
+        self.pending.put_nowait(job["job_id"])
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    async def depth(self) -> int:
+        return self.pending.qsize()
+
+
+class RedisJobQueue(JobQueue):
+    name = "redis"
+
+    def __init__(self, url: str, pool_size: int, timeout_seconds: float):
+        self.client = RedisClient(url, pool_size, timeout_seconds)
+        self.queue_key = f"{settings.CACHE_KEY_PREFIX}:jobs:queue"
+
+    def job_key(self, job_id: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}:jobs:{job_id}"
+
+    async def save(self, job: Dict[str, Any]):
+        await self.client.execute(
+            "SET",
+            self.job_key(job["job_id"]),
+            orjson.dumps(job),
+            "PX",
+            int(settings.JOB_RESULT_TTL_SECONDS * 1000),
+        )
+
+    async def submit(self, job: Dict[str, Any]):
+        # Racing submitters can overshoot the limit slightly; it only has to stop runaway growth
+        if await self.depth() >= settings.JOB_MAX_QUEUED:
+            raise ServiceOverloadedError("jobs", QUEUE_FULL_RETRY_AFTER_SECONDS)
+
+        await self.save(job)
+        await self.client.execute("LPUSH", self.queue_key, job["job_id"])
+
+    async def next_job(self, timeout_seconds: float) -> Optional[Dict[str, Any]]:
+        reply = await self.client.execute(
+            "BRPOP",
+            self.queue_key,
+            max(1, int(timeout_seconds)),
+            timeout_seconds=timeout_seconds + self.client.timeout_seconds + 1,
+        )
+        if reply is None:
+            return None
+        return await self.get(reply[1].decode("utf-8"))
+
+    async def requeue(self, job: Dict[str, Any]):
+        await self.save(job)
+        # Popped next: it has already waited behind everything queued before it
+        await self.client.execute("RPUSH", self.queue_key, job["job_id"])
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        stored = await self.client.execute("GET", self.job_key(job_id))
+        return orjson.loads(stored) if stored is not None else None
+
+    async def depth(self) -> int:
+        return await self.client.execute("LLEN", self.queue_key)
+
+    async def close(self):
+        self.client.close()
+
+
+def create_job_queue() -> JobQueue:
+    if settings.JOB_QUEUE_BACKEND == "redis":
+        return RedisJobQueue(
+            settings.JOB_QUEUE_REDIS_URL or settings.CACHE_REDIS_URL,
+            # Every worker holds a connection while it waits for a job
+            settings.JOB_WORKER_CONCURRENCY + settings.CACHE_REDIS_POOL_SIZE,
+            settings.CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+
+    if settings.JOB_QUEUE_BACKEND != "local":
+        logger.error(f"Unknown job queue backend {settings.JOB_QUEUE_BACKEND}, using the local queue")
+    return LocalJobQueue()
+
+
+def get_job_queue() -> JobQueue:
+    global job_queue
+
+    if job_queue is None:
+        job_queue = create_job_queue()
+        logger.info(f"Using {job_queue.name} job queue")
+
+    return job_queue
+
+
+async def close_job_queue():
+    global job_queue
+
+    if job_queue is not None:
+        await job_queue.close()
+    job_queue = None
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+import urllib.request
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import orjson
+
+from app.config import settings
+from app.core.admission import request_deadline
+from app.core.errors import ASPBotException, CallbackNotAllowedError, ServiceOverloadedError
+from app.models.schemas import RAGRequest, VoiceInteractionRequest
+from app.services.interaction import answer_question, run_voice_interaction
+from app.services.jobs.queue import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobQueue,
+    get_job_queue,
+    new_job,
+)
+from app.services.speech.formats import get_audio_format
+
+logger = logging.getLogger(__name__)
+
+job_metrics = {
+    "submitted": 0,
+    "succeeded": 0,
+    "failed": 0,
+    "retried": 0,
+    "callbacks_sent": 0,
+    "callbacks_failed": 0,
+}
+
+worker_pool = None
+
+
+async def run_interaction_job(payload: Dict[str, Any], user_id: Optional[str]) -> Dict[str, Any]:
+    request = VoiceInteractionRequest(**payload)
+    response = await run_voice_interaction(request, get_audio_format(request.audio_format), user_id)
+    return response.model_dump()
+
+
+async def run_rag_job(payload: Dict[str, Any], user_id: Optional[str]) -> Dict[str, Any]:
+    response = await answer_question(RAGRequest(**payload), user_id)
+    return response.model_dump()
+
+
+job_handlers: Dict[str, Callable[[Dict[str, Any], Optional[str]], Awaitable[Dict[str, Any]]]] = {
+    "interact": run_interaction_job,
+    "rag": run_rag_job,
+}
+
+
+def validate_callback_url(callback_url: Optional[str]):
+    if callback_url is None:
+        return
+
+    # Only listed hosts, so a job cannot be used to make requests into our own network
+    parsed_url = urlparse(callback_url)
+    if parsed_url.scheme != "https" or parsed_url.hostname not in settings.JOB_CALLBACK_ALLOWED_HOSTS:
+        raise CallbackNotAllowedError(callback_url)
+
+
+async def submit_job(kind: str, payload: Dict[str, Any], user_id: Optional[str], callback_url: Optional[str]) -> Dict[str, Any]:
+    validate_callback_url(callback_url)
+
+    job = new_job(kind, payload, user_id, callback_url)
+    await get_job_queue().submit(job)
+    job_metrics["submitted"] += 1
+
+    logger.info("Queued %s job %s", kind, job["job_id"])
+    return job
+
+
+def describe_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"],
+        "status_code": job["status_code"],
+    }
+
+
+def post_callback(callback_url: str, body: bytes):
+    headers = {"Content-Type": "application/json"}
+    if settings.JOB_CALLBACK_SECRET:
+        signature = hmac.new(settings.JOB_CALLBACK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        headers["X-ASPBot-Signature"] = f"sha256={signature}"
+
+    callback_request = urllib.request.Request(callback_url, data=body, headers=headers, method="POST")
+    with urllib.request.urlopen(callback_request, timeout=settings.JOB_CALLBACK_TIMEOUT_SECONDS) as response:
+        response.read()
+
+
+async def deliver_callback(job: Dict[str, Any]):
+    body = orjson.dumps(describe_job(job))
+
+    for attempt in range(1, settings.JOB_CALLBACK_MAX_ATTEMPTS + 1):
+        try:
+            await asyncio.to_thread(post_callback, job["callback_url"], body)
+            job_metrics["callbacks_sent"] += 1
+            return
+        except Exception as error:
+            logger.warning(
+                "Callback for job %s failed (attempt %d/%d): %s",
+                job["job_id"],
+                attempt,
+                settings.JOB_CALLBACK_MAX_ATTEMPTS,
+                error,
+            )
+            if attempt < settings.JOB_CALLBACK_MAX_ATTEMPTS:
+                await asyncio.sleep(2 ** (attempt - 1))
+
+    # The result is still there to poll
+    job_metrics["callbacks_failed"] += 1
+
+
+async def run_job(queue: JobQueue, job: Dict[str, Any]):
+    handler = job_handlers.get(job["kind"])
+
+    job.update(status=JOB_RUNNING, started_at=time.time(), attempts=job["attempts"] + 1)
+    await queue.save(job)
+
+    # Jobs run outside any HTTP request, so they get their own, longer deadline
+    request_deadline.set(time.monotonic() + settings.JOB_TIMEOUT_SECONDS)
+
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind {job['kind']}")
+        result = await asyncio.wait_for(handler(job["payload"], job["user_id"]), settings.JOB_TIMEOUT_SECONDS)
+        job.update(status=JOB_SUCCEEDED, result=result, status_code=200)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job to another worker instead of losing it
+        job.update(status=JOB_QUEUED, started_at=None)
+        await asyncio.shield(queue.requeue(job))
+        raise
+    except ServiceOverloadedError as error:
+        if job["attempts"] < settings.JOB_MAX_ATTEMPTS:
+            # Upstreams are saturated; waiting here also slows this worker's intake
+            logger.info("Job %s hit %s overload, retrying in %ds", job["job_id"], error.stage, error.retry_after_seconds)
+            job_metrics["retried"] += 1
+            await asyncio.sleep(min(error.retry_after_seconds, settings.JOB_TIMEOUT_SECONDS))
+            job.update(status=JOB_QUEUED, started_at=None)
+            await queue.requeue(job)
+            return
+        job.update(status=JOB_FAILED, error=error.message, status_code=error.status_code)
+    except asyncio.TimeoutError:
+        job.update(status=JOB_FAILED, error=f"Job did not finish within {settings.JOB_TIMEOUT_SECONDS:.0f}s", status_code=504)
+    except ASPBotException as error:
+        job.update(status=JOB_FAILED, error=error.message, status_code=error.status_code)
+    except Exception as error:
+        logger.exception("Job %s failed", job["job_id"])
+        job.update(status=JOB_FAILED, error=str(error), status_code=500)
+
+    job["finished_at"] = time.time()
+    await queue.save(job)
+    job_metrics["succeeded" if job["status"] == JOB_SUCCEEDED else "failed"] += 1
+
+    logger.info(
+        "Job %s %s in %.2fs",
+        job["job_id"],
+        job["status"],
+        job["finished_at"] - job["started_at"],
+    )
+
+    if job["callback_url"]:
+        await deliver_callback(job)
+
+
+class JobWorkerPool:
+    def __init__(self, queue: JobQueue, concurrency: int):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.tasks: List[asyncio.Task] = []
+        self.stopping = False
+        self.active_jobs = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.run_worker()) for _ in range(self.concurrency)]
+        logger.info(f"Started {self.concurrency} job workers on the {self.queue.name} queue")
+
+    async def run_worker(self):
+        while not self.stopping:
+            try:
+                job = await self.queue.next_job(settings.JOB_POLL_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to fetch the next job")
+                await asyncio.sleep(settings.JOB_POLL_SECONDS)
+                continue
+
+            if job is None:
+                continue
+
+            self.active_jobs += 1
+            try:
+                await run_job(self.queue, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Job worker failed while running job {job['job_id']}")
+            finally:
+                self.active_jobs -= 1
+
+    async def stop(self, drain_seconds: float):
+        self.stopping = True
+
+        # Let running jobs finish; whatever is still running afterwards is requeued
+        deadline = time.monotonic() + drain_seconds
+        while self.active_jobs and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+
+def start_job_workers():
+    global worker_pool
+
+    if worker_pool is None:
+        worker_pool = JobWorkerPool(get_job_queue(), settings.JOB_WORKER_CONCURRENCY)
+        worker_pool.start()
+
+
+async def stop_job_workers():
+    global worker_pool
+
+    if worker_pool is not None:
+        await worker_pool.stop(settings.JOB_DRAIN_SECONDS)
+    worker_pool = None
+
+
+async def get_job_metrics() -> Dict[str, int]:
+    metrics = dict(job_metrics)
+    metrics["active"] = worker_pool.active_jobs if worker_pool is not None else 0
+
+    try:
+        metrics["queued"] = await get_job_queue().depth()
+    except Exception:
+        logger.warning("Could not read the job queue depth")
+
+    return metrics
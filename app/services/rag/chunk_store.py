@@ -0,0 +1,188 @@
+import json
+import logging
+import mmap
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+from app.config import settings
+from app.core.errors import VectorStoreError
+from app.services.rag.snapshots import serving_chunk_store_path
+
+logger = logging.getLogger(__name__)
+
+CHUNK_STORE_MANIFEST_FILENAME = "manifest.json"
+CONTENT_FILENAME = "content.bin"
+CONTENT_OFFSETS_FILENAME = "content_offsets.npy"
+METADATA_FILENAME = "metadata.bin"
+METADATA_OFFSETS_FILENAME = "metadata_offsets.npy"
+SORTED_IDS_FILENAME = "sorted_ids.npy"
+SORTED_ID_ROWS_FILENAME = "sorted_id_rows.npy"
+
+# Path -> store, or None when no store was built there (e.g. an older snapshot)
+chunk_stores: Dict[str, Optional["ChunkStore"]] = {}
+chunk_store_lock = threading.Lock()
+
+
+def map_file(path: Path):
+    # mmap refuses empty files; an empty column is just empty bytes
+    if path.stat().st_size == 0:
+        return b""
+    with open(path, "rb") as column_file:
+        return mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_column(data_path: Path, offsets_path: Path, values: List[bytes]):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(data_path, "wb") as data_file:
+        for row, value in enumerate(values):
+            data_file.write(value)
+            offsets[row + 1] = offsets[row] + len(value)
+    np.save(offsets_path, offsets)
+
+
+class ChunkStore:
+    # Chunk text and metadata as memory-mapped columns: a worker's resident
+    # memory holds only the pages of chunks it has actually read
+    def __init__(self, store_path: str):
+        store_directory = Path(store_path)
+
+        with open(store_directory / CHUNK_STORE_MANIFEST_FILENAME, "r", encoding="utf-8") as manifest_file:
+            self.manifest = json.load(manifest_file)
+
+        self.content = map_file(store_directory / CONTENT_FILENAME)
+        self.content_offsets = np.load(store_directory / CONTENT_OFFSETS_FILENAME, mmap_mode="r")
+        self.metadata = map_file(store_directory / METADATA_FILENAME)
+        self.metadata_offsets = np.load(store_directory / METADATA_OFFSETS_FILENAME, mmap_mode="r")
+
+        self.sorted_ids = None
+        self.sorted_id_rows = None
+        if (store_directory / SORTED_IDS_FILENAME).exists():
+            self.sorted_ids = np.load(store_directory / SORTED_IDS_FILENAME, mmap_mode="r")
+            self.sorted_id_rows = np.load(store_directory / SORTED_ID_ROWS_FILENAME, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.content_offsets) - 1
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        return {"content": self.get_content(row), "metadata": self.get_metadata(row)}
+
+    def get_content(self, row: int) -> str:
+        return self.content[self.content_offsets[row]:self.content_offsets[row + 1]].decode("utf-8")
+
+    def get_metadata(self, row: int) -> Dict[str, Any]:
+        return orjson.loads(self.metadata[self.metadata_offsets[row]:self.metadata_offsets[row + 1]])
+
+    def rows_for_ids(self, chunk_ids: List[str]) -> List[Optional[int]]:
+        if self.sorted_ids is None or len(self.sorted_ids) == 0:
+            return [None] * len(chunk_ids)
+
+        encoded_ids = np.asarray([chunk_id.encode("utf-8") for chunk_id in chunk_ids], dtype=self.sorted_ids.dtype)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, encoded_ids), len(self.sorted_ids) - 1)
+
+        return [
+            int(self.sorted_id_rows[position]) if self.sorted_ids[position] == encoded_id else None
+            for position, encoded_id in zip(positions, encoded_ids)
+        ]
+
+
+def build_chunk_store(
+    store_path: str,
+    documents: List[str],
+    metadatas: List[Optional[Dict[str, Any]]],
+    ids: Optional[List[str]] = None,
+):
+    store_directory = Path(store_path)
+    staging_directory = store_directory.with_name(store_directory.name + ".tmp")
+
+    try:
+        if staging_directory.exists():
+            shutil.rmtree(staging_directory)
+        staging_directory.mkdir(parents=True)
+
+        write_column(
+            staging_directory / CONTENT_FILENAME,
+            staging_directory / CONTENT_OFFSETS_FILENAME,
+            [document.encode("utf-8") for document in documents],
+        )
+        write_column(
+            staging_directory / METADATA_FILENAME,
+            staging_directory / METADATA_OFFSETS_FILENAME,
+            [orjson.dumps(metadata or {}) for metadata in metadatas],
+        )
+
+        if ids is not None:
+            # Sorted fixed-width IDs, so an ID resolves to its row by binary search on the map
+            encoded_ids = np.asarray([chunk_id.encode("utf-8") for chunk_id in ids], dtype=np.bytes_)
+            order = np.argsort(encoded_ids, kind="stable")
+            np.save(staging_directory / SORTED_IDS_FILENAME, encoded_ids[order])
+            np.save(staging_directory / SORTED_ID_ROWS_FILENAME, order.astype(np.int64))
+
+        with open(staging_directory / CHUNK_STORE_MANIFEST_FILENAME, "w", encoding="utf-8") as manifest_file:
+            json.dump({"count": len(documents), "indexed_by_id": ids is not None}, manifest_file)
+
+        if store_directory.exists():
+            shutil.rmtree(store_directory)
+        staging_directory.rename(store_directory)
+
+        logger.info(f"Built chunk store with {len(documents)} chunks at {store_path}")
+    except Exception as e:
+        logger.exception(f"Error building chunk store at {store_path}")
+        raise VectorStoreError(f"Error building chunk store: {str(e)}")
+
+
+def get_chunk_store(store_path: Optional[str] = None) -> Optional[ChunkStore]:
+    if not settings.CHUNK_STORE_ENABLED:
+        return None
+
+    store_path = store_path or serving_chunk_store_path()
+
+    if store_path in chunk_stores:
+        return chunk_stores[store_path]
+
+    with chunk_store_lock:
+        if store_path not in chunk_stores:
+            store = None
+            if (Path(store_path) / CHUNK_STORE_MANIFEST_FILENAME).exists():
+                try:
+                    store = ChunkStore(store_path)
+                except Exception as e:
+                    logger.exception(f"Failed to load chunk store from {store_path}")
+                    raise VectorStoreError(f"Failed to load chunk store: {str(e)}")
+                logger.info(f"Loaded chunk store with {len(store)} chunks from {store_path}")
+            else:
+                logger.info(f"No chunk store at {store_path}, reading chunk text from the vector store")
+            chunk_stores[store_path] = store
+
+    return chunk_stores[store_path]
+
+
+def reset_chunk_stores():
+    with chunk_store_lock:
+        chunk_stores.clear()
+
+
+def evict_chunk_stores(keep_root: str):
+    # Searches holding an evicted store keep their own reference until they finish
+    with chunk_store_lock:
+        for store_path in [store_path for store_path in chunk_stores if not store_path.startswith(keep_root)]:
+            del chunk_stores[store_path]
+
+
+def chunk_reference(store: ChunkStore, row: int, score: float) -> Dict[str, Any]:
+    return {"chunk_store": store, "row": row, "score": score}
+
+
+def materialize_chunks(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Text is decoded only for the results that made it into the prompt or response
+    for result in results:
+        if "chunk_store" in result:
+            store = result.pop("chunk_store")
+            row = result.pop("row")
+            result["content"] = store.get_content(row)
+            result["metadata"] = store.get_metadata(row)
+    return results
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 from typing import List, Dict, Any, Optional
@@ -15,6 +16,66 @@ from app.core.errors import DocumentProcessingError
 
 logger = logging.getLogger(__name__)
 
+CATEGORY_FILENAME = "_category.json"
+CATEGORY_FIELDS = ("benefit_type", "region", "document_source")
+DEFAULT_CATEGORY = {
+    "benefit_type": "general",
+    "region": "national",
+    "document_source": "asp",
+}
+
+
+def load_category_file(directory: Path, category_files: Dict[Path, Dict[str, str]]) -> Dict[str, str]:
+    if directory not in category_files:
+        category_path = directory / CATEGORY_FILENAME
+        category = {}
+        if category_path.exists():
+            with open(category_path, "r", encoding="utf-8") as category_file:
+                category = {
+                    field: str(value)
+                    for field, value in json.load(category_file).items()
+                    if field in CATEGORY_FIELDS
+                }
+        category_files[directory] = category
+    
+    return category_files[directory]
+
+
+def resolve_document_category(
+    document_path: Path,
+    root_directory: Path,
+    category_files: Dict[Path, Dict[str, str]],
+) -> Dict[str, str]:
+    category = dict(DEFAULT_CATEGORY)
+    
+    try:
+        relative_directories = document_path.resolve().relative_to(root_directory).parts[:-1]
+    except ValueError:
+        return category
+    
+    # The first folder under the documents directory names the benefit type;
+    # _category.json files override any field for everything below them
+    if relative_directories:
+        category["benefit_type"] = relative_directories[0]
+    
+    directory = root_directory
+    category.update(load_category_file(directory, category_files))
+    for directory_name in relative_directories:
+        directory = directory / directory_name
+        category.update(load_category_file(directory, category_files))
+    
+    return category
+
+
+def tag_document_categories(documents: List[Dict[str, Any]], directory_path: str):
+    root_directory = Path(directory_path).resolve()
+    category_files = {}
+    
+    for document in documents:
+        document.metadata.update(
+            resolve_document_category(Path(document.metadata.get("source", "")), root_directory, category_files)
+        )
+
 
 async def load_documents(directory_path: str) -> List[Dict[str, Any]]:
     try:
@@ -42,6 +103,8 @@ async def load_documents(directory_path: str) -> List[Dict[str, Any]]:
         
         all_docs = pdf_docs + text_docs
         
+        tag_document_categories(all_docs, directory_path)
+        
         logger.info(f"Loaded {len(all_docs)} documents")
         
         return all_docs
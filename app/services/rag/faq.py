@@ -0,0 +1,234 @@
+import json
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.errors import VectorStoreError
+from app.services.rag.snapshots import get_serving_version
+from app.services.speech.formats import get_audio_format
+from app.services.speech.tts import register_precomputed_speech
+
+logger = logging.getLogger(__name__)
+
+FAQ_MANIFEST_FILENAME = "faq_index.json"
+FAQ_EMBEDDINGS_FILENAME = "embeddings.npy"
+FAQ_AUDIO_DIRECTORY = "audio"
+
+faq_index = None
+faq_index_loaded = False
+faq_index_lock = threading.Lock()
+faq_manifest_mtime = None
+faq_checked_at = 0.0
+
+faq_metrics = {"hits": 0, "misses": 0}
+
+
+class FAQIndex:
+    def __init__(self, entries: List[Dict[str, Any]], vectors: np.ndarray, vector_entry_ids: List[int], snapshot_version: Optional[str] = None):
+        self.entries = entries
+        self.snapshot_version = snapshot_version
+        self.vectors = normalize_rows(vectors)
+        self.vector_entry_ids = np.asarray(vector_entry_ids, dtype=np.int64)
+
+    def match(self, query_embedding: List[float], threshold: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        if len(self.vectors) == 0:
+            return None
+
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vector)
+        if query_norm == 0:
+            return None
+
+        similarities = self.vectors @ (query_vector / query_norm)
+        best_row = int(np.argmax(similarities))
+        best_similarity = float(similarities[best_row])
+
+        if best_similarity < threshold:
+            return None
+
+        return self.entries[self.vector_entry_ids[best_row]], best_similarity
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or len(vectors) == 0:
+        return vectors.reshape(0, 0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def load_faq_index(index_path: str) -> Optional[FAQIndex]:
+    index_directory = Path(index_path)
+    manifest_path = index_directory / FAQ_MANIFEST_FILENAME
+
+    if not manifest_path.exists():
+        logger.info(f"No FAQ index found at {index_path}")
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest.get("embedding_model") != settings.EMBEDDING_MODEL:
+        logger.warning(
+            f"FAQ index was built with {manifest.get('embedding_model')}, "
+            f"but {settings.EMBEDDING_MODEL} is configured; FAQ answers disabled"
+        )
+        return None
+
+    # Answers drafted from one corpus must not outlive it
+    snapshot_version = manifest.get("snapshot_version")
+    if settings.VECTOR_SNAPSHOTS_ENABLED and snapshot_version and snapshot_version != get_serving_version():
+        logger.warning(
+            f"FAQ index was built against snapshot {snapshot_version}, but {get_serving_version()} is served; "
+            f"FAQ answers disabled until it is rebuilt"
+        )
+        return None
+
+    vectors = np.load(index_directory / FAQ_EMBEDDINGS_FILENAME)
+    entries = manifest["entries"]
+
+    for entry in entries:
+        audio_file = entry.get("audio_file")
+        if audio_file:
+            entry["audio"] = (index_directory / FAQ_AUDIO_DIRECTORY / audio_file).read_bytes()
+
+    register_faq_audio(entries)
+
+    logger.info(f"Loaded FAQ index with {len(entries)} answers from {index_path}")
+    return FAQIndex(entries, vectors, manifest["vector_entry_ids"], snapshot_version)
+
+
+def register_faq_audio(entries: List[Dict[str, Any]]):
+    for entry in entries:
+        if entry.get("audio"):
+            register_precomputed_speech(entry["answer"], entry["audio"], entry.get("audio_format", "wav"))
+
+
+def read_manifest_mtime() -> Optional[float]:
+    try:
+        return (Path(settings.FAQ_INDEX_PATH) / FAQ_MANIFEST_FILENAME).stat().st_mtime
+    except OSError:
+        return None
+
+
+def poll_faq_index_change():
+    global faq_index_loaded, faq_checked_at
+
+    # A stat at most every few seconds picks up a rebuilt index without a restart
+    now = time.monotonic()
+    if now - faq_checked_at < settings.VECTOR_SNAPSHOT_CHECK_SECONDS:
+        return
+    faq_checked_at = now
+
+    if read_manifest_mtime() != faq_manifest_mtime:
+        with faq_index_lock:
+            faq_index_loaded = False
+
+
+def get_faq_index() -> Optional[FAQIndex]:
+    global faq_index, faq_index_loaded, faq_manifest_mtime
+
+    if faq_index_loaded:
+        return faq_index
+
+    with faq_index_lock:
+        if not faq_index_loaded:
+            faq_manifest_mtime = read_manifest_mtime()
+            try:
+                faq_index = load_faq_index(settings.FAQ_INDEX_PATH)
+            except Exception:
+                logger.exception(f"Failed to load FAQ index from {settings.FAQ_INDEX_PATH}")
+                faq_index = None
+            faq_index_loaded = True
+
+    return faq_index
+
+
+def reload_faq_index() -> Optional[FAQIndex]:
+    global faq_index_loaded
+
+    with faq_index_lock:
+        faq_index_loaded = False
+    return get_faq_index()
+
+
+def find_faq_answer(query_embedding: List[float]) -> Optional[Tuple[str, List[Dict[str, Any]], float]]:
+    if not settings.FAQ_ENABLED:
+        return None
+
+    poll_faq_index_change()
+    index = get_faq_index()
+    if index is None:
+        return None
+
+    match = index.match(query_embedding, settings.FAQ_SIMILARITY_THRESHOLD)
+    if match is None:
+        faq_metrics["misses"] += 1
+        return None
+
+    entry, similarity = match
+    faq_metrics["hits"] += 1
+    logger.info("Serving precomputed FAQ answer (similarity=%.3f): %.50s", similarity, entry["question"])
+    return entry["answer"], entry.get("sources", []), similarity
+
+
+def save_faq_index(
+    index_path: str,
+    entries: List[Dict[str, Any]],
+    vectors: np.ndarray,
+    vector_entry_ids: List[int],
+    snapshot_version: Optional[str] = None,
+):
+    index_directory = Path(index_path)
+    staging_directory = index_directory.with_name(index_directory.name + ".tmp")
+
+    try:
+        if staging_directory.exists():
+            shutil.rmtree(staging_directory)
+        (staging_directory / FAQ_AUDIO_DIRECTORY).mkdir(parents=True)
+
+        manifest_entries = []
+        for entry_id, entry in enumerate(entries):
+            manifest_entry = {key: value for key, value in entry.items() if key != "audio"}
+            if entry.get("audio"):
+                audio_extension = get_audio_format(entry.get("audio_format", "wav")).extension
+                audio_file = f"{entry_id:04d}.{audio_extension}"
+                (staging_directory / FAQ_AUDIO_DIRECTORY / audio_file).write_bytes(entry["audio"])
+                manifest_entry["audio_file"] = audio_file
+            manifest_entries.append(manifest_entry)
+
+        np.save(staging_directory / FAQ_EMBEDDINGS_FILENAME, np.asarray(vectors, dtype=np.float32))
+
+        with open(staging_directory / FAQ_MANIFEST_FILENAME, "w", encoding="utf-8") as manifest_file:
+            json.dump(
+                {
+                    "embedding_model": settings.EMBEDDING_MODEL,
+                    "snapshot_version": snapshot_version,
+                    "entries": manifest_entries,
+                    "vector_entry_ids": list(vector_entry_ids),
+                },
+                manifest_file,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+        # Swap the finished index in so readers never see a partial one
+        if index_directory.exists():
+            shutil.rmtree(index_directory)
+        staging_directory.rename(index_directory)
+
+        logger.info(f"Saved FAQ index with {len(entries)} answers to {index_path}")
+    except Exception as e:
+        logger.exception(f"Error saving FAQ index to {index_path}")
+        raise VectorStoreError(f"Error saving FAQ index: {str(e)}")
+
+
+def get_faq_metrics() -> Dict[str, int]:
+    return dict(faq_metrics)
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.config import settings
+from app.core.errors import IngestionError, ServiceOverloadedError
+from app.core.logging import setup_logging
+from app.services.jobs.queue import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED
+from app.services.rag.vector_store import index_documents
+
+logger = logging.getLogger(__name__)
+
+# What document_processor knows how to load
+SUPPORTED_SUFFIXES = (".pdf", ".txt")
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+QUEUE_FULL_RETRY_AFTER_SECONDS = 60
+
+ingestion_pool = None
+ingestion_futures: Dict[str, Future] = {}
+
+ingestion_metrics = {
+    "submitted": 0,
+    "succeeded": 0,
+    "failed": 0,
+}
+
+
+def ingestion_job_path(job_id: str) -> Path:
+    return Path(settings.INGESTION_PATH) / f"{job_id}.json"
+
+
+def save_ingestion_job(job: Dict[str, Any]):
+    # Job files live on the same disk as the snapshots, so any replica can report on them
+    job_path = ingestion_job_path(job["job_id"])
+    job_path.parent.mkdir(parents=True, exist_ok=True)
+
+    staging_path = job_path.with_name(f"{job_path.name}.{os.getpid()}.tmp")
+    staging_path.write_bytes(orjson.dumps(job))
+    os.replace(staging_path, job_path)
+
+
+def expire_stalled_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    # A process that died mid-run never writes a result; report it instead of "running" forever
+    if job["status"] == JOB_RUNNING and time.time() - job["updated_at"] > settings.INGESTION_STALL_SECONDS:
+        return {
+            **job,
+            "status": JOB_FAILED,
+            "finished_at": job["updated_at"],
+            "error": "The ingestion process stopped responding",
+        }
+    return job
+
+
+def load_ingestion_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+
+    try:
+        return expire_stalled_job(orjson.loads(ingestion_job_path(job_id).read_bytes()))
+    except FileNotFoundError:
+        return None
+
+
+def list_ingestion_jobs(limit: int) -> List[Dict[str, Any]]:
+    jobs = []
+    for job_path in Path(settings.INGESTION_PATH).glob("*.json"):
+        try:
+            jobs.append(expire_stalled_job(orjson.loads(job_path.read_bytes())))
+        except (OSError, orjson.JSONDecodeError):
+            logger.warning(f"Skipping unreadable ingestion job file {job_path}")
+
+    jobs.sort(key=lambda job: job["created_at"], reverse=True)
+    return jobs[:limit]
+
+
+class IngestionProgress:
+    def __init__(self, job: Dict[str, Any]):
+        self.job = job
+        self.stage_started_at = time.time()
+
+    def __call__(self, stage: str, done: int, total: int):
+        now = time.time()
+        if stage != self.job["stage"]:
+            self.job["stage"] = stage
+            self.stage_started_at = now
+
+        self.job.update(done=done, total=total, updated_at=now)
+        if stage == "embedding":
+            self.job["chunks"] = total
+            elapsed = now - self.stage_started_at
+            self.job["chunks_per_second"] = round(done / elapsed, 2) if elapsed > 0 else None
+
+        save_ingestion_job(self.job)
+
+
+def prepare_ingestion_process():
+    # Console only; the server process owns logs/asp_bot.log
+    setup_logging(log_to_file=False)
+
+    # Leave the CPU to the serving workers whenever they need it
+    if settings.INGESTION_PROCESS_NICE and hasattr(os, "nice"):
+        os.nice(settings.INGESTION_PROCESS_NICE)
+
+
+def run_ingestion(job: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs in a pool process with its own event loop, embeddings client and Chroma handles
+    job.update(status=JOB_RUNNING, started_at=time.time(), updated_at=time.time())
+    save_ingestion_job(job)
+
+    try:
+        version = asyncio.run(index_documents(job["directory"], IngestionProgress(job)))
+        if version is None:
+            job.update(status=JOB_FAILED, error=f"No {' or '.join(SUPPORTED_SUFFIXES)} documents found in {job['directory']}")
+        else:
+            job.update(status=JOB_SUCCEEDED, snapshot_version=version)
+    except Exception as error:
+        logger.exception(f"Ingestion job {job['job_id']} failed")
+        job.update(status=JOB_FAILED, error=str(error))
+
+    job.update(finished_at=time.time(), updated_at=time.time())
+    save_ingestion_job(job)
+    return job
+
+
+def get_ingestion_pool() -> ProcessPoolExecutor:
+    global ingestion_pool
+
+    if ingestion_pool is None:
+        # spawn, not fork: a forked child would inherit the server's event loop and threads
+        ingestion_pool = ProcessPoolExecutor(
+            max_workers=max(1, settings.INGESTION_MAX_PROCESSES),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=prepare_ingestion_process,
+        )
+        logger.info(f"Started ingestion pool with {settings.INGESTION_MAX_PROCESSES} processes")
+
+    return ingestion_pool
+
+
+def finish_ingestion(job: Dict[str, Any], future: Future):
+    global ingestion_pool
+
+    ingestion_futures.pop(job["job_id"], None)
+
+    if future.cancelled():
+        error = "The server shut down before the job started"
+    elif future.exception() is not None:
+        error = f"The ingestion process failed: {future.exception()}"
+        # A crashed process breaks the whole pool; the next job starts a fresh one
+        ingestion_pool = None
+    else:
+        ingestion_metrics["succeeded" if future.result()["status"] == JOB_SUCCEEDED else "failed"] += 1
+        return
+
+    ingestion_metrics["failed"] += 1
+    job = load_ingestion_job(job["job_id"]) or job
+    job.update(status=JOB_FAILED, error=error, finished_at=time.time(), updated_at=time.time())
+    save_ingestion_job(job)
+
+
+def resolve_ingestion_directory(directory: str) -> Path:
+    resolved_directory = Path(directory).resolve()
+
+    for allowed_directory in settings.INGESTION_ALLOWED_DIRECTORIES:
+        allowed_root = Path(allowed_directory).resolve()
+        if resolved_directory == allowed_root or allowed_root in resolved_directory.parents:
+            if not resolved_directory.is_dir():
+                raise IngestionError(f"Directory does not exist: {directory}")
+            return resolved_directory
+
+    raise IngestionError(f"Directory {directory} is not under INGESTION_ALLOWED_DIRECTORIES")
+
+
+def upload_destination(filename: str, folder: Optional[str]) -> Path:
+    relative_path = PurePosixPath((folder or "").replace("\\", "/")) / PurePosixPath(filename.replace("\\", "/")).name
+
+    if relative_path.is_absolute() or ".." in relative_path.parts or not relative_path.name:
+        raise IngestionError(f"Invalid upload path {relative_path}")
+    if relative_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+        raise IngestionError(f"Unsupported document type {relative_path.name}; expected {', '.join(SUPPORTED_SUFFIXES)}")
+
+    return Path(settings.INGESTION_DOCUMENTS_PATH).resolve() / relative_path
+
+
+def write_uploaded_documents(uploads: List[Tuple[Path, bytes]]):
+    for destination, content in uploads:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        staging_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.tmp")
+        staging_path.write_bytes(content)
+        os.replace(staging_path, destination)
+
+
+async def store_uploaded_documents(files: List[Tuple[str, bytes]], folder: Optional[str]) -> Path:
+    # Validate every file before writing any of them
+    uploads = [(upload_destination(filename, folder), content) for filename, content in files]
+    await asyncio.to_thread(write_uploaded_documents, uploads)
+
+    logger.info(f"Stored {len(uploads)} uploaded documents under {settings.INGESTION_DOCUMENTS_PATH}")
+    return Path(settings.INGESTION_DOCUMENTS_PATH).resolve()
+
+
+async def submit_ingestion(directory: Path, source: str, user_id: Optional[str]) -> Dict[str, Any]:
+    if not settings.VECTOR_SNAPSHOTS_ENABLED:
+        # Without snapshots indexing writes into the store the API is searching
+        raise IngestionError("Ingestion through the API requires VECTOR_SNAPSHOTS_ENABLED", status_code=409)
+
+    if len(ingestion_futures) >= settings.INGESTION_MAX_QUEUED:
+        raise ServiceOverloadedError("ingestion", QUEUE_FULL_RETRY_AFTER_SECONDS)
+
+    now = time.time()
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": JOB_QUEUED,
+        "source": source,
+        "directory": str(directory),
+        "user_id": user_id,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "updated_at": now,
+        "stage": None,
+        "done": 0,
+        "total": 0,
+        "chunks": None,
+        "chunks_per_second": None,
+        "snapshot_version": None,
+        "error": None,
+    }
+    await asyncio.to_thread(save_ingestion_job, job)
+
+    # The whole directory is re-indexed into a new snapshot, which serving
+    # workers pick up through the usual hot swap once it is published
+    future = get_ingestion_pool().submit(run_ingestion, job)
+    ingestion_futures[job["job_id"]] = future
+    future.add_done_callback(partial(finish_ingestion, job))
+    ingestion_metrics["submitted"] += 1
+
+    logger.info("Queued ingestion job %s for %s", job["job_id"], directory)
+    return job
+
+
+def close_ingestion_pool():
+    global ingestion_pool
+
+    # Queued jobs are cancelled; a running one finishes before the process exits
+    if ingestion_pool is not None:
+        ingestion_pool.shutdown(wait=False, cancel_futures=True)
+    ingestion_pool = None
+
+
+def get_ingestion_metrics() -> Dict[str, int]:
+    return {**ingestion_metrics, "active": len(ingestion_futures)}
@@ -0,0 +1,103 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SMALL_TIER = "small"
+LARGE_TIER = "large"
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+tier_metrics = {
+    SMALL_TIER: {"requests": 0, "errors": 0, "escalations": 0, "total_seconds": 0.0},
+    LARGE_TIER: {"requests": 0, "errors": 0, "escalations": 0, "total_seconds": 0.0},
+}
+decision_reasons: Dict[str, int] = {}
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    model: str
+    max_tokens: int
+
+
+def get_model_tier(name: str) -> ModelTier:
+    if name == SMALL_TIER:
+        return ModelTier(SMALL_TIER, settings.LLM_SMALL_MODEL, settings.LLM_SMALL_MAX_TOKENS)
+    return ModelTier(LARGE_TIER, settings.LLM_MODEL, settings.LLM_MAX_TOKENS)
+
+
+def classify_question(query: str, documents: List[Dict[str, Any]]) -> str:
+    words = WORD_PATTERN.findall(query.lower())
+
+    if len(words) > settings.MODEL_TIER_SMALL_MAX_QUERY_WORDS:
+        return "long_query"
+
+    # Several questions in one, or a why/compare/what-if question, needs reasoning
+    if query.count("?") > 1 or any(
+        word.startswith(keyword) for word in words for keyword in settings.MODEL_TIER_COMPLEX_KEYWORDS
+    ):
+        return "complex_query"
+
+    top_score = max((document["score"] for document in documents), default=0.0)
+    if top_score < settings.MODEL_TIER_SMALL_MIN_SCORE:
+        return "low_confidence"
+
+    # A single-fact lookup is answered from one document
+    sources = {document["metadata"].get("source") for document in documents}
+    if len(sources) > settings.MODEL_TIER_SMALL_MAX_SOURCES:
+        return "multi_source"
+
+    return "simple_lookup"
+
+
+def choose_model_tier(query: str, documents: List[Dict[str, Any]]) -> Tuple[ModelTier, str]:
+    if not settings.MODEL_TIERING_ENABLED:
+        return get_model_tier(LARGE_TIER), "tiering_disabled"
+
+    reason = classify_question(query, documents)
+    decision_reasons[reason] = decision_reasons.get(reason, 0) + 1
+
+    tier = get_model_tier(SMALL_TIER if reason == "simple_lookup" else LARGE_TIER)
+    logger.debug("Routing query to %s model %s (%s): %.50s", tier.name, tier.model, reason, query)
+    return tier, reason
+
+
+def should_escalate(tier: ModelTier, answer: str) -> bool:
+    # The small model gave up; the large one may still find the answer in the context
+    return (
+        tier.name == SMALL_TIER
+        and settings.MODEL_TIER_ESCALATE_ON_FALLBACK
+        and settings.DEFAULT_RESPONSE.rstrip(".") in answer
+    )
+
+
+def record_tier_call(tier: ModelTier, elapsed_seconds: float, failed: bool = False):
+    metrics = tier_metrics[tier.name]
+    metrics["requests"] += 1
+    metrics["total_seconds"] += elapsed_seconds
+    if failed:
+        metrics["errors"] += 1
+
+
+def record_escalation(tier: ModelTier):
+    tier_metrics[tier.name]["escalations"] += 1
+
+
+def get_model_tier_metrics() -> Dict[str, Dict[str, float]]:
+    tiers = {
+        name: {
+            "requests": metrics["requests"],
+            "errors": metrics["errors"],
+            "escalations": metrics["escalations"],
+            "mean_latency_ms": metrics["total_seconds"] / metrics["requests"] * 1000 if metrics["requests"] else 0.0,
+        }
+        for name, metrics in tier_metrics.items()
+    }
+    tiers["reasons"] = dict(decision_reasons)
+    return tiers
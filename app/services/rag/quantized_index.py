@@ -0,0 +1,229 @@
+import json
+import logging
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.errors import VectorStoreError
+from app.services.rag.chunk_store import ChunkStore, build_chunk_store
+from app.services.rag.snapshots import serving_quantized_index_path
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_INDEX_TYPES = ("int8", "binary")
+
+MANIFEST_FILENAME = "manifest.json"
+CHUNKS_FILENAME = "chunks.json"
+CHUNK_STORE_DIRNAME = "chunks"
+FULL_PRECISION_FILENAME = "full_precision.npy"
+INT8_CODES_FILENAME = "int8_codes.npy"
+INT8_SCALES_FILENAME = "int8_scales.npy"
+BINARY_CODES_FILENAME = "binary_codes.npy"
+
+# Rows scored per step so int8 codes are never widened to float32 all at once
+SCORING_BLOCK_ROWS = 8192
+
+POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+quantized_indexes = {}
+quantized_index_lock = threading.Lock()
+
+
+def l2_relevance_score(cosine_similarity: np.ndarray) -> np.ndarray:
+    # Chroma's L2 space returns the squared distance, 2 - 2cos for unit vectors,
+    # and LangChain scores it as 1 - d / sqrt(2); doing the same keeps
+    # RELEVANCE_THRESHOLD meaning the same thing in every index mode
+    squared_distances = np.maximum(0.0, 2.0 - 2.0 * cosine_similarity)
+    return np.clip(1.0 - squared_distances / np.sqrt(2.0), 0.0, 1.0)
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    return np.packbits(vectors > 0, axis=1)
+
+
+class QuantizedIndex:
+    def __init__(self, index_path: str, index_type: str):
+        index_directory = Path(index_path)
+
+        with open(index_directory / MANIFEST_FILENAME, "r", encoding="utf-8") as manifest_file:
+            self.manifest = json.load(manifest_file)
+
+        # Indexes built before the columnar chunk store keep their chunks in one JSON file
+        if (index_directory / CHUNKS_FILENAME).exists():
+            with open(index_directory / CHUNKS_FILENAME, "r", encoding="utf-8") as chunks_file:
+                self.chunks = json.load(chunks_file)
+        else:
+            self.chunks = ChunkStore(str(index_directory / CHUNK_STORE_DIRNAME))
+
+        self.index_type = index_type
+        self.full_precision = np.load(index_directory / FULL_PRECISION_FILENAME, mmap_mode="r")
+
+        if index_type == "int8":
+            self.codes = np.load(index_directory / INT8_CODES_FILENAME)
+            self.scales = np.load(index_directory / INT8_SCALES_FILENAME)
+        elif index_type == "binary":
+            self.codes = np.load(index_directory / BINARY_CODES_FILENAME)
+            self.scales = None
+        else:
+            raise VectorStoreError(f"Unknown quantized index type: {index_type}")
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def approximate_scores(self, query_vectors: np.ndarray) -> np.ndarray:
+        # One column of scores per query, so a batch decodes each int8 block once
+        if self.index_type == "int8":
+            scores = np.empty((len(self.codes), len(query_vectors)), dtype=np.float32)
+            for block_start in range(0, len(self.codes), SCORING_BLOCK_ROWS):
+                block = self.codes[block_start:block_start + SCORING_BLOCK_ROWS]
+                scores[block_start:block_start + len(block)] = block.astype(np.float32) @ query_vectors.T
+            return scores * self.scales[:, None]
+
+        # Binary codes: fewer differing sign bits means a closer vector
+        scores = np.empty((len(self.codes), len(query_vectors)), dtype=np.float32)
+        for column, query_code in enumerate(np.packbits(query_vectors > 0, axis=1)):
+            hamming_distances = POPCOUNT_TABLE[np.bitwise_xor(self.codes, query_code)].sum(axis=1, dtype=np.int32)
+            scores[:, column] = -hamming_distances
+        return scores
+
+    def search(self, query_embedding: List[float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        return [(self.chunks[row], score) for row, score in self.search_rows(query_embedding, k)]
+
+    def search_rows(self, query_embedding: List[float], k: int) -> List[Tuple[int, float]]:
+        return self.search_rows_batch([query_embedding], k)[0]
+
+    def search_rows_batch(self, query_embeddings: List[List[float]], k: int) -> List[List[Tuple[int, float]]]:
+        if len(self) == 0 or k <= 0:
+            return [[] for _ in query_embeddings]
+
+        query_vectors = normalize_vectors(np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1))
+        approximate_batch = self.approximate_scores(query_vectors)
+
+        rerank_multiplier = (
+            settings.QUANTIZED_RERANK_MULTIPLIER
+            if self.index_type == "int8"
+            else settings.BINARY_RERANK_MULTIPLIER
+        )
+        shortlist_size = min(len(self), max(k, k * rerank_multiplier))
+
+        batch_results = []
+        for column, query_vector in enumerate(query_vectors):
+            approximate = approximate_batch[:, column]
+            if shortlist_size < len(approximate):
+                shortlist = np.argpartition(-approximate, shortlist_size - 1)[:shortlist_size]
+            else:
+                shortlist = np.arange(len(approximate))
+
+            # Exact re-rank reads only the shortlisted rows from the memory map
+            shortlist = np.sort(shortlist)
+            exact_similarities = np.asarray(self.full_precision[shortlist], dtype=np.float32) @ query_vector
+
+            top_positions = np.argsort(-exact_similarities)[:k]
+            relevance_scores = l2_relevance_score(exact_similarities[top_positions])
+
+            batch_results.append([
+                (int(shortlist[position]), float(score))
+                for position, score in zip(top_positions, relevance_scores)
+            ])
+
+        return batch_results
+
+
+def build_quantized_index(
+    index_path: str,
+    embeddings: np.ndarray,
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+):
+    index_directory = Path(index_path)
+    staging_directory = index_directory.with_name(index_directory.name + ".tmp")
+
+    try:
+        vectors = normalize_vectors(np.asarray(embeddings, dtype=np.float32))
+
+        if staging_directory.exists():
+            shutil.rmtree(staging_directory)
+        staging_directory.mkdir(parents=True)
+
+        int8_codes, int8_scales = quantize_int8(vectors)
+        np.save(staging_directory / FULL_PRECISION_FILENAME, vectors)
+        np.save(staging_directory / INT8_CODES_FILENAME, int8_codes)
+        np.save(staging_directory / INT8_SCALES_FILENAME, int8_scales)
+        np.save(staging_directory / BINARY_CODES_FILENAME, quantize_binary(vectors))
+
+        build_chunk_store(str(staging_directory / CHUNK_STORE_DIRNAME), documents, metadatas)
+
+        with open(staging_directory / MANIFEST_FILENAME, "w", encoding="utf-8") as manifest_file:
+            json.dump(
+                {
+                    "embedding_model": settings.EMBEDDING_MODEL,
+                    "count": int(vectors.shape[0]),
+                    "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                },
+                manifest_file,
+            )
+
+        if index_directory.exists():
+            shutil.rmtree(index_directory)
+        staging_directory.rename(index_directory)
+
+        logger.info(
+            f"Built quantized index with {len(documents)} vectors at {index_path} "
+            f"(int8 {int8_codes.nbytes / 1048576:.1f} MB, binary {vectors.shape[0] * ((vectors.shape[1] + 7) // 8) / 1048576:.1f} MB, "
+            f"float32 {vectors.nbytes / 1048576:.1f} MB on disk)"
+        )
+    except Exception as e:
+        logger.exception(f"Error building quantized index at {index_path}")
+        raise VectorStoreError(f"Error building quantized index: {str(e)}")
+
+
+def get_quantized_index(index_path: Optional[str] = None) -> QuantizedIndex:
+    index_path = index_path or serving_quantized_index_path()
+
+    index = quantized_indexes.get(index_path)
+    if index is not None and index.index_type == settings.VECTOR_INDEX_TYPE:
+        return index
+
+    with quantized_index_lock:
+        index = quantized_indexes.get(index_path)
+        if index is None or index.index_type != settings.VECTOR_INDEX_TYPE:
+            try:
+                index = QuantizedIndex(index_path, settings.VECTOR_INDEX_TYPE)
+            except VectorStoreError:
+                raise
+            except Exception as e:
+                logger.exception(f"Failed to load quantized index from {index_path}")
+                raise VectorStoreError(f"Failed to load quantized index: {str(e)}")
+            quantized_indexes[index_path] = index
+            logger.info(f"Loaded {settings.VECTOR_INDEX_TYPE} quantized index with {len(index)} vectors from {index_path}")
+
+    return index
+
+
+def reset_quantized_index():
+    with quantized_index_lock:
+        quantized_indexes.clear()
+
+
+def evict_quantized_indexes(keep_root: str):
+    # Searches already holding an evicted index finish against it
+    with quantized_index_lock:
+        for index_path in [index_path for index_path in quantized_indexes if not index_path.startswith(keep_root)]:
+            del quantized_indexes[index_path]
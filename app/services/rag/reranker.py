@@ -0,0 +1,67 @@
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.rag.quantized_index import normalize_vectors
+
+logger = logging.getLogger(__name__)
+
+
+def maximal_marginal_relevance(
+    query_embedding: List[float],
+    candidate_embeddings: List[List[float]],
+    k: int,
+    lambda_mult: float,
+) -> List[int]:
+    candidates = normalize_vectors(np.asarray(candidate_embeddings, dtype=np.float32))
+    if len(candidates) == 0 or k <= 0:
+        return []
+
+    query_vector = normalize_vectors(np.asarray(query_embedding, dtype=np.float32))
+    query_similarities = candidates @ query_vector
+
+    # Every pairwise similarity in one matrix product; the greedy loop
+    # below only takes running maxima over its rows
+    pairwise_similarities = candidates @ candidates.T
+
+    first = int(np.argmax(query_similarities))
+    selected = [first]
+    max_redundancy = pairwise_similarities[first].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[first] = False
+
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * query_similarities - (1.0 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_redundancy, pairwise_similarities[chosen], out=max_redundancy)
+
+    return selected
+
+
+def rerank_results(
+    query_embedding: List[float],
+    results: List[Dict[str, Any]],
+    k: int,
+    lambda_mult: float,
+) -> List[Dict[str, Any]]:
+    if not results:
+        return []
+
+    selected = maximal_marginal_relevance(
+        query_embedding,
+        [result["embedding"] for result in results],
+        k,
+        lambda_mult,
+    )
+
+    logger.debug("MMR kept %d of %d candidates", len(selected), len(results))
+
+    return [
+        {key: value for key, value in results[position].items() if key != "embedding"}
+        for position in selected
+    ]
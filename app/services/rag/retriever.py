@@ -1,44 +1,252 @@
+import asyncio
 import logging
-from typing import List, Dict, Any, Tuple, Optional
+import time
+from typing import List, Dict, Any, AsyncIterator, Tuple, Optional
 import openai
+import orjson
 
 from app.config import settings
-from app.core.errors import RAGError, NoRelevantDocumentsError
-from app.services.rag.vector_store import similarity_search
+from app.core.admission import admit, start_request_deadline
+from app.core.cache import Cache
+from app.core.errors import RAGError, NoRelevantDocumentsError, ServiceOverloadedError
+from app.core.resilience import call_upstream
+from app.services.rag.chunk_store import materialize_chunks
+from app.services.rag.faq import find_faq_answer
+from app.services.rag.model_router import (
+    LARGE_TIER,
+    ModelTier,
+    choose_model_tier,
+    get_model_tier,
+    record_escalation,
+    record_tier_call,
+    should_escalate,
+)
+from app.services.rag.reranker import rerank_results
+from app.services.rag.router import record_routing_fallback, route_query
+from app.services.rag.snapshots import get_serving_version
+from app.services.rag.vector_store import embed_queries, embed_query, similarity_search_batch
 
 logger = logging.getLogger(__name__)
 
+def dump_cached_answer(result: Tuple[str, List[Dict[str, Any]]]) -> bytes:
+    answer, sources = result
+    return orjson.dumps({"answer": answer, "sources": sources}, option=orjson.OPT_SERIALIZE_NUMPY)
 
-async def query_rag_system(query: str) -> Tuple[str, List[Dict[str, Any]]]:
-    try:
-        results = await similarity_search(
-            query=query,
-            k=settings.RETRIEVAL_TOP_K,
-        )
-        
-        if not results:
-            logger.warning(f"No relevant documents found for query: {query}")
-            raise NoRelevantDocumentsError()
-        
+
+def load_cached_answer(data: bytes) -> Tuple[str, List[Dict[str, Any]]]:
+    cached = orjson.loads(data)
+    return cached["answer"], cached["sources"]
+
+
+answer_cache = Cache(
+    "answer",
+    settings.ANSWER_CACHE_TTL_SECONDS,
+    dumps=dump_cached_answer,
+    loads=load_cached_answer,
+    enabled=settings.ANSWER_CACHE_ENABLED,
+)
+
+
+async def search_relevant_documents_batch(
+    queries: List[str],
+    query_embeddings: List[List[float]],
+    partitions: Optional[List[str]] = None,
+) -> List[List[Dict[str, Any]]]:
+    # With MMR on, over-fetch so near-duplicate chunks can be swapped out
+    fetch_k = settings.RETRIEVAL_TOP_K
+    if settings.MMR_ENABLED:
+        fetch_k *= settings.MMR_FETCH_MULTIPLIER
+    
+    batch_results = await similarity_search_batch(
+        queries,
+        fetch_k,
+        query_embeddings,
+        partitions=partitions,
+        include_embeddings=settings.MMR_ENABLED,
+        materialize=False,
+    )
+    
+    relevant_batch = []
+    for query_embedding, results in zip(query_embeddings, batch_results):
         relevant_results = [
             result for result in results
             if result["score"] >= settings.RELEVANCE_THRESHOLD
         ]
         
-        if not relevant_results:
-            logger.warning(f"No documents above relevance threshold for query: {query}")
-            raise NoRelevantDocumentsError()
+        if settings.MMR_ENABLED:
+            relevant_results = rerank_results(
+                query_embedding,
+                relevant_results,
+                settings.RETRIEVAL_TOP_K,
+                settings.MMR_LAMBDA,
+            )
+        
+        relevant_batch.append(materialize_chunks(relevant_results))
+    
+    return relevant_batch
+
+
+async def retrieve_documents_batch(
+    queries: List[str],
+    query_embeddings: List[List[float]],
+) -> List[List[Dict[str, Any]]]:
+    # Queries routed to the same partitions share one batched search
+    route_groups = {}
+    routes = []
+    for position, (query, query_embedding) in enumerate(zip(queries, query_embeddings)):
+        partitions = route_query(query, query_embedding)
+        routes.append(partitions)
+        route_groups.setdefault(tuple(partitions or ()), []).append(position)
+    
+    async def search_group(partitions, positions):
+        return positions, await search_relevant_documents_batch(
+            [queries[position] for position in positions],
+            [query_embeddings[position] for position in positions],
+            list(partitions) or None,
+        )
+    
+    relevant_batch = [[] for _ in queries]
+    for positions, group_results in await asyncio.gather(
+        *[search_group(partitions, positions) for partitions, positions in route_groups.items()]
+    ):
+        for position, relevant_results in zip(positions, group_results):
+            relevant_batch[position] = relevant_results
+    
+    # The router guessed wrong for these; the answer may live in another partition
+    fallback_positions = [
+        position for position, partitions in enumerate(routes)
+        if partitions and not relevant_batch[position]
+    ]
+    if fallback_positions:
+        logger.info("No relevant documents in routed partitions for %d queries, searching all documents", len(fallback_positions))
+        for _ in fallback_positions:
+            record_routing_fallback()
+        _, fallback_results = await search_group((), fallback_positions)
+        for position, relevant_results in zip(fallback_positions, fallback_results):
+            relevant_batch[position] = relevant_results
+    
+    return relevant_batch
+
+
+async def retrieve_documents(query: str, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    if query_embedding is None:
+        query_embedding = await embed_query(query)
+    
+    relevant_results = (await retrieve_documents_batch([query], [query_embedding]))[0]
+    
+    if not relevant_results:
+        logger.warning("No documents above relevance threshold for query: %.50s", query)
+        raise NoRelevantDocumentsError()
+    
+    return relevant_results
+
+
+def answer_cache_key(query: str) -> str:
+    # A new snapshot or model changes the answer, so both are part of the key
+    return answer_cache.make_key(
+        get_serving_version(),
+        settings.LLM_MODEL,
+        settings.LLM_SMALL_MODEL if settings.MODEL_TIERING_ENABLED else "",
+        settings.RETRIEVAL_TOP_K,
+        settings.RELEVANCE_THRESHOLD,
+        " ".join(query.lower().split()),
+    )
+
+
+async def query_rag_system(query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    return await answer_cache.get_or_compute(answer_cache_key(query), lambda: compute_answer(query))
+
+
+async def compute_answer(query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    try:
+        query_embedding = await embed_query(query)
+        
+        faq_match = find_faq_answer(query_embedding)
+        if faq_match is not None:
+            faq_answer, faq_sources, _ = faq_match
+            return faq_answer, faq_sources
+        
+        relevant_results = await retrieve_documents(query, query_embedding)
         
         answer = await generate_answer(query, relevant_results)
         
         return answer, relevant_results
-    except NoRelevantDocumentsError:
+    except (NoRelevantDocumentsError, ServiceOverloadedError):
         raise
     except Exception as e:
-        logger.exception(f"Error querying RAG system for query: {query}")
+        logger.exception("Error querying RAG system for query: %.50s", query)
         raise RAGError(f"Error querying RAG system: {str(e)}")
 
 
+async def query_rag_system_batch(
+    queries: List[str],
+) -> AsyncIterator[Tuple[int, Optional[Tuple[str, List[Dict[str, Any]]]], Optional[Exception]]]:
+    results_queue = asyncio.Queue()
+    generation_slots = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    
+    async def answer_query(position: int, relevant_results: List[Dict[str, Any]]):
+        async with generation_slots:
+            # Each item gets its own deadline; the batch as a whole may run for minutes
+            start_request_deadline()
+            try:
+                answer = await generate_answer(queries[position], relevant_results)
+                results_queue.put_nowait((position, (answer, relevant_results), None))
+            except Exception as error:
+                results_queue.put_nowait((position, None, error))
+    
+    async def prepare_windows():
+        generation_tasks = []
+        
+        try:
+            for window_start in range(0, len(queries), settings.EMBEDDING_BATCH_SIZE):
+                window_queries = queries[window_start:window_start + settings.EMBEDDING_BATCH_SIZE]
+                start_request_deadline()
+                
+                try:
+                    window_embeddings = await embed_queries(window_queries)
+                    
+                    pending_offsets = []
+                    faq_answers = {}
+                    for offset, query_embedding in enumerate(window_embeddings):
+                        faq_match = find_faq_answer(query_embedding)
+                        if faq_match is not None:
+                            faq_answers[offset] = faq_match
+                        else:
+                            pending_offsets.append(offset)
+                    
+                    relevant_batch = await retrieve_documents_batch(
+                        [window_queries[offset] for offset in pending_offsets],
+                        [window_embeddings[offset] for offset in pending_offsets],
+                    )
+                except Exception as error:
+                    logger.exception("Error preparing batch queries %d-%d", window_start, window_start + len(window_queries) - 1)
+                    for offset in range(len(window_queries)):
+                        results_queue.put_nowait((window_start + offset, None, error))
+                    continue
+                
+                for offset, (faq_answer, faq_sources, _) in faq_answers.items():
+                    results_queue.put_nowait((window_start + offset, (faq_answer, faq_sources), None))
+                
+                for offset, relevant_results in zip(pending_offsets, relevant_batch):
+                    if not relevant_results:
+                        results_queue.put_nowait((window_start + offset, None, NoRelevantDocumentsError()))
+                        continue
+                    generation_tasks.append(asyncio.create_task(answer_query(window_start + offset, relevant_results)))
+            
+            await asyncio.gather(*generation_tasks)
+        finally:
+            for generation_task in generation_tasks:
+                generation_task.cancel()
+
+    producer = asyncio.create_task(prepare_windows())
+    try:
+        for _ in range(len(queries)):
+            yield await results_queue.get()
+        await producer
+    finally:
+        producer.cancel()
+
+
 async def generate_answer(query: str, documents: List[Dict[str, Any]]) -> str:
     try:
         context = "\n\n".join([doc["content"] for doc in documents])
@@ -54,22 +262,50 @@ async def generate_answer(query: str, documents: List[Dict[str, Any]]) -> str:
 "Моля, опитайте се да формулирате въпроса по-точно, за да мога да помогна."
 """
         
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        tier, reason = choose_model_tier(query, documents)
         
-        response = client.chat.completions.create(
-            model=settings.LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "Ти си полезен асистент, който помага на хората в България да разберат услугите на Агенцията за социално подпомагане."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.0,
-            max_tokens=1000,
-        )
+        answer = await complete_prompt(prompt, tier)
         
-        answer = response.choices[0].message.content.strip()
+        if should_escalate(tier, answer):
+            logger.info("Escalating query from %s to the large model: %.50s", tier.model, query)
+            record_escalation(tier)
+            tier = get_model_tier(LARGE_TIER)
+            answer = await complete_prompt(prompt, tier)
         
-        logger.info(f"Generated answer for query: {query[:50]}...")
+        logger.info("Generated answer with %s (%s) for query: %.50s...", tier.model, reason, query)
         return answer
+    except ServiceOverloadedError:
+        raise
     except Exception as e:
-        logger.exception(f"Error generating answer for query: {query}")
-        raise RAGError(f"Error generating answer: {str(e)}")
\ No newline at end of file
+        logger.exception("Error generating answer for query: %.50s", query)
+        raise RAGError(f"Error generating answer: {str(e)}")
+
+
+async def complete_prompt(prompt: str, tier: ModelTier) -> str:
+    client = openai.OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        max_retries=0,
+    )
+    
+    async with admit("llm"):
+        start_time = time.perf_counter()
+        try:
+            response = await call_upstream(
+                "openai_chat",
+                client.chat.completions.create,
+                model=tier.model,
+                messages=[
+                    {"role": "system", "content": "Ти си полезен асистент, който помага на хората в България да разберат услугите на Агенцията за социално подпомагане."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.0,
+                max_tokens=tier.max_tokens,
+                timeout_keyword="timeout",
+            )
+        except Exception:
+            record_tier_call(tier, time.perf_counter() - start_time, failed=True)
+            raise
+        record_tier_call(tier, time.perf_counter() - start_time)
+    
+    return response.choices[0].message.content.strip()
\ No newline at end of file
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.core.errors import VectorStoreError
+from app.services.rag.quantized_index import normalize_vectors
+from app.services.rag.snapshots import serving_vector_store_path
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MANIFEST_FILENAME = "partitions.json"
+UNCATEGORIZED_PARTITION = "general"
+
+partition_router = None
+partition_router_loaded = False
+partition_router_lock = threading.Lock()
+
+routing_metrics = {"routed": 0, "global": 0, "fallbacks": 0}
+
+
+class PartitionRouter:
+    def __init__(self, partitions: Dict[str, Dict[str, Any]], keywords: Dict[str, List[str]]):
+        self.names = list(partitions)
+        self.centroids = normalize_vectors(
+            np.asarray([partitions[name]["centroid"] for name in self.names], dtype=np.float32)
+        )
+        self.keywords = {
+            name: [keyword.lower() for keyword in keywords.get(name, [])]
+            for name in self.names
+        }
+
+    def route(self, query: str, query_embedding: List[float]) -> Optional[List[str]]:
+        if len(self.names) < 2:
+            return None
+
+        max_partitions = settings.PARTITION_ROUTER_MAX_PARTITIONS
+
+        # An explicit keyword is a stronger signal than embedding similarity
+        query_text = query.lower()
+        keyword_matches = [
+            name for name in self.names
+            if any(keyword in query_text for keyword in self.keywords[name])
+        ]
+        if keyword_matches:
+            return keyword_matches[:max_partitions] if len(keyword_matches) < len(self.names) else None
+
+        query_vector = normalize_vectors(np.asarray(query_embedding, dtype=np.float32))
+        similarities = self.centroids @ query_vector
+        ranked = np.argsort(-similarities)
+        best_similarity = float(similarities[ranked[0]])
+
+        if best_similarity < settings.PARTITION_ROUTER_MIN_SIMILARITY:
+            return None
+
+        selected = [
+            self.names[position] for position in ranked[:max_partitions]
+            if similarities[position] >= best_similarity - settings.PARTITION_ROUTER_MARGIN
+        ]
+
+        # Searching every partition is just a slower global search
+        if len(selected) == len(self.names):
+            return None
+
+        return selected
+
+
+def partition_collection_name(partition: str) -> str:
+    # Category values may be Cyrillic; collection and directory names may not
+    return f"partition_{hashlib.sha1(partition.encode('utf-8')).hexdigest()[:16]}"
+
+
+def partition_of(metadata: Optional[Dict[str, Any]]) -> str:
+    return str((metadata or {}).get(settings.PARTITION_METADATA_KEY) or UNCATEGORIZED_PARTITION)
+
+
+def group_by_partition(metadatas: List[Optional[Dict[str, Any]]]) -> Dict[str, List[int]]:
+    partition_rows = {}
+    for row, metadata in enumerate(metadatas):
+        partition_rows.setdefault(partition_of(metadata), []).append(row)
+    return partition_rows
+
+
+def load_partition_manifest(vector_store_path: str) -> Optional[Dict[str, Any]]:
+    manifest_path = Path(vector_store_path) / PARTITION_MANIFEST_FILENAME
+
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_partition_manifest(vector_store_path: str, partitions: Dict[str, Dict[str, Any]]):
+    manifest_path = Path(vector_store_path) / PARTITION_MANIFEST_FILENAME
+    staging_path = manifest_path.with_name(manifest_path.name + ".tmp")
+
+    try:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(staging_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(
+                {
+                    "embedding_model": settings.EMBEDDING_MODEL,
+                    "metadata_key": settings.PARTITION_METADATA_KEY,
+                    "partitions": partitions,
+                },
+                manifest_file,
+                ensure_ascii=False,
+            )
+        os.replace(staging_path, manifest_path)
+
+        logger.info(f"Saved partition manifest with {len(partitions)} partitions to {manifest_path}")
+    except Exception as e:
+        logger.exception(f"Error saving partition manifest to {manifest_path}")
+        raise VectorStoreError(f"Error saving partition manifest: {str(e)}")
+
+
+def load_partition_keywords(keywords_path: str) -> Dict[str, List[str]]:
+    if not Path(keywords_path).exists():
+        return {}
+
+    with open(keywords_path, "r", encoding="utf-8") as keywords_file:
+        return json.load(keywords_file)
+
+
+def load_partition_router() -> Optional[PartitionRouter]:
+    manifest = load_partition_manifest(serving_vector_store_path())
+
+    if manifest is None:
+        logger.info("No partition manifest found; searching the whole index")
+        return None
+
+    if manifest.get("metadata_key") != settings.PARTITION_METADATA_KEY:
+        logger.warning(
+            f"Partitions were built on {manifest.get('metadata_key')}, but "
+            f"{settings.PARTITION_METADATA_KEY} is configured; partition routing disabled"
+        )
+        return None
+
+    if manifest.get("embedding_model") != settings.EMBEDDING_MODEL:
+        logger.warning(
+            f"Partitions were built with {manifest.get('embedding_model')}, "
+            f"but {settings.EMBEDDING_MODEL} is configured; partition routing disabled"
+        )
+        return None
+
+    router = PartitionRouter(manifest["partitions"], load_partition_keywords(settings.PARTITION_KEYWORDS_PATH))
+    logger.info(f"Loaded partition router with {len(router.names)} partitions")
+    return router
+
+
+def get_partition_router() -> Optional[PartitionRouter]:
+    global partition_router, partition_router_loaded
+
+    if partition_router_loaded:
+        return partition_router
+
+    with partition_router_lock:
+        if not partition_router_loaded:
+            try:
+                partition_router = load_partition_router()
+            except Exception:
+                logger.exception("Failed to load partition router")
+                partition_router = None
+            partition_router_loaded = True
+
+    return partition_router
+
+
+def reset_partition_router():
+    global partition_router_loaded
+
+    with partition_router_lock:
+        partition_router_loaded = False
+
+
+def route_query(query: str, query_embedding: List[float]) -> Optional[List[str]]:
+    if not settings.PARTITION_ROUTING_ENABLED:
+        return None
+
+    router = get_partition_router()
+    partitions = router.route(query, query_embedding) if router is not None else None
+
+    if partitions:
+        routing_metrics["routed"] += 1
+        logger.info("Routing query to partitions %s: %.50s", partitions, query)
+    else:
+        routing_metrics["global"] += 1
+
+    return partitions
+
+
+def record_routing_fallback():
+    routing_metrics["fallbacks"] += 1
+
+
+def get_routing_metrics() -> Dict[str, int]:
+    return dict(routing_metrics)
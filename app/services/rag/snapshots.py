@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.errors import VectorStoreError
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_POINTER_FILENAME = "ACTIVE"
+SNAPSHOT_MANIFEST_FILENAME = "snapshot.json"
+SNAPSHOT_VECTOR_STORE_DIRNAME = "vector_store"
+SNAPSHOT_QUANTIZED_INDEX_DIRNAME = "quantized_index"
+SNAPSHOT_CHUNK_STORE_DIRNAME = "chunk_store"
+
+UNSET = object()
+
+# Version this process is serving; None means the legacy in-place paths
+serving_version = UNSET
+serving_checked_at = 0.0
+
+
+def snapshot_root() -> Path:
+    return Path(settings.VECTOR_SNAPSHOT_PATH)
+
+
+def snapshot_directory(version: str) -> Path:
+    return snapshot_root() / version
+
+
+def snapshot_vector_store_path(version: str) -> str:
+    return str(snapshot_directory(version) / SNAPSHOT_VECTOR_STORE_DIRNAME)
+
+
+def snapshot_quantized_index_path(version: str) -> str:
+    return str(snapshot_directory(version) / SNAPSHOT_QUANTIZED_INDEX_DIRNAME)
+
+
+def snapshot_chunk_store_path(version: str) -> str:
+    return str(snapshot_directory(version) / SNAPSHOT_CHUNK_STORE_DIRNAME)
+
+
+def new_snapshot_version() -> str:
+    return datetime.now(timezone.utc).strftime("v%Y%m%dT%H%M%S%fZ")
+
+
+def read_active_version() -> Optional[str]:
+    if not settings.VECTOR_SNAPSHOTS_ENABLED:
+        return None
+
+    pointer_path = snapshot_root() / ACTIVE_POINTER_FILENAME
+    try:
+        version = pointer_path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+    return version or None
+
+
+def write_active_version(version: str):
+    pointer_path = snapshot_root() / ACTIVE_POINTER_FILENAME
+    staging_path = pointer_path.with_name(pointer_path.name + ".tmp")
+
+    # Workers read the pointer without locking, so it must change in one step
+    staging_path.write_text(version, encoding="utf-8")
+    os.replace(staging_path, pointer_path)
+
+
+def load_snapshot_manifest(version: str) -> Optional[Dict[str, Any]]:
+    manifest_path = snapshot_directory(version) / SNAPSHOT_MANIFEST_FILENAME
+
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_snapshot_manifest(version: str, manifest: Dict[str, Any]):
+    manifest_path = snapshot_directory(version) / SNAPSHOT_MANIFEST_FILENAME
+
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        json.dump({"version": version, **manifest}, manifest_file, ensure_ascii=False, indent=2)
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    root = snapshot_root()
+    if not root.exists():
+        return []
+
+    # Directories without a manifest were never validated and are never served
+    snapshots = []
+    for snapshot_path in sorted(root.iterdir()):
+        if snapshot_path.is_dir():
+            manifest = load_snapshot_manifest(snapshot_path.name)
+            if manifest is not None:
+                snapshots.append(manifest)
+
+    return snapshots
+
+
+def activate_snapshot(version: str):
+    manifest = load_snapshot_manifest(version)
+    if manifest is None:
+        raise VectorStoreError(f"Snapshot {version} does not exist or was never validated")
+
+    if manifest.get("embedding_model") != settings.EMBEDDING_MODEL:
+        raise VectorStoreError(
+            f"Snapshot {version} was built with {manifest.get('embedding_model')}, "
+            f"but {settings.EMBEDDING_MODEL} is configured"
+        )
+
+    write_active_version(version)
+    logger.info(f"Activated vector store snapshot {version}")
+
+
+def rollback_snapshot() -> str:
+    active_version = read_active_version()
+    if active_version is None:
+        # Serving from the legacy in-place store; every snapshot is newer than it
+        raise VectorStoreError("No snapshot is active, so there is nothing to roll back from")
+
+    older_versions = [
+        snapshot["version"] for snapshot in list_snapshots()
+        if snapshot["version"] < active_version
+    ]
+
+    if not older_versions:
+        raise VectorStoreError(f"No snapshot older than {active_version} to roll back to")
+
+    activate_snapshot(older_versions[-1])
+    return older_versions[-1]
+
+
+def discard_snapshot(version: str):
+    shutil.rmtree(snapshot_directory(version), ignore_errors=True)
+
+
+def prune_snapshots():
+    active_version = read_active_version()
+    versions = [snapshot["version"] for snapshot in list_snapshots()]
+
+    # Keep the newest few plus whatever is active, so a rollback target always exists
+    retained = set(versions[-settings.VECTOR_SNAPSHOT_RETAIN:]) | {active_version}
+    for version in versions:
+        if version not in retained:
+            logger.info(f"Removing old vector store snapshot {version}")
+            discard_snapshot(version)
+
+
+def get_serving_version() -> Optional[str]:
+    global serving_version
+
+    if serving_version is UNSET:
+        serving_version = read_active_version()
+
+    return serving_version
+
+
+def set_serving_version(version: Optional[str]):
+    global serving_version
+    serving_version = version
+
+
+def poll_snapshot_change() -> Optional[str]:
+    global serving_checked_at
+
+    # A stat-sized read at most every few seconds, so searches never wait on it
+    now = time.monotonic()
+    if not settings.VECTOR_SNAPSHOTS_ENABLED or now - serving_checked_at < settings.VECTOR_SNAPSHOT_CHECK_SECONDS:
+        return None
+    serving_checked_at = now
+
+    active_version = read_active_version()
+    if active_version is None or active_version == get_serving_version():
+        return None
+
+    return active_version
+
+
+def serving_vector_store_path() -> str:
+    version = get_serving_version()
+    return snapshot_vector_store_path(version) if version else settings.VECTOR_STORE_PATH
+
+
+def serving_quantized_index_path() -> str:
+    version = get_serving_version()
+    return snapshot_quantized_index_path(version) if version else settings.QUANTIZED_INDEX_PATH
+
+
+def serving_chunk_store_path() -> str:
+    version = get_serving_version()
+    return snapshot_chunk_store_path(version) if version else settings.CHUNK_STORE_PATH
@@ -1,19 +1,85 @@
+import asyncio
 import logging
 import os
-from typing import List, Dict, Any, Optional
+import shutil
+from typing import Callable, List, Dict, Any, Optional
 from pathlib import Path
 
+import numpy as np
 from langchain.vectorstores import Chroma
 from langchain.embeddings.openai import OpenAIEmbeddings
 
 from app.config import settings
-from app.core.errors import VectorStoreError
+from app.core.cache import MISSING, Cache
+from app.core.errors import VectorStoreError, ServiceOverloadedError
+from app.core.resilience import call_upstream
+from app.services.rag.chunk_store import (
+    ChunkStore,
+    build_chunk_store,
+    chunk_reference,
+    evict_chunk_stores,
+    get_chunk_store,
+    materialize_chunks,
+    reset_chunk_stores,
+)
 from app.services.rag.document_processor import process_documents
+from app.services.rag.faq import reload_faq_index
+from app.services.rag.quantized_index import (
+    QUANTIZED_INDEX_TYPES,
+    QuantizedIndex,
+    build_quantized_index,
+    evict_quantized_indexes,
+    get_quantized_index,
+    normalize_vectors,
+    reset_quantized_index,
+)
+from app.services.rag.router import (
+    group_by_partition,
+    load_partition_manifest,
+    partition_collection_name,
+    reset_partition_router,
+    save_partition_manifest,
+)
+from app.services.rag.snapshots import (
+    activate_snapshot,
+    discard_snapshot,
+    get_serving_version,
+    new_snapshot_version,
+    poll_snapshot_change,
+    prune_snapshots,
+    save_snapshot_manifest,
+    serving_chunk_store_path,
+    serving_quantized_index_path,
+    serving_vector_store_path,
+    set_serving_version,
+    snapshot_chunk_store_path,
+    snapshot_quantized_index_path,
+    snapshot_vector_store_path,
+)
 
 logger = logging.getLogger(__name__)
 
 vector_store = None
 embeddings = None
+partition_stores = {}
+
+snapshot_swap_lock = asyncio.Lock()
+
+# Chroma rejects very large single writes
+PARTITION_UPSERT_BATCH_SIZE = 5000
+
+# Called with (stage, done, total) as indexing moves along
+ProgressCallback = Callable[[str, int, int], None]
+
+# float32 is what the indexes store anyway, at half the size of a JSON list
+embedding_cache = Cache(
+    "embedding",
+    settings.EMBEDDING_CACHE_TTL_SECONDS,
+    dumps=lambda vector: np.asarray(vector, dtype=np.float32).tobytes(),
+    loads=lambda data: np.frombuffer(data, dtype=np.float32).tolist(),
+    enabled=settings.EMBEDDING_CACHE_ENABLED,
+    compress=False,
+)
 
 
 async def initialize_embeddings():
@@ -24,6 +90,8 @@ async def initialize_embeddings():
             embeddings = OpenAIEmbeddings(
                 model=settings.EMBEDDING_MODEL,
                 openai_api_key=settings.OPENAI_API_KEY,
+                request_timeout=settings.EMBEDDING_TIMEOUT_SECONDS,
+                max_retries=0,
             )
             logger.info("Embeddings model initialized successfully")
         
@@ -33,6 +101,17 @@ async def initialize_embeddings():
         raise VectorStoreError(f"Failed to initialize embeddings model: {str(e)}")
 
 
+def open_chroma(persist_directory: str, embedding_model, collection_name: Optional[str] = None):
+    if collection_name is None:
+        return Chroma(persist_directory=persist_directory, embedding_function=embedding_model)
+    
+    return Chroma(
+        collection_name=collection_name,
+        persist_directory=persist_directory,
+        embedding_function=embedding_model,
+    )
+
+
 async def initialize_vector_store():
     global vector_store, embeddings
     
@@ -40,22 +119,16 @@ async def initialize_vector_store():
         if embeddings is None:
             await initialize_embeddings()
         
-        vector_store_path = Path(settings.VECTOR_STORE_PATH)
+        vector_store_path = Path(serving_vector_store_path())
         
         if vector_store_path.exists():
-            vector_store = Chroma(
-                persist_directory=str(vector_store_path),
-                embedding_function=embeddings,
-            )
-            logger.info(f"Loaded existing vector store from {settings.VECTOR_STORE_PATH}")
+            vector_store = open_chroma(str(vector_store_path), embeddings)
+            logger.info(f"Loaded existing vector store from {vector_store_path}")
         else:
             vector_store_path.parent.mkdir(parents=True, exist_ok=True)
             
-            vector_store = Chroma(
-                persist_directory=str(vector_store_path),
-                embedding_function=embeddings,
-            )
-            logger.info(f"Created new vector store at {settings.VECTOR_STORE_PATH}")
+            vector_store = open_chroma(str(vector_store_path), embeddings)
+            logger.info(f"Created new vector store at {vector_store_path}")
         
         return vector_store
     except Exception as e:
@@ -67,56 +140,595 @@ async def initialize_vector_store():
 async def get_vector_store():
     global vector_store
     
+    await refresh_snapshot()
+    
     if vector_store is None:
         await initialize_vector_store()
     
     return vector_store
 
 
-async def index_documents(directory_path: str):
+async def refresh_snapshot():
+    global vector_store, partition_stores
+    
+    version = poll_snapshot_change()
+    
+    # Only one coroutine loads the new snapshot; the rest keep searching the old one
+    if version is None or snapshot_swap_lock.locked():
+        return
+    
+    async with snapshot_swap_lock:
+        try:
+            embedding_model = await initialize_embeddings()
+            
+            # Load everything before the swap so no search waits on disk
+            new_store = await asyncio.to_thread(open_chroma, snapshot_vector_store_path(version), embedding_model)
+            if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+                await asyncio.to_thread(get_quantized_index, snapshot_quantized_index_path(version))
+            await asyncio.to_thread(get_chunk_store, snapshot_chunk_store_path(version))
+        except Exception:
+            logger.exception(f"Failed to load vector store snapshot {version}; still serving {get_serving_version()}")
+            return
+        
+        previous_version = get_serving_version()
+        
+        vector_store = new_store
+        partition_stores = {}
+        set_serving_version(version)
+        reset_partition_router()
+        evict_quantized_indexes(snapshot_quantized_index_path(version))
+        evict_chunk_stores(snapshot_chunk_store_path(version))
+        
+        logger.info(f"Switched vector store from snapshot {previous_version} to {version}")
+        
+        # FAQ answers built against the previous snapshot stop being served
+        await asyncio.to_thread(reload_faq_index)
+
+
+def report_progress(progress: Optional[ProgressCallback], stage: str, done: int = 0, total: int = 0):
+    if progress is not None:
+        progress(stage, done, total)
+
+
+def add_chunks(store, chunks: List[Any], progress: Optional[ProgressCallback] = None):
+    # Embedded and written in batches, so progress shows while a large corpus is indexed
+    for batch_start in range(0, len(chunks), settings.INDEX_BATCH_SIZE):
+        store.add_documents(chunks[batch_start:batch_start + settings.INDEX_BATCH_SIZE])
+        report_progress(progress, "embedding", min(batch_start + settings.INDEX_BATCH_SIZE, len(chunks)), len(chunks))
+
+
+async def index_documents(directory_path: str, progress: Optional[ProgressCallback] = None) -> Optional[str]:
+    if settings.VECTOR_SNAPSHOTS_ENABLED:
+        return await build_snapshot(directory_path, progress)
+    
     try:
         logger.info(f"Indexing documents from {directory_path}")
         
+        report_progress(progress, "loading")
         chunks = await process_documents(directory_path)
         
         if not chunks:
             logger.warning(f"No documents found in {directory_path}")
-            return
+            return None
         
         store = await get_vector_store()
         
-        store.add_documents(chunks)
+        report_progress(progress, "embedding", 0, len(chunks))
+        add_chunks(store, chunks, progress)
         
         store.persist()
         
         logger.info(f"Indexed {len(chunks)} document chunks")
+        
+        if settings.CHUNK_STORE_ENABLED or settings.PARTITION_ROUTING_ENABLED or settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+            report_progress(progress, "indexing")
+            stored = await load_stored_chunks()
+            
+            if settings.CHUNK_STORE_ENABLED:
+                await export_chunk_store(stored)
+            
+            if settings.PARTITION_ROUTING_ENABLED:
+                await build_partition_indexes(stored)
+            
+            if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+                await export_quantized_index(stored)
+        
+        return None
     except Exception as e:
         logger.exception(f"Error indexing documents from {directory_path}")
         raise VectorStoreError(f"Error indexing documents: {str(e)}")
 
 
-async def similarity_search(query: str, k: int = 3) -> List[Dict[str, Any]]:
-    try:
+async def load_stored_chunks(store=None) -> Dict[str, Any]:
+    if store is None:
         store = await get_vector_store()
+    
+    # Reuse the embeddings Chroma already holds instead of re-embedding
+    return store.get(include=["embeddings", "documents", "metadatas"])
+
+
+async def export_chunk_store(stored: Optional[Dict[str, Any]] = None, chunk_store_path: Optional[str] = None):
+    chunk_store_path = chunk_store_path or serving_chunk_store_path()
+    
+    if stored is None:
+        stored = await load_stored_chunks()
+    
+    await asyncio.to_thread(build_chunk_store, chunk_store_path, stored["documents"], stored["metadatas"], stored["ids"])
+    reset_chunk_stores()
+
+
+def partition_quantized_index_path(partition: str, quantized_index_path: Optional[str] = None) -> str:
+    quantized_index_path = quantized_index_path or serving_quantized_index_path()
+    return str(Path(quantized_index_path) / "partitions" / partition_collection_name(partition))
+
+
+async def export_quantized_index(stored: Optional[Dict[str, Any]] = None, quantized_index_path: Optional[str] = None):
+    quantized_index_path = quantized_index_path or serving_quantized_index_path()
+    
+    try:
+        if stored is None:
+            stored = await load_stored_chunks()
         
-        results = store.similarity_search_with_relevance_scores(query, k=k)
+        build_quantized_index(
+            quantized_index_path,
+            stored["embeddings"],
+            stored["documents"],
+            stored["metadatas"],
+        )
+        
+        if settings.PARTITION_ROUTING_ENABLED:
+            vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+            for partition, rows in group_by_partition(stored["metadatas"]).items():
+                build_quantized_index(
+                    partition_quantized_index_path(partition, quantized_index_path),
+                    vectors[rows],
+                    [stored["documents"][row] for row in rows],
+                    [stored["metadatas"][row] for row in rows],
+                )
+        
+        reset_quantized_index()
+    except VectorStoreError:
+        raise
+    except Exception as e:
+        logger.exception("Error exporting quantized index")
+        raise VectorStoreError(f"Error exporting quantized index: {str(e)}")
+
+
+async def get_partition_store(partition: str):
+    if partition not in partition_stores:
+        embedding_model = await initialize_embeddings()
+        
+        partition_stores[partition] = open_chroma(
+            serving_vector_store_path(),
+            embedding_model,
+            partition_collection_name(partition),
+        )
+    
+    return partition_stores[partition]
+
+
+async def drop_partition_store(partition: str, vector_store_path: str):
+    embedding_model = await initialize_embeddings()
+    open_chroma(vector_store_path, embedding_model, partition_collection_name(partition)).delete_collection()
+    
+    if vector_store_path == serving_vector_store_path():
+        partition_stores.pop(partition, None)
+
+
+async def build_partition_indexes(stored: Optional[Dict[str, Any]] = None, vector_store_path: Optional[str] = None):
+    vector_store_path = vector_store_path or serving_vector_store_path()
+    
+    try:
+        if stored is None:
+            stored = await load_stored_chunks()
+        
+        embedding_model = await initialize_embeddings()
+        previous_manifest = load_partition_manifest(vector_store_path) or {}
+        vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+        
+        partitions = {}
+        for partition, rows in group_by_partition(stored["metadatas"]).items():
+            # Rebuild each partition from scratch so deleted chunks do not linger
+            await drop_partition_store(partition, vector_store_path)
+            partition_store = open_chroma(vector_store_path, embedding_model, partition_collection_name(partition))
+            
+            for batch_start in range(0, len(rows), PARTITION_UPSERT_BATCH_SIZE):
+                batch_rows = rows[batch_start:batch_start + PARTITION_UPSERT_BATCH_SIZE]
+                partition_store._collection.upsert(
+                    ids=[stored["ids"][row] for row in batch_rows],
+                    embeddings=vectors[batch_rows].tolist(),
+                    documents=[stored["documents"][row] for row in batch_rows],
+                    metadatas=[stored["metadatas"][row] for row in batch_rows],
+                )
+            
+            centroid = normalize_vectors(normalize_vectors(vectors[rows]).mean(axis=0))
+            partitions[partition] = {
+                "collection": partition_collection_name(partition),
+                "count": len(rows),
+                "centroid": centroid.tolist(),
+            }
         
+        for partition in previous_manifest.get("partitions", {}):
+            if partition not in partitions:
+                await drop_partition_store(partition, vector_store_path)
+        
+        save_partition_manifest(vector_store_path, partitions)
+        reset_partition_router()
+        
+        logger.info(
+            f"Built {len(partitions)} partition indexes on {settings.PARTITION_METADATA_KEY}: "
+            + ", ".join(f"{partition}={details['count']}" for partition, details in partitions.items())
+        )
+    except VectorStoreError:
+        raise
+    except Exception as e:
+        logger.exception("Error building partition indexes")
+        raise VectorStoreError(f"Error building partition indexes: {str(e)}")
+
+
+def validate_snapshot(version: str, embedding_model) -> Dict[str, Any]:
+    vector_store_path = snapshot_vector_store_path(version)
+    store = open_chroma(vector_store_path, embedding_model)
+    
+    count = store._collection.count()
+    if count == 0:
+        raise VectorStoreError(f"Snapshot {version} has no chunks")
+    
+    # Each probe chunk must find itself, which exercises the index without
+    # spending an embeddings call
+    probes = store._collection.get(
+        limit=settings.VECTOR_SNAPSHOT_VALIDATION_PROBES,
+        include=["embeddings", "documents"],
+    )
+    results = store._collection.query(query_embeddings=probes["embeddings"], n_results=1, include=["distances"])
+    for probe_id, result_ids, distances in zip(probes["ids"], results["ids"], results["distances"]):
+        if not result_ids or (result_ids[0] != probe_id and distances[0] > 1e-4):
+            raise VectorStoreError(f"Snapshot {version} failed self-retrieval for chunk {probe_id}")
+    
+    partition_counts = {}
+    if settings.PARTITION_ROUTING_ENABLED:
+        manifest = load_partition_manifest(vector_store_path)
+        if manifest is None:
+            raise VectorStoreError(f"Snapshot {version} has no partition manifest")
+        
+        for partition in manifest["partitions"]:
+            partition_store = open_chroma(vector_store_path, embedding_model, partition_collection_name(partition))
+            partition_counts[partition] = partition_store._collection.count()
+        
+        if sum(partition_counts.values()) != count:
+            raise VectorStoreError(
+                f"Snapshot {version} partitions hold {sum(partition_counts.values())} chunks, expected {count}"
+            )
+    
+    if settings.CHUNK_STORE_ENABLED:
+        chunk_store = ChunkStore(snapshot_chunk_store_path(version))
+        if len(chunk_store) != count:
+            raise VectorStoreError(f"Snapshot {version} chunk store holds {len(chunk_store)} chunks, expected {count}")
+        
+        for probe_document, row in zip(probes["documents"], chunk_store.rows_for_ids(probes["ids"])):
+            if row is None or chunk_store.get_content(row) != probe_document:
+                raise VectorStoreError(f"Snapshot {version} chunk store does not match the vector store")
+    
+    if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+        index = QuantizedIndex(snapshot_quantized_index_path(version), settings.VECTOR_INDEX_TYPE)
+        if len(index) != count:
+            raise VectorStoreError(f"Snapshot {version} quantized index holds {len(index)} chunks, expected {count}")
+        
+        for probe_document, rows in zip(probes["documents"], index.search_rows_batch(probes["embeddings"], 1)):
+            if not rows or index.chunks[rows[0][0]]["content"] != probe_document:
+                raise VectorStoreError(f"Snapshot {version} quantized index failed self-retrieval")
+    
+    return {
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "index_type": settings.VECTOR_INDEX_TYPE,
+        "count": count,
+        "partitions": partition_counts,
+        "probes": len(probes["ids"]),
+    }
+
+
+async def publish_snapshot(version: str, source: str):
+    embedding_model = await initialize_embeddings()
+    
+    report = await asyncio.to_thread(validate_snapshot, version, embedding_model)
+    save_snapshot_manifest(version, {"source": source, **report})
+    activate_snapshot(version)
+    prune_snapshots()
+    
+    logger.info(f"Published vector store snapshot {version} with {report['count']} chunks")
+
+
+async def build_derived_indexes(stored: Dict[str, Any], version: str):
+    if settings.CHUNK_STORE_ENABLED:
+        await export_chunk_store(stored, snapshot_chunk_store_path(version))
+    
+    if settings.PARTITION_ROUTING_ENABLED:
+        await build_partition_indexes(stored, snapshot_vector_store_path(version))
+    
+    if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+        await export_quantized_index(stored, snapshot_quantized_index_path(version))
+
+
+async def build_snapshot(directory_path: str, progress: Optional[ProgressCallback] = None) -> Optional[str]:
+    version = new_snapshot_version()
+    
+    try:
+        logger.info(f"Indexing documents from {directory_path} into snapshot {version}")
+        
+        report_progress(progress, "loading")
+        chunks = await process_documents(directory_path)
+        
+        if not chunks:
+            logger.warning(f"No documents found in {directory_path}")
+            return None
+        
+        embedding_model = await initialize_embeddings()
+        
+        # A fresh directory per build, so the served snapshot is never written to
+        store = open_chroma(snapshot_vector_store_path(version), embedding_model)
+        report_progress(progress, "embedding", 0, len(chunks))
+        add_chunks(store, chunks, progress)
+        store.persist()
+        
+        logger.info(f"Indexed {len(chunks)} document chunks")
+        
+        report_progress(progress, "indexing")
+        await build_derived_indexes(await load_stored_chunks(store), version)
+        report_progress(progress, "publishing")
+        await publish_snapshot(version, directory_path)
+        return version
+    except Exception as e:
+        logger.exception(f"Error building snapshot {version} from {directory_path}")
+        discard_snapshot(version)
+        raise VectorStoreError(f"Error indexing documents: {str(e)}")
+
+
+async def rebuild_snapshot() -> str:
+    # Re-derive partition and quantized indexes into a copy of the served store
+    source_path = serving_vector_store_path()
+    version = new_snapshot_version()
+    
+    try:
+        logger.info(f"Copying {source_path} into snapshot {version}")
+        
+        await asyncio.to_thread(
+            shutil.copytree,
+            source_path,
+            snapshot_vector_store_path(version),
+        )
+        
+        embedding_model = await initialize_embeddings()
+        store = open_chroma(snapshot_vector_store_path(version), embedding_model)
+        
+        await build_derived_indexes(await load_stored_chunks(store), version)
+        await publish_snapshot(version, source_path)
+        return version
+    except Exception as e:
+        logger.exception(f"Error rebuilding snapshot {version} from {source_path}")
+        discard_snapshot(version)
+        raise VectorStoreError(f"Error rebuilding snapshot: {str(e)}")
+
+
+def embedding_cache_key(query: str) -> str:
+    return embedding_cache.make_key(settings.EMBEDDING_MODEL, query)
+
+
+async def embed_query(query: str) -> List[float]:
+    async def compute_embedding():
+        embedding_model = await initialize_embeddings()
+        return await call_upstream("openai_embeddings", embedding_model.embed_query, query)
+    
+    try:
+        return await embedding_cache.get_or_compute(embedding_cache_key(query), compute_embedding)
+    except ServiceOverloadedError:
+        raise
+    except Exception as e:
+        logger.exception("Error embedding query")
+        raise VectorStoreError(f"Error embedding query: {str(e)}")
+
+
+async def embed_queries(queries: List[str]) -> List[List[float]]:
+    try:
+        cache_keys = [embedding_cache_key(query) for query in queries]
+        query_embeddings = await embedding_cache.get_many(cache_keys)
+        missing_positions = [position for position, embedding in enumerate(query_embeddings) if embedding is MISSING]
+        
+        if missing_positions:
+            embedding_model = await initialize_embeddings()
+            
+            # One embeddings request for all uncached queries instead of one per query
+            new_embeddings = await call_upstream(
+                "openai_embeddings",
+                embedding_model.embed_documents,
+                [queries[position] for position in missing_positions],
+            )
+            for position, embedding in zip(missing_positions, new_embeddings):
+                query_embeddings[position] = embedding
+            
+            await asyncio.gather(*[
+                embedding_cache.set(cache_keys[position], query_embeddings[position])
+                for position in missing_positions
+            ])
+        
+        return query_embeddings
+    except ServiceOverloadedError:
+        raise
+    except Exception as e:
+        logger.exception(f"Error embedding {len(queries)} queries")
+        raise VectorStoreError(f"Error embedding queries: {str(e)}")
+
+
+def search_chroma_by_vectors(
+    store,
+    query_embeddings: List[List[float]],
+    k: int,
+    include_embeddings: bool = False,
+    chunk_store: Optional[ChunkStore] = None,
+) -> List[List[Dict[str, Any]]]:
+    # With a chunk store Chroma only returns IDs; text is read from the store when needed
+    indexed_by_id = chunk_store is not None and chunk_store.sorted_ids is not None
+    
+    include = ["distances"] if indexed_by_id else ["documents", "metadatas", "distances"]
+    if include_embeddings:
+        include.append("embeddings")
+    
+    results = store._collection.query(query_embeddings=query_embeddings, n_results=k, include=include)
+    
+    # Chroma returns raw distances here; convert them the same way
+    # similarity_search_with_relevance_scores does
+    relevance_score_fn = store._select_relevance_score_fn()
+    
+    batch_results = []
+    for query_position, distances in enumerate(results["distances"]):
+        rows = chunk_store.rows_for_ids(results["ids"][query_position]) if indexed_by_id else None
+        
+        formatted_results = []
+        for position, distance in enumerate(distances):
+            if rows is not None and rows[position] is not None:
+                formatted_result = chunk_reference(chunk_store, rows[position], relevance_score_fn(distance))
+            elif rows is not None:
+                # The chunk store lags the collection; read this one chunk from Chroma
+                logger.warning("Chunk %s is missing from the chunk store", results["ids"][query_position][position])
+                missing = store._collection.get(ids=[results["ids"][query_position][position]], include=["documents", "metadatas"])
+                formatted_result = {
+                    "content": missing["documents"][0],
+                    "metadata": missing["metadatas"][0] or {},
+                    "score": relevance_score_fn(distance),
+                }
+            else:
+                formatted_result = {
+                    "content": results["documents"][query_position][position],
+                    "metadata": results["metadatas"][query_position][position] or {},
+                    "score": relevance_score_fn(distance),
+                }
+            if include_embeddings:
+                formatted_result["embedding"] = results["embeddings"][query_position][position]
+            formatted_results.append(formatted_result)
+        batch_results.append(formatted_results)
+    
+    return batch_results
+
+
+def search_quantized_by_vectors(
+    query_embeddings: List[List[float]],
+    k: int,
+    index_path: Optional[str] = None,
+    include_embeddings: bool = False,
+) -> List[List[Dict[str, Any]]]:
+    index = get_quantized_index(index_path)
+    
+    batch_results = []
+    for rows in index.search_rows_batch(query_embeddings, k):
         formatted_results = []
-        for doc, score in results:
-            formatted_results.append({
-                "content": doc.page_content,
-                "metadata": doc.metadata,
-                "score": score,
-            })
-        
-        return formatted_results
+        for row, score in rows:
+            if isinstance(index.chunks, ChunkStore):
+                formatted_result = chunk_reference(index.chunks, row, score)
+            else:
+                formatted_result = {
+                    "content": index.chunks[row]["content"],
+                    "metadata": index.chunks[row]["metadata"],
+                    "score": score,
+                }
+            if include_embeddings:
+                formatted_result["embedding"] = np.asarray(index.full_precision[row], dtype=np.float32)
+            formatted_results.append(formatted_result)
+        batch_results.append(formatted_results)
+    
+    return batch_results
+
+
+def search_partitions_by_vectors(
+    partition_indexes: List[Any],
+    query_embeddings: List[List[float]],
+    k: int,
+    include_embeddings: bool = False,
+    chunk_store: Optional[ChunkStore] = None,
+) -> List[List[Dict[str, Any]]]:
+    merged_batch = [[] for _ in query_embeddings]
+    for partition_index in partition_indexes:
+        if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+            partition_batch = search_quantized_by_vectors(query_embeddings, k, partition_index, include_embeddings)
+        else:
+            partition_batch = search_chroma_by_vectors(partition_index, query_embeddings, k, include_embeddings, chunk_store)
+        
+        for merged_results, partition_results in zip(merged_batch, partition_batch):
+            merged_results.extend(partition_results)
+    
+    for merged_results in merged_batch:
+        merged_results.sort(key=lambda result: result["score"], reverse=True)
+        del merged_results[k:]
+    
+    return merged_batch
+
+
+async def similarity_search(
+    query: str,
+    k: int = 3,
+    query_embedding: Optional[List[float]] = None,
+    partitions: Optional[List[str]] = None,
+    include_embeddings: bool = False,
+    materialize: bool = True,
+) -> List[Dict[str, Any]]:
+    if query_embedding is None:
+        query_embedding = await embed_query(query)
+    
+    batch_results = await similarity_search_batch([query], k, [query_embedding], partitions, include_embeddings, materialize)
+    return batch_results[0]
+
+
+async def similarity_search_batch(
+    queries: List[str],
+    k: int,
+    query_embeddings: List[List[float]],
+    partitions: Optional[List[str]] = None,
+    include_embeddings: bool = False,
+    materialize: bool = True,
+) -> List[List[Dict[str, Any]]]:
+    try:
+        if not query_embeddings:
+            return []
+        
+        await refresh_snapshot()
+        
+        if partitions:
+            if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+                partition_indexes = [partition_quantized_index_path(partition) for partition in partitions]
+            else:
+                partition_indexes = [await get_partition_store(partition) for partition in partitions]
+            
+            batch_results = await asyncio.to_thread(
+                search_partitions_by_vectors, partition_indexes, query_embeddings, k, include_embeddings, get_chunk_store()
+            )
+        elif settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+            batch_results = await asyncio.to_thread(
+                search_quantized_by_vectors, query_embeddings, k, None, include_embeddings
+            )
+        else:
+            store = await get_vector_store()
+            
+            batch_results = await asyncio.to_thread(
+                search_chroma_by_vectors, store, query_embeddings, k, include_embeddings, get_chunk_store()
+            )
+        
+        # Callers that filter or re-rank first materialize only what they keep
+        if materialize:
+            for results in batch_results:
+                materialize_chunks(results)
+        
+        return batch_results
+    except ServiceOverloadedError:
+        raise
     except Exception as e:
-        logger.exception(f"Error performing similarity search for query: {query}")
+        logger.exception("Error performing similarity search for %d queries: %.50s", len(queries), queries[0])
         raise VectorStoreError(f"Error performing similarity search: {str(e)}")
 
 
 async def check_vector_store() -> bool:
     try:
+        if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+            get_quantized_index()
+            return True
+        
         await get_vector_store()
         return True
     except Exception:
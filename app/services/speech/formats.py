@@ -0,0 +1,98 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.errors import AudioFormatError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AudioOutputFormat:
+    name: str
+    media_type: str
+    extension: str
+    azure_format: str
+
+
+AUDIO_OUTPUT_FORMATS: Dict[str, AudioOutputFormat] = {
+    output_format.name: output_format
+    for output_format in (
+        AudioOutputFormat("wav", "audio/wav", "wav", "Riff16Khz16BitMonoPcm"),
+        AudioOutputFormat("pcm", "audio/L16; rate=16000; channels=1", "pcm", "Raw16Khz16BitMonoPcm"),
+        AudioOutputFormat("opus", "audio/ogg; codecs=opus", "ogg", "Ogg24Khz16BitMonoOpus"),
+        AudioOutputFormat("mp3-32k", "audio/mpeg", "mp3", "Audio16Khz32KBitRateMonoMp3"),
+        AudioOutputFormat("mp3-64k", "audio/mpeg", "mp3", "Audio16Khz64KBitRateMonoMp3"),
+        AudioOutputFormat("mp3-128k", "audio/mpeg", "mp3", "Audio16Khz128KBitRateMonoMp3"),
+    )
+}
+
+# Media types a client may list in Accept, mapped to format names
+ACCEPT_MEDIA_TYPES = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/l16": "pcm",
+    "audio/pcm": "pcm",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+}
+
+
+def get_audio_format(format_name: str) -> AudioOutputFormat:
+    if format_name == "mp3":
+        format_name = f"mp3-{settings.TTS_MP3_BITRATE_KBPS}k"
+
+    output_format = AUDIO_OUTPUT_FORMATS.get(format_name)
+    if output_format is None:
+        raise AudioFormatError(
+            f"Unsupported audio format: {format_name}. "
+            f"Supported formats: mp3, {', '.join(AUDIO_OUTPUT_FORMATS)}"
+        )
+    return output_format
+
+
+def parse_accept_header(accept_header: str) -> List[Tuple[str, float]]:
+    media_ranges = []
+    for entry in accept_header.split(","):
+        media_type, *parameters = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for parameter in parameters:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            media_ranges.append((media_type.lower(), quality))
+
+    # Stable sort keeps the client's order between equal qualities
+    return sorted(media_ranges, key=lambda media_range: -media_range[1])
+
+
+def accepted_audio_format_name(accept_header: Optional[str]) -> Optional[str]:
+    if not accept_header:
+        return None
+
+    for media_type, quality in parse_accept_header(accept_header):
+        if quality > 0 and media_type in ACCEPT_MEDIA_TYPES:
+            return ACCEPT_MEDIA_TYPES[media_type]
+    return None
+
+
+def accepts_raw_audio(accept_header: Optional[str]) -> bool:
+    # True when the client prefers an audio body over the JSON envelope
+    if not accept_header:
+        return False
+
+    media_ranges = [media_range for media_range in parse_accept_header(accept_header) if media_range[1] > 0]
+    return bool(media_ranges) and media_ranges[0][0] in ACCEPT_MEDIA_TYPES
+
+
+def negotiate_audio_format(requested_format: Optional[str] = None, accept_header: Optional[str] = None) -> AudioOutputFormat:
+    # An explicit request field wins over the Accept header
+    format_name = requested_format or accepted_audio_format_name(accept_header) or settings.TTS_DEFAULT_FORMAT
+    return get_audio_format(format_name)
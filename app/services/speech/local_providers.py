@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import math
+import shutil
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from app.config import settings
+from app.core.errors import SpeechProcessingError
+from app.services.audio.normalizer import NormalizedAudio, encode_wav, normalize_audio
+from app.services.speech.formats import AudioOutputFormat
+from app.services.speech.providers import STTProvider, TTSProvider
+
+logger = logging.getLogger(__name__)
+
+WHISPER_SAMPLE_RATE = 16000
+
+STUB_TTS_SAMPLE_RATE = 16000
+STUB_TTS_SAMPLES_PER_CHARACTER = 800
+
+PCM_OUTPUT_SAMPLE_RATE = 16000
+
+
+def to_whisper_samples(audio_data: Union[bytes, NormalizedAudio]) -> np.ndarray:
+    if not isinstance(audio_data, NormalizedAudio):
+        audio_data = normalize_audio(audio_data, WHISPER_SAMPLE_RATE)
+    elif audio_data.sample_rate != WHISPER_SAMPLE_RATE:
+        audio_data = normalize_audio(audio_data.to_wav_bytes(), WHISPER_SAMPLE_RATE)
+
+    return audio_data.pcm.astype(np.float32) * (1.0 / 32768.0)
+
+
+def convert_wav_output(wav_data: bytes, output_format: Optional[AudioOutputFormat]) -> bytes:
+    # Local engines only produce WAV; raw PCM is the same samples without the header
+    if output_format is not None and output_format.name == "pcm":
+        return normalize_audio(wav_data, PCM_OUTPUT_SAMPLE_RATE).pcm.tobytes()
+    return wav_data
+
+
+class FasterWhisperProvider(STTProvider):
+    name = "faster_whisper"
+
+    def __init__(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise SpeechProcessingError(
+                "faster-whisper is not installed; install it to use STT_PROVIDER=faster_whisper"
+            )
+
+        self.model = WhisperModel(
+            settings.LOCAL_STT_MODEL,
+            device="cpu",
+            compute_type=settings.LOCAL_STT_COMPUTE_TYPE,
+            cpu_threads=settings.LOCAL_STT_CPU_THREADS,
+            num_workers=settings.STT_MAX_CONCURRENCY,
+        )
+        logger.info(
+            f"Loaded local Whisper model {settings.LOCAL_STT_MODEL} ({settings.LOCAL_STT_COMPUTE_TYPE})"
+        )
+
+    def transcribe_samples(self, samples: np.ndarray) -> Tuple[str, float]:
+        segments, _ = self.model.transcribe(
+            samples,
+            language="bg",
+            beam_size=settings.LOCAL_STT_BEAM_SIZE,
+            condition_on_previous_text=False,
+        )
+        segments = list(segments)
+
+        transcribed_text = " ".join(segment.text.strip() for segment in segments).strip()
+        if not segments:
+            return transcribed_text, 0.0
+
+        # Mean token log-probability is the closest thing Whisper has to a confidence
+        mean_log_probability = sum(segment.avg_logprob for segment in segments) / len(segments)
+        return transcribed_text, min(1.0, max(0.0, math.exp(mean_log_probability)))
+
+    async def transcribe(self, audio_data: Union[bytes, NormalizedAudio]) -> Tuple[str, float]:
+        samples = to_whisper_samples(audio_data)
+        return await asyncio.to_thread(self.transcribe_samples, samples)
+
+
+class StubSTTProvider(STTProvider):
+    name = "stub"
+
+    async def transcribe(self, audio_data: Union[bytes, NormalizedAudio]) -> Tuple[str, float]:
+        return settings.STUB_STT_TEXT, 1.0
+
+
+class EspeakTTSProvider(TTSProvider):
+    name = "espeak"
+    supported_formats = ("wav", "pcm")
+
+    def __init__(self):
+        self.command_path = shutil.which(settings.LOCAL_TTS_COMMAND)
+        if self.command_path is None:
+            raise SpeechProcessingError(
+                f"{settings.LOCAL_TTS_COMMAND} is not installed; install it to use TTS_PROVIDER=espeak"
+            )
+
+    async def synthesize(self, text_content: str, output_format: Optional[AudioOutputFormat] = None) -> bytes:
+        process = await asyncio.create_subprocess_exec(
+            self.command_path,
+            "-v", settings.LOCAL_TTS_VOICE,
+            "-s", str(settings.LOCAL_TTS_WORDS_PER_MINUTE),
+            "--stdin",
+            "--stdout",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        try:
+            audio_data, error_output = await asyncio.wait_for(
+                process.communicate(text_content.encode("utf-8")),
+                settings.TTS_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise SpeechProcessingError("Local speech synthesis timed out")
+
+        if process.returncode != 0 or not audio_data:
+            raise SpeechProcessingError(
+                f"Local speech synthesis failed: {error_output.decode('utf-8', errors='replace').strip()}"
+            )
+
+        return convert_wav_output(audio_data, output_format)
+
+
+class StubTTSProvider(TTSProvider):
+    name = "stub"
+    supported_formats = ("wav", "pcm")
+
+    async def synthesize(self, text_content: str, output_format: Optional[AudioOutputFormat] = None) -> bytes:
+        # Silence whose length tracks the text, so callers get a valid,
+        # deterministic WAV without any synthesis engine
+        silent_samples = np.zeros(len(text_content) * STUB_TTS_SAMPLES_PER_CHARACTER, dtype=np.int16)
+        return convert_wav_output(encode_wav(silent_samples, STUB_TTS_SAMPLE_RATE), output_format)
@@ -0,0 +1,108 @@
+import importlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from app.config import settings
+from app.core.errors import SpeechProcessingError
+from app.services.audio.normalizer import NormalizedAudio
+from app.services.speech.formats import AudioOutputFormat
+
+logger = logging.getLogger(__name__)
+
+
+class STTProvider(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def transcribe(self, audio_data: Union[bytes, NormalizedAudio]) -> Tuple[str, float]:
+        ...
+
+    async def check(self) -> bool:
+        return True
+
+
+class TTSProvider(ABC):
+    name = "base"
+    supported_formats: Tuple[str, ...] = ("wav",)
+
+    @abstractmethod
+    async def synthesize(self, text_content: str, output_format: Optional[AudioOutputFormat] = None) -> bytes:
+        ...
+
+    async def check(self) -> bool:
+        return True
+
+
+# Providers are referenced by import path so optional backends are only
+# imported when selected in Settings
+stt_provider_factories: Dict[str, Union[str, Callable[[], STTProvider]]] = {
+    "openai": "app.services.speech.stt:OpenAIWhisperProvider",
+    "faster_whisper": "app.services.speech.local_providers:FasterWhisperProvider",
+    "stub": "app.services.speech.local_providers:StubSTTProvider",
+}
+
+tts_provider_factories: Dict[str, Union[str, Callable[[], TTSProvider]]] = {
+    "azure": "app.services.speech.tts:AzureTTSProvider",
+    "espeak": "app.services.speech.local_providers:EspeakTTSProvider",
+    "stub": "app.services.speech.local_providers:StubTTSProvider",
+}
+
+stt_provider_instances: Dict[str, STTProvider] = {}
+tts_provider_instances: Dict[str, TTSProvider] = {}
+provider_lock = threading.Lock()
+
+
+def register_stt_provider(name: str, factory: Union[str, Callable[[], STTProvider]]):
+    stt_provider_factories[name] = factory
+    stt_provider_instances.pop(name, None)
+
+
+def register_tts_provider(name: str, factory: Union[str, Callable[[], TTSProvider]]):
+    tts_provider_factories[name] = factory
+    tts_provider_instances.pop(name, None)
+
+
+def resolve_factory(factory: Union[str, Callable]) -> Callable:
+    if not isinstance(factory, str):
+        return factory
+    module_path, _, attribute_name = factory.partition(":")
+    return getattr(importlib.import_module(module_path), attribute_name)
+
+
+def build_provider(kind: str, name: str, factories: Dict, instances: Dict):
+    provider = instances.get(name)
+    if provider is not None:
+        return provider
+
+    with provider_lock:
+        provider = instances.get(name)
+        if provider is not None:
+            return provider
+
+        factory = factories.get(name)
+        if factory is None:
+            raise SpeechProcessingError(
+                f"Unknown {kind} provider '{name}'. Available: {', '.join(sorted(factories))}"
+            )
+
+        try:
+            provider = resolve_factory(factory)()
+        except SpeechProcessingError:
+            raise
+        except Exception as error:
+            logger.exception(f"Failed to initialize {kind} provider {name}")
+            raise SpeechProcessingError(f"Failed to initialize {kind} provider '{name}': {str(error)}")
+
+        instances[name] = provider
+        logger.info(f"Initialized {kind} provider: {name}")
+        return provider
+
+
+def get_stt_provider(name: Optional[str] = None) -> STTProvider:
+    return build_provider("STT", name or settings.STT_PROVIDER, stt_provider_factories, stt_provider_instances)
+
+
+def get_tts_provider(name: Optional[str] = None) -> TTSProvider:
+    return build_provider("TTS", name or settings.TTS_PROVIDER, tts_provider_factories, tts_provider_instances)
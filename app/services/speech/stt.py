@@ -1,57 +1,133 @@
+import asyncio
 import logging
-import io
-import tempfile
-import os
-from typing import Tuple, Optional
+from typing import AsyncIterator, List, Tuple, Optional, Union
 import openai
 
 from app.config import settings
-from app.core.errors import SpeechProcessingError
+from app.core.admission import admit, start_request_deadline
+from app.core.errors import SpeechProcessingError, AudioFormatError, ServiceOverloadedError
+from app.core.resilience import call_upstream
+from app.services.audio.normalizer import NormalizedAudio, normalize_audio
+from app.services.audio.vad import trim_silence
+from app.services.speech.providers import STTProvider, get_stt_provider
 
 logger = logging.getLogger(__name__)
 
 
-async def transcribe_audio(audio_data: bytes) -> Tuple[str, float]:
+def prepare_audio_upload(audio_data: Union[bytes, NormalizedAudio]) -> bytes:
+    if isinstance(audio_data, NormalizedAudio):
+        return audio_data.to_wav_bytes()
+    
     try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as audio_temp_file:
-            audio_temp_file.write(audio_data)
-            audio_file_path = audio_temp_file.name
-        
+        return normalize_audio(audio_data).to_wav_bytes()
+    except AudioFormatError:
+        # Not a WAV we can decode (e.g. mp3/webm); Whisper accepts those as-is
+        return audio_data
+
+
+def gate_transcription_audio(
+    audio_data: Union[bytes, NormalizedAudio],
+    follows_wake_word: bool = False,
+) -> Optional[Union[bytes, NormalizedAudio]]:
+    if not settings.VAD_ENABLED:
+        return audio_data
+    
+    if not isinstance(audio_data, NormalizedAudio):
         try:
-            openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-            
-            with open(audio_file_path, "rb") as audio_file:
-                transcription_response = openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="bg",
-                    response_format="verbose_json",
-                )
-            
-            transcribed_text = transcription_response.text
-            
-            # Using fixed confidence since Whisper doesn't provide confidence scores
-            estimated_confidence = 0.9
-            
-            logger.info(f"Successfully transcribed audio: {transcribed_text[:50]}...")
-            return transcribed_text, estimated_confidence
-        finally:
-            if os.path.exists(audio_file_path):
-                os.unlink(audio_file_path)
-    except Exception as error:
-        logger.exception("Failed to transcribe audio")
-        raise SpeechProcessingError(f"Speech recognition failed: {str(error)}")
+            audio_data = normalize_audio(audio_data)
+        except AudioFormatError:
+            # Compressed uploads cannot be checked here and go to the provider as they are
+            return audio_data
+    
+    return trim_silence(audio_data, "stt", follows_wake_word)
 
 
-async def check_stt_service() -> bool:
-    try:
+class OpenAIWhisperProvider(STTProvider):
+    name = "openai"
+    
+    def __init__(self):
+        self.client = openai.OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=settings.STT_TIMEOUT_SECONDS,
+            max_retries=0,
+        )
+    
+    async def transcribe(self, audio_data: Union[bytes, NormalizedAudio]) -> Tuple[str, float]:
+        upload_bytes = prepare_audio_upload(audio_data)
+        
+        transcription_response = await call_upstream(
+            "whisper",
+            self.client.audio.transcriptions.create,
+            model="whisper-1",
+            file=("speech.wav", upload_bytes),
+            language="bg",
+            response_format="verbose_json",
+            timeout_keyword="timeout",
+        )
+        
+        # Using fixed confidence since Whisper doesn't provide confidence scores
+        return transcription_response.text, 0.9
+    
+    async def check(self) -> bool:
         sample_rate = 16000  # 16kHz
         test_duration_seconds = 1
         total_samples = sample_rate * test_duration_seconds
         silent_audio_bytes = bytes(total_samples * 2)  # 16-bit samples (2 bytes per sample)
         
-        await transcribe_audio(silent_audio_bytes)
+        await self.transcribe(silent_audio_bytes)
         return True
+
+
+async def transcribe_audio(audio_data: Union[bytes, NormalizedAudio], follows_wake_word: bool = False) -> Tuple[str, float]:
+    try:
+        audio_data = gate_transcription_audio(audio_data, follows_wake_word)
+        if audio_data is None:
+            # Nothing was said, which is also what a paid transcription would return
+            return "", 0.0
+        
+        provider = get_stt_provider()
+        
+        async with admit("stt"):
+            transcribed_text, estimated_confidence = await provider.transcribe(audio_data)
+        
+        logger.info("Successfully transcribed audio with %s: %.50s...", provider.name, transcribed_text)
+        return transcribed_text, estimated_confidence
+    except ServiceOverloadedError:
+        raise
+    except Exception as error:
+        logger.exception("Failed to transcribe audio")
+        raise SpeechProcessingError(f"Speech recognition failed: {str(error)}")
+
+
+async def transcribe_audio_batch(
+    audio_items: List[bytes],
+) -> AsyncIterator[Tuple[int, Optional[Tuple[str, float]], Optional[Exception]]]:
+    transcription_slots = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    
+    async def transcribe_item(position: int, audio_data: bytes):
+        async with transcription_slots:
+            # Each item gets its own deadline; the batch as a whole may run for minutes
+            start_request_deadline()
+            try:
+                return position, await transcribe_audio(audio_data), None
+            except Exception as error:
+                return position, None, error
+    
+    transcription_tasks = [
+        asyncio.create_task(transcribe_item(position, audio_data))
+        for position, audio_data in enumerate(audio_items)
+    ]
+    try:
+        for next_completed in asyncio.as_completed(transcription_tasks):
+            yield await next_completed
+    finally:
+        for transcription_task in transcription_tasks:
+            transcription_task.cancel()
+
+
+async def check_stt_service() -> bool:
+    try:
+        return await get_stt_provider().check()
     except Exception:
         logger.exception("Speech recognition service health check failed")
         return False
\ No newline at end of file
@@ -1,60 +1,172 @@
 import logging
-import io
-import tempfile
-import os
+from typing import Dict, Optional, Tuple
 import azure.cognitiveservices.speech as speechsdk
 
 from app.config import settings
-from app.core.errors import SpeechProcessingError
+from app.core.admission import admit
+from app.core.cache import Cache
+from app.core.errors import SpeechProcessingError, ServiceOverloadedError
+from app.core.resilience import call_upstream
+from app.services.speech.formats import AUDIO_OUTPUT_FORMATS, AudioOutputFormat, get_audio_format, negotiate_audio_format
+from app.services.speech.providers import TTSProvider, get_tts_provider
 
 logger = logging.getLogger(__name__)
 
-speech_synthesizer = None
+RETRYABLE_CANCELLATION_CODES = {
+    "ConnectionFailure",
+    "ServiceTimeout",
+    "ServiceError",
+    "TooManyRequests",
+    "ServiceUnavailable",
+}
 
+# Audio synthesized offline (e.g. FAQ answers), keyed by the exact answer text and format
+precomputed_speech: Dict[Tuple[str, str], bytes] = {}
 
-async def initialize_tts_service():
-    global speech_synthesizer
+tts_cache = Cache(
+    "tts",
+    settings.TTS_CACHE_TTL_SECONDS,
+    dumps=bytes,
+    loads=bytes,
+    enabled=settings.TTS_CACHE_ENABLED,
+)
+
+
+def register_precomputed_speech(text_content: str, audio_data: bytes, format_name: str = "wav"):
+    precomputed_speech[(text_content.strip(), format_name)] = audio_data
+
+
+def get_precomputed_speech(text_content: str, format_name: str = "wav") -> Optional[bytes]:
+    return precomputed_speech.get((text_content.strip(), format_name))
+
+
+def synthesize_speech(synthesizer, text_content: str) -> bytes:
+    synthesis_result = synthesizer.speak_text_async(text_content).get()
     
-    try:
-        azure_speech_config = speechsdk.SpeechConfig(
-            subscription=settings.AZURE_SPEECH_KEY,
-            region=settings.AZURE_SPEECH_REGION
-        )
+    if synthesis_result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+        return synthesis_result.audio_data
+    
+    cancellation_details = synthesis_result.cancellation_details
+    error_message = (
+        cancellation_details.error_details
+        if cancellation_details
+        else "Unknown synthesis error"
+    )
+    error_code = getattr(getattr(cancellation_details, "error_code", None), "name", "")
+    
+    # Transient Azure failures surface as cancellations; raise them as
+    # connection errors so the resilience layer retries them
+    if error_code in RETRYABLE_CANCELLATION_CODES:
+        raise ConnectionError(f"Speech synthesis failed ({error_code}): {error_message}")
+    raise SpeechProcessingError(f"Speech synthesis failed: {error_message}")
+
+
+class AzureTTSProvider(TTSProvider):
+    name = "azure"
+    supported_formats = tuple(AUDIO_OUTPUT_FORMATS)
+    
+    def __init__(self):
+        # Azure fixes the output format per SpeechConfig, so each format gets its own synthesizer
+        self.speech_synthesizers: Dict[str, speechsdk.SpeechSynthesizer] = {}
+    
+    def initialize(self, output_format: Optional[AudioOutputFormat] = None) -> bool:
+        output_format = output_format or get_audio_format(settings.TTS_DEFAULT_FORMAT)
         
-        azure_speech_config.speech_synthesis_voice_name = settings.AZURE_SPEECH_VOICE_NAME
+        try:
+            azure_speech_config = speechsdk.SpeechConfig(
+                subscription=settings.AZURE_SPEECH_KEY,
+                region=settings.AZURE_SPEECH_REGION
+            )
+            
+            azure_speech_config.speech_synthesis_voice_name = settings.AZURE_SPEECH_VOICE_NAME
+            # speak_text_async(...).get() takes no timeout; this makes the SDK give
+            # up on a stalled synthesis so its upstream thread is freed
+            azure_speech_config.set_property_by_name(
+                "SpeechSynthesis_FrameTimeoutInterval",
+                str(int(settings.TTS_TIMEOUT_SECONDS * 1000)),
+            )
+            azure_speech_config.set_speech_synthesis_output_format(
+                getattr(speechsdk.SpeechSynthesisOutputFormat, output_format.azure_format)
+            )
+            
+            # audio_config=None keeps the audio in memory instead of playing it on the server
+            self.speech_synthesizers[output_format.name] = speechsdk.SpeechSynthesizer(
+                speech_config=azure_speech_config,
+                audio_config=None,
+            )
+            
+            logger.info(f"Azure speech synthesis service initialized successfully ({output_format.name})")
+            return True
+        except Exception:
+            logger.exception(f"Failed to initialize Azure speech synthesis service ({output_format.name})")
+            self.speech_synthesizers.pop(output_format.name, None)
+            return False
+    
+    async def synthesize(self, text_content: str, output_format: Optional[AudioOutputFormat] = None) -> bytes:
+        output_format = output_format or get_audio_format(settings.TTS_DEFAULT_FORMAT)
         
-        speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=azure_speech_config)
+        if output_format.name not in self.speech_synthesizers and not self.initialize(output_format):
+            raise SpeechProcessingError("Unable to initialize speech synthesis service")
         
-        logger.info("Azure speech synthesis service initialized successfully")
-        return True
-    except Exception as error:
-        logger.exception("Failed to initialize Azure speech synthesis service")
-        speech_synthesizer = None
-        return False
+        return await call_upstream(
+            "azure_tts",
+            synthesize_speech,
+            self.speech_synthesizers[output_format.name],
+            text_content,
+        )
+    
+    async def check(self) -> bool:
+        return self.initialize()
 
 
-async def text_to_speech(text_content: str) -> bytes:
-    global speech_synthesizer
+def resolve_output_format(requested_format: Optional[str] = None, accept_header: Optional[str] = None) -> AudioOutputFormat:
+    output_format = negotiate_audio_format(requested_format, accept_header)
     
-    if speech_synthesizer is None:
-        service_initialized = await initialize_tts_service()
-        if not service_initialized:
-            raise SpeechProcessingError("Unable to initialize speech synthesis service")
+    provider = get_tts_provider()
+    if output_format.name not in provider.supported_formats:
+        logger.debug("TTS provider %s cannot produce %s audio, using wav", provider.name, output_format.name)
+        return get_audio_format("wav")
+    
+    return output_format
+
+
+async def text_to_speech(text_content: str, output_format: Optional[AudioOutputFormat] = None) -> bytes:
+    if output_format is None:
+        output_format = resolve_output_format()
+    
+    precomputed_audio = get_precomputed_speech(text_content, output_format.name)
+    if precomputed_audio is not None:
+        logger.info("Serving precomputed speech for text: %.50s...", text_content)
+        return precomputed_audio
     
     try:
-        synthesis_result = speech_synthesizer.speak_text_async(text_content).get()
+        provider = get_tts_provider()
         
-        if synthesis_result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-            logger.info(f"Successfully synthesized speech for text: {text_content[:50]}...")
-            return synthesis_result.audio_data
-        else:
-            error_message = (
-                synthesis_result.cancellation_details.error_details 
-                if synthesis_result.cancellation_details 
-                else "Unknown synthesis error"
+        async def synthesize():
+            async with admit("tts"):
+                audio_data = await provider.synthesize(text_content, output_format)
+            
+            logger.info(
+                "Successfully synthesized %s speech with %s for text: %.50s...",
+                output_format.name,
+                provider.name,
+                text_content,
             )
-            logger.error(f"Speech synthesis failed: {error_message}")
-            raise SpeechProcessingError(f"Speech synthesis failed: {error_message}")
+            return audio_data
+        
+        cache_key = tts_cache.make_key(
+            provider.name,
+            settings.AZURE_SPEECH_VOICE_NAME,
+            settings.LOCAL_TTS_VOICE,
+            output_format.name,
+            text_content.strip(),
+        )
+        return await tts_cache.get_or_compute(cache_key, synthesize)
+    except SpeechProcessingError as error:
+        logger.error("Speech synthesis failed: %s", error.message)
+        raise
+    except ServiceOverloadedError:
+        raise
     except Exception as error:
         logger.exception("Error during speech synthesis process")
         raise SpeechProcessingError(f"Speech synthesis error: {str(error)}")
@@ -62,7 +174,7 @@ async def text_to_speech(text_content: str) -> bytes:
 
 async def check_tts_service() -> bool:
     try:
-        return await initialize_tts_service()
+        return await get_tts_provider().check()
     except Exception:
         logger.exception("Speech synthesis service health check failed")
         return False
\ No newline at end of file
@@ -1,27 +1,37 @@
+import asyncio
 import logging
-import io
+import time
+import uuid
 import numpy as np
-from typing import Tuple, Optional
+from typing import Dict, Tuple, Optional, Union
 import pvporcupine
-import struct
-import wave
 
 from app.config import settings
-from app.core.errors import WakeWordError
+from app.core.errors import AudioFormatError, ServiceOverloadedError, WakeWordError, WakeWordStreamNotFoundError
+from app.services.audio.normalizer import NormalizedAudio, normalize_audio, TARGET_SAMPLE_RATE
+from app.services.audio.vad import gate_speech
+from app.services.wake_word.stream import WakeWordStream
 
 logger = logging.getLogger(__name__)
 
 porcupine_instance = None
 
+# Streaming sessions each own a Porcupine handle, since its state spans chunks
+wake_word_streams: Dict[str, WakeWordStream] = {}
+
+
+def create_porcupine():
+    return pvporcupine.create(
+        access_key=settings.PORCUPINE_ACCESS_KEY,
+        keywords=["jarvis"],  # Placeholder - would be replaced with actual wake word
+    )
+
 
 async def initialize_wake_word_detector():
     global porcupine_instance
     
     try:
-        porcupine_instance = pvporcupine.create(
-            access_key=settings.PORCUPINE_ACCESS_KEY,
-            keywords=["jarvis"],  # Placeholder - would be replaced with actual wake word
-        )
+        porcupine_instance = create_porcupine()
         
         logger.info("Wake word detection service initialized successfully")
         return True
@@ -31,7 +41,16 @@ async def initialize_wake_word_detector():
         return False
 
 
-async def detect_wake_word(audio_data: bytes) -> Tuple[bool, float]:
+async def get_wake_word_sample_rate() -> int:
+    if porcupine_instance is None:
+        detector_initialized = await initialize_wake_word_detector()
+        if not detector_initialized:
+            return TARGET_SAMPLE_RATE
+    
+    return porcupine_instance.sample_rate
+
+
+async def locate_wake_word(audio_data: Union[bytes, NormalizedAudio]) -> Optional[int]:
     global porcupine_instance
     
     if porcupine_instance is None:
@@ -40,42 +59,124 @@ async def detect_wake_word(audio_data: bytes) -> Tuple[bool, float]:
             raise WakeWordError("Unable to initialize wake word detection service")
     
     try:
-        processed_audio = convert_audio_to_pcm(audio_data)
+        if isinstance(audio_data, NormalizedAudio) and audio_data.sample_rate == porcupine_instance.sample_rate:
+            processed_audio = audio_data.pcm
+        else:
+            processed_audio = convert_audio_to_pcm(audio_data)
         
-        frame_size = porcupine_instance.frame_length
-        wake_word_detected = False
-        detection_confidence = 0.0
+        # Silent and noise-only clips never reach Porcupine
+        speech_span = gate_speech(processed_audio, porcupine_instance.sample_rate, "wake_word")
+        if speech_span is None:
+            return None
+        speech_start, speech_end = speech_span
         
-        for frame_start in range(0, len(processed_audio) - frame_size, frame_size):
-            audio_frame = processed_audio[frame_start:frame_start + frame_size]
-            
-            if len(audio_frame) < frame_size:
-                audio_frame = np.pad(audio_frame, (0, frame_size - len(audio_frame)), 'constant')
-            
-            detection_result = porcupine_instance.process(audio_frame)
-            
-            if detection_result >= 0:
-                wake_word_detected = True
-                detection_confidence = 0.8  # Fixed value since Porcupine doesn't provide confidence
-                break
+        # The whole buffer is already in memory, so the stream needs no history of its own
+        stream = WakeWordStream(porcupine_instance, buffer_seconds=0, owns_handle=False)
+        detection_offset = stream.push(processed_audio[speech_start:speech_end])
+        if detection_offset is not None:
+            detection_offset += speech_start
         
-        logger.info(f"Wake word detection completed: detected={wake_word_detected}, confidence={detection_confidence}")
-        return wake_word_detected, detection_confidence
+        logger.info("Wake word detection completed: offset=%s", detection_offset)
+        return detection_offset
     except Exception as error:
         logger.exception("Error during wake word detection")
         raise WakeWordError(str(error))
 
 
-def convert_audio_to_pcm(audio_data: bytes) -> np.ndarray:
+async def detect_wake_word(audio_data: Union[bytes, NormalizedAudio]) -> Tuple[bool, float]:
+    detection_offset = await locate_wake_word(audio_data)
+    
+    if detection_offset is None:
+        return False, 0.0
+    
+    return True, 0.8  # Fixed value since Porcupine doesn't provide confidence
+
+
+def trim_to_command(audio: NormalizedAudio, detection_offset: int) -> NormalizedAudio:
+    command_pcm = audio.pcm[detection_offset:]
+    
+    # A wake word at the very end leaves nothing to transcribe; keep the
+    # whole buffer so a command spoken before it is not lost
+    if len(command_pcm) < settings.WAKE_WORD_MIN_COMMAND_SECONDS * audio.sample_rate:
+        logger.info("Too little audio after the wake word, transcribing the whole buffer")
+        return audio
+    
+    logger.debug("Trimmed %d wake word samples before transcription", detection_offset)
+    return NormalizedAudio(pcm=command_pcm, sample_rate=audio.sample_rate, source_format=audio.source_format)
+
+
+def decode_stream_chunk(chunk: bytes, sample_rate: int) -> np.ndarray:
+    if chunk[:4] == b"RIFF":
+        return normalize_audio(chunk, sample_rate).pcm
+    
+    if len(chunk) % 2:
+        raise AudioFormatError("Raw PCM chunks must hold whole 16-bit samples")
+    
+    return np.frombuffer(chunk, dtype="<i2")
+
+
+def expire_wake_word_streams():
+    idle_deadline = time.monotonic() - settings.WAKE_WORD_STREAM_IDLE_SECONDS
+    
+    for session_id in [session_id for session_id, stream in wake_word_streams.items() if stream.last_activity < idle_deadline]:
+        logger.info("Closing idle wake word stream %s", session_id)
+        close_wake_word_stream(session_id)
+
+
+async def open_wake_word_stream() -> Tuple[str, WakeWordStream]:
+    expire_wake_word_streams()
+    
+    if len(wake_word_streams) >= settings.WAKE_WORD_STREAM_MAX_SESSIONS:
+        raise ServiceOverloadedError("wake_word_stream", max(1, int(settings.WAKE_WORD_STREAM_IDLE_SECONDS)))
+    
     try:
-        with io.BytesIO(audio_data) as audio_stream:
-            with wave.open(audio_stream, 'rb') as wav_file:
-                if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
-                    # Audio format conversion would be implemented here in production
-                    pass
-                
-                pcm_data = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
-                return pcm_data
+        porcupine = await asyncio.to_thread(create_porcupine)
+    except Exception as error:
+        logger.exception("Failed to create wake word stream")
+        raise WakeWordError(f"Unable to open wake word stream: {str(error)}")
+    
+    session_id = str(uuid.uuid4())
+    wake_word_streams[session_id] = WakeWordStream(porcupine, settings.WAKE_WORD_STREAM_BUFFER_SECONDS)
+    
+    logger.info("Opened wake word stream %s", session_id)
+    return session_id, wake_word_streams[session_id]
+
+
+def get_wake_word_stream(session_id: str) -> WakeWordStream:
+    stream = wake_word_streams.get(session_id)
+    if stream is None:
+        raise WakeWordStreamNotFoundError(session_id)
+    return stream
+
+
+async def push_wake_word_audio(session_id: Optional[str], chunk: bytes) -> Tuple[str, WakeWordStream]:
+    if session_id is None:
+        session_id, stream = await open_wake_word_stream()
+    else:
+        stream = get_wake_word_stream(session_id)
+    
+    stream.push(decode_stream_chunk(chunk, stream.sample_rate))
+    return session_id, stream
+
+
+def close_wake_word_stream(session_id: str):
+    stream = wake_word_streams.pop(session_id, None)
+    if stream is not None:
+        stream.close()
+
+
+def close_wake_word_streams():
+    for session_id in list(wake_word_streams):
+        close_wake_word_stream(session_id)
+
+
+def convert_audio_to_pcm(audio_data: Union[bytes, NormalizedAudio]) -> np.ndarray:
+    try:
+        if isinstance(audio_data, NormalizedAudio):
+            audio_data = audio_data.to_wav_bytes()
+        
+        sample_rate = porcupine_instance.sample_rate if porcupine_instance is not None else TARGET_SAMPLE_RATE
+        return normalize_audio(audio_data, sample_rate).pcm
     except Exception as error:
         logger.exception("Failed to convert audio to PCM format")
         raise WakeWordError(f"Audio format conversion error: {str(error)}")
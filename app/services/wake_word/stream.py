@@ -0,0 +1,106 @@
+import logging
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity: int):
+        self.samples = np.zeros(max(1, capacity), dtype=np.int16)
+        self.capacity = len(self.samples)
+        # Absolute number of samples ever written; the buffer holds the tail
+        self.end = 0
+
+    @property
+    def start(self) -> int:
+        return max(0, self.end - self.capacity)
+
+    def write(self, pcm: np.ndarray):
+        if len(pcm) >= self.capacity:
+            self.samples[:] = pcm[-self.capacity:]
+            # Keep positions consistent with end % capacity
+            self.samples = np.roll(self.samples, (self.end + len(pcm)) % self.capacity)
+            self.end += len(pcm)
+            return
+
+        position = self.end % self.capacity
+        first = min(len(pcm), self.capacity - position)
+        self.samples[position:position + first] = pcm[:first]
+        self.samples[:len(pcm) - first] = pcm[first:]
+        self.end += len(pcm)
+
+    def read_from(self, offset: int) -> np.ndarray:
+        offset = max(offset, self.start)
+        count = self.end - offset
+        if count <= 0:
+            return np.zeros(0, dtype=np.int16)
+
+        position = offset % self.capacity
+        first = min(count, self.capacity - position)
+        return np.concatenate([
+            self.samples[position:position + first],
+            self.samples[:count - first],
+        ])
+
+
+class WakeWordStream:
+    def __init__(self, porcupine: Any, buffer_seconds: float, owns_handle: bool = True):
+        self.porcupine = porcupine
+        self.owns_handle = owns_handle
+        self.sample_rate = porcupine.sample_rate
+        self.frame_length = porcupine.frame_length
+        self.ring = AudioRingBuffer(int(buffer_seconds * self.sample_rate))
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.samples_processed = 0
+        self.detection_offset: Optional[int] = None
+        self.last_activity = time.monotonic()
+
+    @property
+    def detected(self) -> bool:
+        return self.detection_offset is not None
+
+    @property
+    def samples_received(self) -> int:
+        return self.ring.end
+
+    def push(self, pcm: np.ndarray) -> Optional[int]:
+        self.last_activity = time.monotonic()
+        self.ring.write(pcm)
+
+        # Once the keyword is found Porcupine is done; later chunks are only buffered
+        if self.detected:
+            return self.detection_offset
+
+        pending = np.concatenate([self.pending, pcm]) if len(self.pending) else pcm
+        frame_count = len(pending) // self.frame_length
+
+        for frame_index in range(frame_count):
+            frame_start = frame_index * self.frame_length
+            if self.porcupine.process(pending[frame_start:frame_start + self.frame_length]) >= 0:
+                # Porcupine fires on the frame where the keyword ends
+                self.detection_offset = self.samples_processed + frame_start + self.frame_length
+                logger.info(
+                    "Wake word detected at sample %d (%.2fs)",
+                    self.detection_offset,
+                    self.detection_offset / self.sample_rate,
+                )
+                self.pending = np.zeros(0, dtype=np.int16)
+                return self.detection_offset
+
+        consumed = frame_count * self.frame_length
+        self.samples_processed += consumed
+        self.pending = pending[consumed:].copy()
+        return None
+
+    def post_wake_audio(self) -> np.ndarray:
+        if not self.detected:
+            return np.zeros(0, dtype=np.int16)
+        return self.ring.read_from(self.detection_offset)
+
+    def close(self):
+        if self.owns_handle and self.porcupine is not None:
+            self.porcupine.delete()
+        self.porcupine = None
@@ -0,0 +1,98 @@
+import argparse
+import io
+import logging
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.audio.normalizer import normalize_audio, TARGET_SAMPLE_RATE
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FORMATS = [
+    # (channels, sample width in bytes, sample rate)
+    (1, 2, 16000),
+    (1, 2, 8000),
+    (2, 2, 44100),
+    (2, 2, 48000),
+    (1, 3, 48000),
+    (2, 4, 44100),
+]
+
+
+def build_test_wav(channels: int, sample_width: int, sample_rate: int, duration_seconds: float) -> bytes:
+    random_generator = np.random.default_rng(0)
+    total_frames = int(sample_rate * duration_seconds)
+    time_axis = np.arange(total_frames) / sample_rate
+
+    signal = 0.4 * np.sin(2 * np.pi * 440 * time_axis) + 0.05 * random_generator.standard_normal(total_frames)
+    signal = np.repeat(signal[:, None], channels, axis=1).reshape(-1)
+
+    max_value = float(2 ** (8 * sample_width - 1) - 1)
+    integer_samples = np.clip(signal * max_value, -max_value, max_value).astype(np.int64)
+
+    if sample_width == 3:
+        frame_bytes = np.stack(
+            [integer_samples & 0xFF, (integer_samples >> 8) & 0xFF, (integer_samples >> 16) & 0xFF],
+            axis=1,
+        ).astype(np.uint8).tobytes()
+    else:
+        frame_bytes = integer_samples.astype(f"<i{sample_width}").tobytes()
+
+    with io.BytesIO() as wav_stream:
+        with wave.open(wav_stream, "wb") as wav_file:
+            wav_file.setnchannels(channels)
+            wav_file.setsampwidth(sample_width)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(frame_bytes)
+        return wav_stream.getvalue()
+
+
+def benchmark_format(channels: int, sample_width: int, sample_rate: int, duration_seconds: float, repeats: int) -> float:
+    wav_bytes = build_test_wav(channels, sample_width, sample_rate, duration_seconds)
+
+    normalize_audio(wav_bytes, TARGET_SAMPLE_RATE)
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        normalize_audio(wav_bytes, TARGET_SAMPLE_RATE)
+    elapsed_seconds = time.perf_counter() - start_time
+
+    return len(wav_bytes) * repeats / elapsed_seconds / (1024 * 1024)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Benchmark audio normalization throughput for ASP Bot")
+    argument_parser.add_argument(
+        "--duration",
+        type=float,
+        default=5.0,
+        help="Length of each synthetic clip in seconds",
+    )
+    argument_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=20,
+        help="Number of timed normalizations per format",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    for channels, sample_width, sample_rate in BENCHMARK_FORMATS:
+        throughput = benchmark_format(channels, sample_width, sample_rate, parsed_args.duration, parsed_args.repeats)
+        logger.info(
+            f"{channels} ch / {sample_width * 8} bit / {sample_rate} Hz -> "
+            f"{TARGET_SAMPLE_RATE} Hz mono: {throughput:.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
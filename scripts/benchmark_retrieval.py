@@ -0,0 +1,132 @@
+import asyncio
+import argparse
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import tiktoken
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.core.errors import NoRelevantDocumentsError
+from app.services.rag.retriever import generate_answer, retrieve_documents
+from app.services.rag.vector_store import embed_query
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def summarize_latencies(latencies):
+    ordered = sorted(latencies)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return (
+        f"mean={statistics.mean(ordered) * 1000:.1f}ms "
+        f"p50={statistics.median(ordered) * 1000:.1f}ms "
+        f"p95={ordered[p95_index] * 1000:.1f}ms"
+    )
+
+
+def chunk_overlap(documents):
+    # Mean word-set Jaccard between retrieved chunks: what MMR is meant to lower
+    word_sets = [set(document["content"].lower().split()) for document in documents]
+    pairs = [
+        len(first & second) / len(first | second)
+        for first, second in itertools.combinations(word_sets, 2)
+        if first | second
+    ]
+    return statistics.mean(pairs) if pairs else 0.0
+
+
+def load_queries(queries_path: str):
+    with open(queries_path, "r", encoding="utf-8") as queries_file:
+        query_items = json.load(queries_file)
+
+    # Accepts a plain list of questions or the FAQ questions.json format
+    return [item["question"] if isinstance(item, dict) else item for item in query_items]
+
+
+async def benchmark_mode(mmr_enabled: bool, queries, query_embeddings, encoding, generate: bool):
+    settings.MMR_ENABLED = mmr_enabled
+
+    context_tokens = []
+    overlaps = []
+    latencies = []
+    unanswered = 0
+
+    for query, query_embedding in zip(queries, query_embeddings):
+        start_time = time.perf_counter()
+        try:
+            documents = await retrieve_documents(query, query_embedding)
+        except NoRelevantDocumentsError:
+            unanswered += 1
+            continue
+
+        if generate:
+            await generate_answer(query, documents)
+        latencies.append(time.perf_counter() - start_time)
+
+        # Same context string generate_answer puts into the prompt
+        context = "\n\n".join([document["content"] for document in documents])
+        context_tokens.append(len(encoding.encode(context)))
+        overlaps.append(chunk_overlap(documents))
+
+    if not latencies:
+        logger.warning(f"MMR {'on' if mmr_enabled else 'off'}: no query returned relevant documents")
+        return
+
+    logger.info(
+        f"MMR {'on' if mmr_enabled else 'off'}: {summarize_latencies(latencies)} "
+        f"context_tokens mean={statistics.mean(context_tokens):.0f} max={max(context_tokens)} "
+        f"chunk_overlap={statistics.mean(overlaps):.2f} "
+        f"unanswered={unanswered}/{len(queries)}"
+    )
+
+
+async def main():
+    argument_parser = argparse.ArgumentParser(description="Compare retrieval with and without MMR re-ranking")
+    argument_parser.add_argument(
+        "--queries",
+        type=str,
+        default=os.path.join("data", "faq", "questions.json"),
+        help="JSON list of questions, or an FAQ questions.json file",
+    )
+    argument_parser.add_argument(
+        "--generate",
+        action="store_true",
+        help="Include answer generation in the measured latency",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    # Measure the document pipeline, not the FAQ shortcut
+    settings.FAQ_ENABLED = False
+
+    try:
+        queries = load_queries(parsed_args.queries)
+
+        try:
+            encoding = tiktoken.encoding_for_model(settings.LLM_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+
+        # Embed once so both modes see identical queries and the same embedding latency
+        query_embeddings = [await embed_query(query) for query in queries]
+        logger.info(f"Benchmarking retrieval for {len(queries)} queries (top_k={settings.RETRIEVAL_TOP_K})")
+
+        await benchmark_mode(False, queries, query_embeddings, encoding, parsed_args.generate)
+        await benchmark_mode(True, queries, query_embeddings, encoding, parsed_args.generate)
+    except Exception as error:
+        logger.exception(f"Retrieval benchmark failed: {str(error)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
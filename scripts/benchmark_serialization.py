@@ -0,0 +1,109 @@
+import argparse
+import base64
+import gzip
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.schemas import RAGResponse, VoiceInteractionResponse
+from app.services.audio.normalizer import encode_wav
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+SAMPLE_ANSWER = "За да кандидатствате за социално подпомагане, трябва да подадете заявление в дирекция „Социално подпомагане“ по настоящ адрес. "
+SAMPLE_CHUNK = "Месечни социални помощи се отпускат на лица и семейства, чийто доход за предходния месец е по-нисък от диференцирания минимален доход. " * 8
+
+
+def build_rag_payload(include_sources: bool, source_max_chars):
+    source_documents = []
+    if include_sources:
+        source_documents = [
+            {
+                "content": SAMPLE_CHUNK[:source_max_chars] if source_max_chars else SAMPLE_CHUNK,
+                "metadata": {"source": f"data/documents/social_assistance/document{index}.pdf", "page": index},
+                "score": 0.9 - index * 0.05,
+            }
+            for index in range(3)
+        ]
+
+    return RAGResponse(
+        answer=SAMPLE_ANSWER * 4,
+        source_documents=source_documents,
+        query="Как мога да кандидатствам за социално подпомагане?",
+    ).model_dump(mode="json")
+
+
+def build_interaction_payload(audio_seconds: float):
+    # Low-level noise stands in for speech; silence would compress unrealistically well
+    samples = (np.random.default_rng(0).normal(0, 2000, int(audio_seconds * 16000))).astype(np.int16)
+
+    return VoiceInteractionResponse(
+        wake_word_detected=True,
+        transcription="Как мога да кандидатствам за социално подпомагане?",
+        answer=SAMPLE_ANSWER,
+        audio_response=base64.b64encode(encode_wav(samples, 16000)).decode("utf-8"),
+        session_id="benchmark",
+    ).model_dump(mode="json")
+
+
+def time_render(response_class, payload, repeats: int) -> float:
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        response_class(payload).body
+    return (time.perf_counter() - start_time) / repeats
+
+
+def benchmark_payload(name: str, payload, repeats: int):
+    json_seconds = time_render(JSONResponse, payload, repeats)
+    orjson_seconds = time_render(ORJSONResponse, payload, repeats)
+    body = ORJSONResponse(payload).body
+
+    sizes = [f"raw={len(body)}B", f"gzip={len(gzip.compress(body, compresslevel=6))}B"]
+    if brotli is not None:
+        sizes.append(f"br={len(brotli.compress(body, quality=4))}B")
+
+    logger.info(
+        f"{name}: json={json_seconds * 1e6:.0f}us orjson={orjson_seconds * 1e6:.0f}us "
+        f"({json_seconds / orjson_seconds:.1f}x) {' '.join(sizes)}"
+    )
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Measure response serialization time and compressed sizes")
+    argument_parser.add_argument(
+        "--audio-seconds",
+        type=float,
+        default=5.0,
+        help="Length of the synthesized answer audio in the /interact payload",
+    )
+    argument_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=200,
+        help="Number of timed serializations per payload",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    benchmark_payload("rag (full sources)", build_rag_payload(True, None), parsed_args.repeats)
+    benchmark_payload("rag (source_max_chars=200)", build_rag_payload(True, 200), parsed_args.repeats)
+    benchmark_payload("rag (include_sources=false)", build_rag_payload(False, None), parsed_args.repeats)
+    benchmark_payload("interact", build_interaction_payload(parsed_args.audio_seconds), parsed_args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_API_KEY = "benchmark-key"
+
+# A greeting is answered by the local intent classifier, so the run measures
+# the HTTP stack and the app, not OpenAI
+REQUEST_BODY = orjson.dumps({"query": "Здравейте", "session_id": "benchmark"})
+
+
+def server_command(mode: str, port: int):
+    if mode == "baseline":
+        # What the Dockerfile ran before app.server existed
+        return [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--loop", "asyncio", "--http", "h11",
+        ]
+    return [sys.executable, "-m", "app.server"]
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    environment = {
+        **os.environ,
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(port),
+        "SERVER_WORKERS": str(workers),
+        "API_KEY": BENCHMARK_API_KEY,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")])),
+    }
+    return subprocess.Popen(
+        server_command(mode, port),
+        cwd=PROJECT_ROOT,
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for_server(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1.0) as connection:
+                connection.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                if connection.recv(16).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not become ready within {timeout:.0f}s")
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+
+    content_length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            content_length = int(value)
+    await reader.readexactly(content_length)
+    return status
+
+
+async def run_connection(port: int, stop_at: float, latencies: list, errors: list):
+    # One keep-alive connection, one request in flight at a time, like a kiosk
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = (
+        b"POST /api/v1/rag HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        + f"X-API-Key: {BENCHMARK_API_KEY}\r\nContent-Length: {len(REQUEST_BODY)}\r\n\r\n".encode("ascii")
+        + REQUEST_BODY
+    )
+
+    try:
+        while time.perf_counter() < stop_at:
+            started_at = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            if status == 200:
+                latencies.append(time.perf_counter() - started_at)
+            else:
+                errors.append(status)
+    except (OSError, asyncio.IncompleteReadError):
+        # A recycled worker closes its idle connections; reconnect and carry on
+        errors.append(0)
+        if time.perf_counter() < stop_at:
+            await run_connection(port, stop_at, latencies, errors)
+    finally:
+        writer.close()
+
+
+async def drive_load(port: int, connections: int, duration: float):
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    await asyncio.gather(*(run_connection(port, stop_at, latencies, errors) for _ in range(connections)))
+    return latencies, errors
+
+
+def run_client(port: int, connections: int, duration: float):
+    return asyncio.run(drive_load(port, connections, duration))
+
+
+def measure(port: int, connections: int, clients: int, duration: float):
+    # Several client processes, so the load generator is not the bottleneck
+    per_client = [connections // clients + (1 if index < connections % clients else 0) for index in range(clients)]
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.starmap(run_client, [(port, count, duration) for count in per_client if count])
+
+    latencies = np.array([latency for client_latencies, _ in results for latency in client_latencies])
+    errors = sum(len(client_errors) for _, client_errors in results)
+    return latencies, errors
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Compare requests/sec of plain uvicorn against app.server")
+    argument_parser.add_argument("--modes", type=str, nargs="+", default=["baseline", "tuned"], choices=["baseline", "tuned"])
+    argument_parser.add_argument("--workers", type=int, default=1, help="Worker processes for the tuned server")
+    argument_parser.add_argument("--connections", type=int, default=32, help="Concurrent keep-alive connections")
+    argument_parser.add_argument("--clients", type=int, default=2, help="Load generator processes")
+    argument_parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode")
+    argument_parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of load before measuring")
+    argument_parser.add_argument("--port", type=int, default=8765)
+    parsed_args = argument_parser.parse_args()
+
+    logger.info(f"{'mode':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode in parsed_args.modes:
+        server = start_server(mode, parsed_args.port, parsed_args.workers)
+        try:
+            wait_for_server(parsed_args.port, 60.0)
+            measure(parsed_args.port, parsed_args.connections, parsed_args.clients, parsed_args.warmup)
+
+            latencies, errors = measure(parsed_args.port, parsed_args.connections, parsed_args.clients, parsed_args.duration)
+            if len(latencies) == 0:
+                logger.error(f"{mode}: no successful requests ({errors} errors)")
+                continue
+
+            logger.info(
+                f"{mode:<10} {len(latencies) / parsed_args.duration:>9.0f} "
+                f"{np.percentile(latencies, 50) * 1000:>8.2f} {np.percentile(latencies, 99) * 1000:>8.2f} {errors:>7}"
+            )
+        finally:
+            server.terminate()
+            server.wait(60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import asyncio
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.audio.normalizer import normalize_audio
+from app.services.speech.providers import get_stt_provider, get_tts_provider
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEXT = "За да кандидатствате за социално подпомагане, трябва да подадете заявление в дирекция „Социално подпомагане“ по настоящ адрес."
+
+
+def summarize_latencies(latencies):
+    ordered = sorted(latencies)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return (
+        f"mean={statistics.mean(ordered) * 1000:.1f}ms "
+        f"p50={statistics.median(ordered) * 1000:.1f}ms "
+        f"p95={ordered[p95_index] * 1000:.1f}ms"
+    )
+
+
+async def benchmark_stt(provider_name: str, audio_data: bytes, repeats: int):
+    provider = get_stt_provider(provider_name)
+    normalized_audio = normalize_audio(audio_data)
+
+    transcribed_text, confidence = await provider.transcribe(normalized_audio)
+
+    latencies = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        await provider.transcribe(normalized_audio)
+        latencies.append(time.perf_counter() - start_time)
+
+    real_time_factor = statistics.mean(latencies) / normalized_audio.duration_seconds
+    logger.info(
+        f"STT {provider_name}: {summarize_latencies(latencies)} RTF={real_time_factor:.3f} "
+        f"confidence={confidence:.2f} text={transcribed_text[:60]!r}"
+    )
+
+
+async def benchmark_tts(provider_name: str, text_content: str, repeats: int):
+    provider = get_tts_provider(provider_name)
+
+    audio_data = await provider.synthesize(text_content)
+
+    latencies = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        await provider.synthesize(text_content)
+        latencies.append(time.perf_counter() - start_time)
+
+    logger.info(f"TTS {provider_name}: {summarize_latencies(latencies)} bytes={len(audio_data)}")
+
+
+async def main():
+    argument_parser = argparse.ArgumentParser(description="Benchmark STT/TTS providers for ASP Bot")
+    argument_parser.add_argument(
+        "--file",
+        type=str,
+        help="WAV file to transcribe (required for STT benchmarks)",
+    )
+    argument_parser.add_argument(
+        "--stt",
+        type=str,
+        default="",
+        help="Comma-separated STT providers to compare, e.g. openai,faster_whisper,stub",
+    )
+    argument_parser.add_argument(
+        "--tts",
+        type=str,
+        default="",
+        help="Comma-separated TTS providers to compare, e.g. azure,espeak,stub",
+    )
+    argument_parser.add_argument(
+        "--text",
+        type=str,
+        default=DEFAULT_TEXT,
+        help="Text to synthesize for TTS benchmarks",
+    )
+    argument_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=10,
+        help="Number of timed calls per provider",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    stt_providers = [name for name in parsed_args.stt.split(",") if name]
+    tts_providers = [name for name in parsed_args.tts.split(",") if name]
+
+    try:
+        if stt_providers:
+            if not parsed_args.file:
+                argument_parser.error("--file is required when benchmarking STT providers")
+            audio_data = Path(parsed_args.file).read_bytes()
+            for provider_name in stt_providers:
+                await benchmark_stt(provider_name, audio_data, parsed_args.repeats)
+
+        for provider_name in tts_providers:
+            await benchmark_tts(provider_name, parsed_args.text, parsed_args.repeats)
+    except Exception as error:
+        logger.exception(f"Provider benchmark failed: {str(error)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
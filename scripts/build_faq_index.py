@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.core.errors import NoRelevantDocumentsError
+from app.core.resilience import call_upstream
+from app.services.rag.faq import save_faq_index
+from app.services.rag.retriever import query_rag_system
+from app.services.rag.snapshots import read_active_version
+from app.services.rag.vector_store import initialize_embeddings
+from app.services.speech.tts import resolve_output_format, text_to_speech
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def is_usable_answer(answer) -> bool:
+    # The fallback would be served to every query near the question
+    return bool(answer) and answer.strip() != settings.DEFAULT_RESPONSE.strip()
+
+
+async def draft_answer(question: str):
+    try:
+        answer, sources = await query_rag_system(question)
+    except NoRelevantDocumentsError:
+        logger.warning(f"No documents answer FAQ question, skipping it: {question}")
+        return None
+
+    if not is_usable_answer(answer):
+        logger.warning(f"Only the fallback answer came back for FAQ question, skipping it: {question}")
+        return None
+
+    logger.info(f"Drafted an answer for review: {question}")
+    return {"question": question, "answer": answer, "sources": sources}
+
+
+async def build_entry(question_item: dict, synthesize_audio: bool) -> dict:
+    entry = {
+        "question": question_item["question"],
+        "answer": question_item["answer"],
+        "sources": question_item.get("sources", []),
+    }
+
+    if synthesize_audio:
+        # Stored in the default format, which is what most requests will ask for
+        output_format = resolve_output_format()
+        entry["audio"] = await text_to_speech(entry["answer"], output_format)
+        entry["audio_format"] = output_format.name
+
+    return entry
+
+
+async def main():
+    argument_parser = argparse.ArgumentParser(description="Build the precomputed FAQ answer index for ASP Bot")
+    argument_parser.add_argument(
+        "--questions",
+        type=str,
+        default=os.path.join("data", "faq", "questions.json"),
+        help="JSON file with the curated FAQ questions",
+    )
+    argument_parser.add_argument(
+        "--output",
+        type=str,
+        default=settings.FAQ_INDEX_PATH,
+        help="Directory to write the FAQ index to",
+    )
+    argument_parser.add_argument(
+        "--drafts",
+        type=str,
+        default=os.path.join("data", "faq", "drafts.json"),
+        help="File to write RAG-generated drafts to, for questions without a vetted answer",
+    )
+    argument_parser.add_argument(
+        "--skip-drafts",
+        action="store_true",
+        help="Do not generate drafts for questions without a vetted answer",
+    )
+    argument_parser.add_argument(
+        "--skip-audio",
+        action="store_true",
+        help="Do not synthesize audio for the answers",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    # Answers must come from the document index, not from a previous FAQ index
+    settings.FAQ_ENABLED = False
+
+    try:
+        with open(parsed_args.questions, "r", encoding="utf-8") as questions_file:
+            question_items = json.load(questions_file)
+
+        # Only reviewed answers are served; the rest get a draft to review
+        vetted_items = [item for item in question_items if is_usable_answer(item.get("answer"))]
+        unvetted_items = [item for item in question_items if not is_usable_answer(item.get("answer"))]
+
+        if unvetted_items and not parsed_args.skip_drafts:
+            drafts = [draft for draft in [await draft_answer(item["question"]) for item in unvetted_items] if draft]
+            with open(parsed_args.drafts, "w", encoding="utf-8") as drafts_file:
+                json.dump(drafts, drafts_file, ensure_ascii=False, indent=2)
+            logger.info(
+                f"Wrote {len(drafts)} draft answers to {parsed_args.drafts}; "
+                f"copy reviewed ones into {parsed_args.questions} as \"answer\" and rebuild"
+            )
+
+        if not vetted_items:
+            logger.warning(f"No question in {parsed_args.questions} has a vetted answer; FAQ index not built")
+            return
+
+        logger.info(f"Building FAQ index for {len(vetted_items)} questions ({len(unvetted_items)} without a vetted answer left out)")
+
+        entries = []
+        for question_item in vetted_items:
+            entries.append(await build_entry(question_item, not parsed_args.skip_audio))
+
+        # Every phrasing of a question gets its own vector pointing at the same answer
+        phrasings = []
+        vector_entry_ids = []
+        for entry_id, question_item in enumerate(vetted_items):
+            for phrasing in [question_item["question"]] + question_item.get("aliases", []):
+                phrasings.append(phrasing)
+                vector_entry_ids.append(entry_id)
+
+        embedding_model = await initialize_embeddings()
+        vectors = await call_upstream("openai_embeddings", embedding_model.embed_documents, phrasings)
+
+        # Workers stop serving the index once they switch to a different snapshot
+        snapshot_version = read_active_version() if settings.VECTOR_SNAPSHOTS_ENABLED else None
+        save_faq_index(parsed_args.output, entries, np.asarray(vectors, dtype=np.float32), vector_entry_ids, snapshot_version)
+        logger.info(f"FAQ index built with {len(entries)} answers and {len(phrasings)} phrasings")
+    except Exception as error:
+        logger.exception(f"FAQ index build failed: {str(error)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.services.intents import INTENT_AUDIO_MANIFEST_FILENAME
+from app.services.speech.tts import resolve_output_format, text_to_speech
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    argument_parser = argparse.ArgumentParser(description="Pre-synthesize the canned intent responses for ASP Bot")
+    argument_parser.add_argument(
+        "--intents",
+        type=str,
+        default=settings.INTENTS_PATH,
+        help="JSON file with the intent definitions",
+    )
+    argument_parser.add_argument(
+        "--output",
+        type=str,
+        default=settings.INTENT_AUDIO_PATH,
+        help="Directory to write the synthesized responses to",
+    )
+    argument_parser.add_argument(
+        "--formats",
+        type=str,
+        nargs="+",
+        default=[settings.TTS_DEFAULT_FORMAT],
+        help="Audio formats to synthesize, e.g. wav opus mp3",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    output_directory = Path(parsed_args.output)
+    staging_directory = output_directory.with_name(output_directory.name + ".tmp")
+
+    try:
+        with open(parsed_args.intents, "r", encoding="utf-8") as intents_file:
+            definitions = json.load(intents_file)
+
+        # The default response is canned too, and is spoken whenever nothing was understood
+        texts = [details["response"] for details in definitions["intents"].values()] + [settings.DEFAULT_RESPONSE]
+
+        if staging_directory.exists():
+            shutil.rmtree(staging_directory)
+        staging_directory.mkdir(parents=True)
+
+        responses = []
+        for response_id, text in enumerate(dict.fromkeys(texts)):
+            audio_files = {}
+            for format_name in parsed_args.formats:
+                output_format = resolve_output_format(format_name)
+                # mp3-32k and mp3-64k share an extension, so the format name keeps them apart
+                audio_file = f"{response_id:04d}.{output_format.name}.{output_format.extension}"
+                (staging_directory / audio_file).write_bytes(await text_to_speech(text, output_format))
+                audio_files[output_format.name] = audio_file
+            responses.append({"text": text, "audio": audio_files})
+            logger.info(f"Synthesized intent response: {text}")
+
+        with open(staging_directory / INTENT_AUDIO_MANIFEST_FILENAME, "w", encoding="utf-8") as manifest_file:
+            json.dump({"responses": responses}, manifest_file, ensure_ascii=False, indent=2)
+
+        if output_directory.exists():
+            shutil.rmtree(output_directory)
+        staging_directory.rename(output_directory)
+
+        logger.info(f"Wrote {len(responses)} intent responses to {output_directory}")
+    except Exception as error:
+        logger.exception(f"Intent audio build failed: {str(error)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+import asyncio
+import argparse
+import logging
+import time
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# key -> (value, expires_at or None); a stand-in for Redis in local runs, not a replacement
+entries = {}
+lists = {}
+list_changed = None
+
+
+def encode_reply(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def lookup(key: bytes):
+    entry = entries.get(key)
+    if entry is None:
+        return None
+    if entry[1] is not None and entry[1] <= time.monotonic():
+        del entries[key]
+        return None
+    return entry[0]
+
+
+def handle_set(arguments) -> bytes:
+    key, value = arguments[0], arguments[1]
+    expires_at = None
+    only_if_missing = False
+
+    options = [option.upper() for option in arguments[2:]]
+    position = 0
+    while position < len(options):
+        if options[position] == b"EX":
+            expires_at = time.monotonic() + int(options[position + 1])
+            position += 2
+        elif options[position] == b"PX":
+            expires_at = time.monotonic() + int(options[position + 1]) / 1000
+            position += 2
+        elif options[position] == b"NX":
+            only_if_missing = True
+            position += 1
+        else:
+            return b"-ERR syntax error\r\n"
+
+    if only_if_missing and lookup(key) is not None:
+        return encode_reply(None)
+
+    entries[key] = (value, expires_at)
+    return b"+OK\r\n"
+
+
+def handle_command(command) -> bytes:
+    name, arguments = command[0].upper(), command[1:]
+
+    if name == b"PING":
+        return b"+PONG\r\n"
+    if name in (b"AUTH", b"SELECT"):
+        return b"+OK\r\n"
+    if name == b"GET":
+        return encode_reply(lookup(arguments[0]))
+    if name == b"MGET":
+        return encode_reply([lookup(key) for key in arguments])
+    if name == b"SET":
+        return handle_set(arguments)
+    if name == b"DEL":
+        return encode_reply(sum(1 for key in arguments if entries.pop(key, None) is not None))
+    if name in (b"LPUSH", b"RPUSH"):
+        items = lists.setdefault(arguments[0], [])
+        for value in arguments[1:]:
+            if name == b"LPUSH":
+                items.insert(0, value)
+            else:
+                items.append(value)
+        return encode_reply(len(items))
+    if name == b"LLEN":
+        return encode_reply(len(lists.get(arguments[0], [])))
+    if name == b"DBSIZE":
+        return encode_reply(len(entries))
+    if name == b"FLUSHDB":
+        entries.clear()
+        lists.clear()
+        return b"+OK\r\n"
+
+    return b"-ERR unknown command '%s'\r\n" % name
+
+
+async def blocking_pop(arguments) -> bytes:
+    deadline = time.monotonic() + float(arguments[-1])
+
+    async with list_changed:
+        while True:
+            for key in arguments[:-1]:
+                if lists.get(key):
+                    return encode_reply([key, lists[key].pop()])
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return b"*-1\r\n"
+            try:
+                await asyncio.wait_for(list_changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def read_command(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline commands, as typed into telnet or redis-cli without RESP
+        return line.split()
+
+    command = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+async def serve_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            command = await read_command(reader)
+            if command is None:
+                break
+            if not command:
+                continue
+            try:
+                if command[0].upper() == b"BRPOP":
+                    writer.write(await blocking_pop(command[1:]))
+                else:
+                    writer.write(handle_command(command))
+                    if command[0].upper() in (b"LPUSH", b"RPUSH"):
+                        async with list_changed:
+                            list_changed.notify_all()
+            except (IndexError, ValueError):
+                writer.write(b"-ERR wrong number of arguments\r\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main():
+    global list_changed
+
+    argument_parser = argparse.ArgumentParser(description="Minimal Redis-protocol server for the cache and job queue in local runs and tests")
+    argument_parser.add_argument("--host", type=str, default="127.0.0.1")
+    argument_parser.add_argument("--port", type=int, default=6379)
+    parsed_args = argument_parser.parse_args()
+
+    list_changed = asyncio.Condition()
+    server = await asyncio.start_server(serve_client, parsed_args.host, parsed_args.port)
+    logger.info(f"Cache server listening on {parsed_args.host}:{parsed_args.port}")
+
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,8 +7,10 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.services.rag.vector_store import index_documents
+from app.services.rag.vector_store import index_documents, export_quantized_index, build_partition_indexes, rebuild_snapshot
 from app.config import settings
+from app.services.rag.quantized_index import QUANTIZED_INDEX_TYPES
+from app.services.rag.snapshots import activate_snapshot, list_snapshots, read_active_version, rollback_snapshot
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,9 +27,70 @@ async def main():
         default=os.path.join("data", "documents"),
         help="Directory containing documents to index",
     )
+    argument_parser.add_argument(
+        "--quantize-only",
+        action="store_true",
+        help="Rebuild the int8/binary quantized index from the existing vector store without re-indexing",
+    )
+    argument_parser.add_argument(
+        "--partitions-only",
+        action="store_true",
+        help="Rebuild the per-category partition indexes from the existing vector store without re-indexing",
+    )
+    argument_parser.add_argument(
+        "--list-snapshots",
+        action="store_true",
+        help="List vector store snapshots and mark the active one",
+    )
+    argument_parser.add_argument(
+        "--activate",
+        type=str,
+        metavar="VERSION",
+        help="Switch running workers to an existing snapshot",
+    )
+    argument_parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Switch running workers back to the snapshot before the active one",
+    )
     parsed_args = argument_parser.parse_args()
     
     try:
+        if parsed_args.list_snapshots:
+            active_version = read_active_version()
+            for snapshot in list_snapshots():
+                marker = "*" if snapshot["version"] == active_version else " "
+                logger.info(f"{marker} {snapshot['version']}: {snapshot['count']} chunks, {snapshot['index_type']}, from {snapshot['source']}")
+            return
+        
+        if parsed_args.activate:
+            activate_snapshot(parsed_args.activate)
+            return
+        
+        if parsed_args.rollback:
+            logger.info(f"Rolled back to snapshot {rollback_snapshot()}")
+            return
+        
+        if settings.VECTOR_SNAPSHOTS_ENABLED and (parsed_args.partitions_only or parsed_args.quantize_only):
+            logger.info("Rebuilding partition and quantized indexes into a new snapshot")
+            await rebuild_snapshot()
+            logger.info("Snapshot rebuild completed successfully")
+            return
+        
+        if parsed_args.partitions_only:
+            logger.info(f"Building partition indexes on {settings.PARTITION_METADATA_KEY}")
+            await build_partition_indexes()
+            if settings.VECTOR_INDEX_TYPE in QUANTIZED_INDEX_TYPES:
+                await export_quantized_index()
+            logger.info("Partition index build completed successfully")
+            return
+        
+        if parsed_args.quantize_only:
+            logger.info(f"Exporting quantized index to {settings.QUANTIZED_INDEX_PATH}")
+            await export_quantized_index()
+            logger.info("Quantized index export completed successfully")
+            return
+        
         documents_path = parsed_args.directory
         logger.info(f"Starting document indexing process from {documents_path}")
         await index_documents(documents_path)
@@ -0,0 +1,55 @@
+import asyncio
+import argparse
+import logging
+import signal
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.core.cache import close_cache_backend
+from app.services.jobs.queue import close_job_queue, get_job_queue
+from app.services.jobs.worker import JobWorkerPool
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    argument_parser = argparse.ArgumentParser(description="Run /jobs workers outside the API process")
+    argument_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.JOB_WORKER_CONCURRENCY,
+        help="Jobs this process runs at the same time",
+    )
+    parsed_args = argument_parser.parse_args()
+
+    if settings.JOB_QUEUE_BACKEND != "redis":
+        logger.error("The local job queue only exists inside the API process; set JOB_QUEUE_BACKEND=redis")
+        sys.exit(1)
+
+    settings.JOB_WORKER_CONCURRENCY = parsed_args.concurrency
+
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop_requested.set)
+
+    pool = JobWorkerPool(get_job_queue(), parsed_args.concurrency)
+    pool.start()
+
+    await stop_requested.wait()
+    logger.info(f"Stopping job workers, draining for up to {settings.JOB_DRAIN_SECONDS:.0f}s")
+
+    await pool.stop(settings.JOB_DRAIN_SECONDS)
+    await close_job_queue()
+    await close_cache_backend()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,318 @@
+import asyncio
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+import tiktoken
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.services.rag.document_processor import load_documents, split_documents
+from app.services.rag.quantized_index import QUANTIZED_INDEX_TYPES, QuantizedIndex, build_quantized_index
+from app.services.rag.vector_store import open_chroma, search_chroma_by_vectors
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+HASH_EMBEDDING_DIMENSION = 512
+HASH_NGRAM_SIZES = (3, 4, 5)
+
+
+def parse_list(value: str, cast):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def hash_embedding(text: str) -> np.ndarray:
+    # Character n-grams hashed into a fixed-size vector: deterministic, offline,
+    # and good enough to compare chunkings against each other, but its scores
+    # are not on the scale RELEVANCE_THRESHOLD applies to
+    vector = np.zeros(HASH_EMBEDDING_DIMENSION, dtype=np.float32)
+    for word in text.lower().split():
+        padded_word = f" {word} "
+        for size in HASH_NGRAM_SIZES:
+            for start in range(max(1, len(padded_word) - size + 1)):
+                bucket = zlib.crc32(padded_word[start:start + size].encode("utf-8"))
+                vector[bucket % HASH_EMBEDDING_DIMENSION] += 1.0 if bucket & 0x80000000 else -1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class EmbeddingCache:
+    def __init__(self, cache_path: str, fetch_missing: bool):
+        self.cache_path = Path(cache_path)
+        self.fetch_missing = fetch_missing
+        self.vectors = {}
+        self.changed = False
+
+        if self.cache_path.exists():
+            with open(self.cache_path, "r", encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+            if cache.get("embedding_model") == settings.EMBEDDING_MODEL:
+                self.vectors = cache["vectors"]
+            else:
+                logger.warning(f"Ignoring {cache_path}: built with {cache.get('embedding_model')}")
+
+    async def embed(self, texts):
+        keys = [hashlib.sha1(text.encode("utf-8")).hexdigest() for text in texts]
+        missing = [(key, text) for key, text in zip(keys, texts) if key not in self.vectors]
+
+        if missing:
+            if not self.fetch_missing:
+                raise RuntimeError(
+                    f"{len(missing)} texts are not in {self.cache_path}; rerun with --fetch-missing to embed them"
+                )
+
+            from app.services.rag.vector_store import embed_queries
+
+            logger.info(f"Embedding {len(missing)} uncached texts with {settings.EMBEDDING_MODEL}")
+            for batch_start in range(0, len(missing), settings.EMBEDDING_BATCH_SIZE):
+                batch = missing[batch_start:batch_start + settings.EMBEDDING_BATCH_SIZE]
+                for (key, _), vector in zip(batch, await embed_queries([text for _, text in batch])):
+                    self.vectors[key] = vector
+            self.changed = True
+
+        return np.asarray([self.vectors[key] for key in keys], dtype=np.float32)
+
+    def save(self):
+        if not self.changed:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as cache_file:
+            json.dump({"embedding_model": settings.EMBEDDING_MODEL, "vectors": self.vectors}, cache_file)
+
+
+async def embed_texts(texts, embedding_cache):
+    if embedding_cache is None:
+        return np.asarray([hash_embedding(text) for text in texts], dtype=np.float32)
+    return await embedding_cache.embed(texts)
+
+
+def load_labels(labels_path: str):
+    with open(labels_path, "r", encoding="utf-8") as labels_file:
+        labels = json.load(labels_file)
+
+    return [(item["question"], [Path(source).as_posix() for source in item["sources"]]) for item in labels]
+
+
+def is_relevant(metadata, expected_sources) -> bool:
+    source = Path(metadata.get("source", "")).as_posix()
+    return any(source.endswith(expected_source) for expected_source in expected_sources)
+
+
+def build_search(index_type: str, chunks, chunk_vectors, work_directory: str, name: str):
+    documents = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+
+    if index_type in QUANTIZED_INDEX_TYPES:
+        index_path = os.path.join(work_directory, name)
+        build_quantized_index(index_path, chunk_vectors, documents, metadatas)
+        index = QuantizedIndex(index_path, index_type)
+
+        def search(query_vectors, k):
+            return [
+                [{"content": index.chunks[row]["content"], "metadata": index.chunks[row]["metadata"], "score": score} for row, score in rows]
+                for rows in index.search_rows_batch(query_vectors, k)
+            ]
+        return search
+
+    store = open_chroma(os.path.join(work_directory, name), None, name)
+    for batch_start in range(0, len(chunks), 5000):
+        batch_end = batch_start + 5000
+        store._collection.add(
+            ids=[str(row) for row in range(batch_start, min(batch_end, len(chunks)))],
+            embeddings=chunk_vectors[batch_start:batch_end].tolist(),
+            documents=documents[batch_start:batch_end],
+            metadatas=metadatas[batch_start:batch_end],
+        )
+
+    def search(query_vectors, k):
+        return search_chroma_by_vectors(store, query_vectors.tolist(), k)
+    return search
+
+
+def score_configuration(results, labels, threshold: float, encoding):
+    recalls = []
+    reciprocal_ranks = []
+    context_tokens = []
+    unanswered = 0
+
+    for documents, (_, expected_sources) in zip(results, labels):
+        # The same relevance filter the retriever applies before prompting
+        kept = [document for document in documents if document["score"] >= threshold]
+        if not kept:
+            unanswered += 1
+
+        found_sources = {
+            expected_source for document in kept for expected_source in expected_sources
+            if is_relevant(document["metadata"], [expected_source])
+        }
+        recalls.append(len(found_sources) / len(expected_sources))
+
+        first_rank = next(
+            (rank for rank, document in enumerate(kept, start=1) if is_relevant(document["metadata"], expected_sources)),
+            None,
+        )
+        reciprocal_ranks.append(1.0 / first_rank if first_rank else 0.0)
+
+        context = "\n\n".join(document["content"] for document in kept)
+        context_tokens.append(len(encoding.encode(context)) if context else 0)
+
+    return {
+        "recall": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "context_tokens": statistics.mean(context_tokens),
+        "unanswered": unanswered,
+    }
+
+
+async def main():
+    argument_parser = argparse.ArgumentParser(description="Sweep chunking and retrieval settings against labeled questions")
+    argument_parser.add_argument(
+        "--labels",
+        type=str,
+        required=True,
+        help="JSON list of {\"question\": ..., \"sources\": [...]} items",
+    )
+    argument_parser.add_argument(
+        "--directory",
+        type=str,
+        default=os.path.join("data", "documents"),
+        help="Directory containing the documents to index",
+    )
+    argument_parser.add_argument("--chunk-sizes", type=str, default="500,1000,1500")
+    argument_parser.add_argument("--chunk-overlaps", type=str, default="0,100,200")
+    argument_parser.add_argument("--top-k", type=str, default="1,3,5")
+    argument_parser.add_argument("--thresholds", type=str, default="0.5,0.6,0.7")
+    argument_parser.add_argument("--index-types", type=str, default="chroma,int8,binary")
+    argument_parser.add_argument(
+        "--embedding-cache",
+        type=str,
+        default=None,
+        help="Use real embeddings from this cache file instead of the offline hash embedding",
+    )
+    argument_parser.add_argument(
+        "--fetch-missing",
+        action="store_true",
+        help="Embed texts missing from --embedding-cache through the API and add them to it",
+    )
+    argument_parser.add_argument(
+        "--min-recall",
+        type=float,
+        default=0.9,
+        help="Recall the recommended configuration must reach",
+    )
+    argument_parser.add_argument("--output", type=str, default=None, help="Write every result row to this CSV file")
+    parsed_args = argument_parser.parse_args()
+
+    try:
+        labels = load_labels(parsed_args.labels)
+        embedding_cache = EmbeddingCache(parsed_args.embedding_cache, parsed_args.fetch_missing) if parsed_args.embedding_cache else None
+
+        try:
+            encoding = tiktoken.encoding_for_model(settings.LLM_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+
+        documents = await load_documents(parsed_args.directory)
+        query_vectors = await embed_texts([question for question, _ in labels], embedding_cache)
+        top_k_values = parse_list(parsed_args.top_k, int)
+        thresholds = parse_list(parsed_args.thresholds, float)
+
+        logger.info(
+            f"Tuning on {len(labels)} questions over {len(documents)} documents "
+            f"with {'cached API' if embedding_cache else 'offline hash'} embeddings"
+        )
+
+        rows = []
+        with tempfile.TemporaryDirectory() as work_directory:
+            for chunk_size, chunk_overlap in itertools.product(
+                parse_list(parsed_args.chunk_sizes, int),
+                parse_list(parsed_args.chunk_overlaps, int),
+            ):
+                if chunk_overlap >= chunk_size:
+                    continue
+
+                settings.CHUNK_SIZE = chunk_size
+                settings.CHUNK_OVERLAP = chunk_overlap
+                chunks = await split_documents(documents)
+                chunk_vectors = await embed_texts([chunk.page_content for chunk in chunks], embedding_cache)
+
+                for index_type in parse_list(parsed_args.index_types, str):
+                    search = build_search(index_type, chunks, chunk_vectors, work_directory, f"{index_type}_{chunk_size}_{chunk_overlap}")
+
+                    for top_k in top_k_values:
+                        latencies = []
+                        results = []
+                        for query_vector in query_vectors:
+                            start_time = time.perf_counter()
+                            results.extend(search(query_vector[np.newaxis, :], top_k))
+                            latencies.append(time.perf_counter() - start_time)
+
+                        for threshold in thresholds:
+                            rows.append({
+                                "chunk_size": chunk_size,
+                                "chunk_overlap": chunk_overlap,
+                                "index_type": index_type,
+                                "top_k": top_k,
+                                "threshold": threshold,
+                                "chunks": len(chunks),
+                                **score_configuration(results, labels, threshold, encoding),
+                                "search_ms": statistics.median(latencies) * 1000,
+                            })
+
+        if embedding_cache is not None:
+            embedding_cache.save()
+
+        for row in sorted(rows, key=lambda row: (-row["recall"], -row["mrr"], row["context_tokens"])):
+            logger.info(
+                f"size={row['chunk_size']:>5} overlap={row['chunk_overlap']:>4} {row['index_type']:>6} "
+                f"k={row['top_k']} threshold={row['threshold']:.2f}: recall={row['recall']:.3f} mrr={row['mrr']:.3f} "
+                f"tokens={row['context_tokens']:.0f} search={row['search_ms']:.2f}ms unanswered={row['unanswered']}"
+            )
+
+        # Cheapest prompt that still finds the expected sources, then fastest search
+        qualifying = [row for row in rows if row["recall"] >= parsed_args.min_recall]
+        if embedding_cache is None:
+            logger.warning(
+                "Offline hash embeddings only rank these configurations against each other; "
+                "rerun with --embedding-cache for a recommendation to put in Settings"
+            )
+        elif qualifying:
+            best = min(qualifying, key=lambda row: (row["context_tokens"], row["search_ms"]))
+            logger.info(
+                f"Recommended: CHUNK_SIZE={best['chunk_size']} CHUNK_OVERLAP={best['chunk_overlap']} "
+                f"VECTOR_INDEX_TYPE={best['index_type']} RETRIEVAL_TOP_K={best['top_k']} "
+                f"RELEVANCE_THRESHOLD={best['threshold']} (recall={best['recall']:.3f}, tokens={best['context_tokens']:.0f})"
+            )
+        else:
+            logger.warning(f"No configuration reached recall {parsed_args.min_recall}")
+
+        if parsed_args.output:
+            with open(parsed_args.output, "w", encoding="utf-8", newline="") as output_file:
+                writer = csv.DictWriter(output_file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            logger.info(f"Wrote {len(rows)} result rows to {parsed_args.output}")
+    except Exception as error:
+        logger.exception(f"Retrieval tuning failed: {str(error)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())